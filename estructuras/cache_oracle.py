@@ -0,0 +1,158 @@
+"""
+Caché local persistente de las consultas de referencia a Oracle.
+
+Los mismos circuitos se cargan varias veces (reposiciones que se vuelven a
+subir tras corregirlas, varios usuarios en la misma zona) y cada carga repetía
+en Oracle las mismas consultas en bloque: código operativo / ENLACE -> FID,
+FID -> UC / datos TXT / norma y código -> conductor. CacheOracle guarda esos
+resultados en la tabla ConsultaOracleCache de la base local, de modo que al
+reprocesar un circuito solo se consultan en Oracle las claves que faltan.
+
+- Solo la usan las consultas en bloque (una lectura y una escritura por lote);
+  las consultas por registro van directo a Oracle.
+- Cada entidad (tipo de consulta) tiene su vigencia en ORACLE_CACHE_TTL_DIAS.
+  código / ENLACE -> FID y código -> conductor son cortas; las reposiciones no
+  usan código -> FID (usar_cache=False).
+- "No encontrado" también se guarda (valor None), con la vigencia más corta
+  ORACLE_CACHE_TTL_NO_ENCONTRADO_HORAS.
+- Solo se guarda lo que Oracle respondió: si la consulta falló no se guarda nada.
+- ORACLE_CACHE_ACTIVO = False o `with CacheOracle.omitir():` consultan siempre
+  Oracle (y no guardan); `manage.py limpiar_cache_oracle` vacía la tabla.
+
+Un fallo de la caché nunca detiene una consulta: se trata como clave faltante.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ConsultaOracleCache
+
+
+class CacheOracle:
+    """Lectura y escritura por lotes de ConsultaOracleCache"""
+
+    # Claves por consulta IN a la base local (límite de variables de SQLite)
+    CLAVES_POR_CONSULTA = 500
+    MAX_LARGO_CLAVE = 255
+
+    TTL_DIAS_POR_DEFECTO = 14
+
+    _local = threading.local()
+
+    @classmethod
+    def activa(cls) -> bool:
+        return getattr(settings, 'ORACLE_CACHE_ACTIVO', True) and not getattr(cls._local, 'omitir', False)
+
+    @classmethod
+    @contextmanager
+    def omitir(cls):
+        """Dentro del bloque las consultas van siempre a Oracle y no se guardan (hilo actual)"""
+        anterior = getattr(cls._local, 'omitir', False)
+        cls._local.omitir = True
+        try:
+            yield
+        finally:
+            cls._local.omitir = anterior
+
+    @classmethod
+    def _vigencia(cls, entidad: str, encontrado: bool) -> timedelta:
+        if not encontrado:
+            return timedelta(hours=getattr(settings, 'ORACLE_CACHE_TTL_NO_ENCONTRADO_HORAS', 24))
+        ttl_dias = getattr(settings, 'ORACLE_CACHE_TTL_DIAS', {})
+        return timedelta(days=ttl_dias.get(entidad, cls.TTL_DIAS_POR_DEFECTO))
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    @classmethod
+    def obtener_varios(cls, entidad: str, claves: Iterable[str]) -> Dict[str, Any]:
+        """
+        Entradas vigentes de las claves dadas: {clave: valor}, con valor None para
+        las que Oracle no encontró. Las claves ausentes o vencidas no aparecen.
+        """
+        if not cls.activa():
+            return {}
+
+        claves = [clave for clave in dict.fromkeys(claves) if clave and len(clave) <= cls.MAX_LARGO_CLAVE]
+        if not claves:
+            return {}
+
+        ahora = timezone.now()
+        limite_encontrado = ahora - cls._vigencia(entidad, True)
+        limite_no_encontrado = ahora - cls._vigencia(entidad, False)
+
+        resultado: Dict[str, Any] = {}
+        try:
+            for inicio in range(0, len(claves), cls.CLAVES_POR_CONSULTA):
+                filas = ConsultaOracleCache.objects.filter(
+                    entidad=entidad,
+                    clave__in=claves[inicio:inicio + cls.CLAVES_POR_CONSULTA],
+                    consultado_en__gte=min(limite_encontrado, limite_no_encontrado),
+                ).values_list('clave', 'valor', 'consultado_en')
+                for clave, valor, consultado_en in filas:
+                    limite = limite_encontrado if valor is not None else limite_no_encontrado
+                    if consultado_en >= limite:
+                        resultado[clave] = valor
+        except Exception as e:
+            print(f"DEBUG caché Oracle: no se pudo leer '{entidad}': {e}")
+            return {}
+
+        if resultado:
+            print(f"💾 Caché Oracle '{entidad}': {len(resultado)} de {len(claves)} claves sin consultar Oracle")
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    @classmethod
+    def guardar_varios(cls, entidad: str, valores: Dict[str, Any]) -> None:
+        """Guarda (o reemplaza) {clave: valor}; valor None registra que Oracle no encontró la clave"""
+        if not cls.activa():
+            return
+
+        ahora = timezone.now()
+        entradas = [
+            ConsultaOracleCache(entidad=entidad, clave=clave, valor=valor, consultado_en=ahora)
+            for clave, valor in valores.items()
+            if clave and len(clave) <= cls.MAX_LARGO_CLAVE
+        ]
+        if not entradas:
+            return
+
+        try:
+            ConsultaOracleCache.objects.bulk_create(
+                entradas,
+                batch_size=cls.CLAVES_POR_CONSULTA,
+                update_conflicts=True,
+                unique_fields=['entidad', 'clave'],
+                update_fields=['valor', 'consultado_en'],
+            )
+        except Exception as e:
+            print(f"DEBUG caché Oracle: no se pudo guardar '{entidad}': {e}")
+
+    @classmethod
+    def limpiar(cls, entidad: str = None, solo_vencidas: bool = False) -> int:
+        """Borra entradas (todas, de una entidad, o solo las vencidas); retorna cuántas"""
+        consulta = ConsultaOracleCache.objects.all()
+        if entidad:
+            consulta = consulta.filter(entidad=entidad)
+        if not solo_vencidas:
+            return consulta.delete()[0]
+
+        ahora = timezone.now()
+        borradas = 0
+        for ent in set(consulta.values_list('entidad', flat=True).distinct()):
+            borradas += consulta.filter(entidad=ent, valor__isnull=False,
+                                        consultado_en__lt=ahora - cls._vigencia(ent, True)).delete()[0]
+            borradas += consulta.filter(entidad=ent, valor__isnull=True,
+                                        consultado_en__lt=ahora - cls._vigencia(ent, False)).delete()[0]
+        return borradas
+
+    @staticmethod
+    def pendientes(claves: Iterable[str], en_cache: Dict[str, Any]) -> List[str]:
+        """Claves que no están en el resultado de obtener_varios (hay que consultarlas en Oracle)"""
+        return [clave for clave in claves if clave not in en_cache]
@@ -7,10 +7,13 @@ Clasifica automáticamente las estructuras según los campos poblados en el Exce
 """
 
 from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
 import re
 
+from .encabezados import IndiceEncabezados
+
 
 @dataclass
 class ClasificacionResultado:
@@ -52,11 +55,20 @@ class ClasificadorAutomatico:
             'Codigo Inventario', 'Fecha Instalacion',
             'Unidad Constructiva', 'Identificador', 'DESCRIPCION'
         ]
+        
+        # Índice de encabezados de las últimas columnas vistas (las filas de iterrows comparten Index)
+        self._columnas_indexadas = None
+        self._indice_encabezados = None
     
-    def clasificar_dataset(self, df: pd.DataFrame) -> Dict[str, List[ClasificacionResultado]]:
+    def clasificar_dataset(self, df: pd.DataFrame, con_datos: bool = True) -> Dict[str, List[ClasificacionResultado]]:
         """
         Clasifica todo el dataset y agrupa por tipo
         
+        Args:
+            df: Hoja de estructuras
+            con_datos: False deja datos vacío en cada resultado (no copia las filas);
+                basta para resultados_compactos, que solo guarda índices
+        
         Returns:
             Dict con listas de resultados por tipo:
             - EXPANSION: []
@@ -69,14 +81,124 @@ class ClasificadorAutomatico:
             'REPOSICION_BAJO': [],
             'SIN_CLASIFICAR': []
         }
+        if not len(df):
+            return resultados
+        
+        # Mismas reglas que clasificar_registro, evaluadas por columna con máscaras
+        indice = IndiceEncabezados.para(df.columns)
+        tiene_salida = self._mascara_con_datos(df, indice, self.campos_salida)
+        tiene_nuevo = self._mascara_con_datos(df, indice, self.campos_nuevo)
+        
+        # Valores tal como los entrega iterrows (df.values) para FID y datos
+        valores = df.values
+        columnas = list(df.columns)
+        posiciones = {col: j for j, col in enumerate(columnas)}
         
-        for idx, fila in df.iterrows():
-            clasificacion = self.clasificar_registro(fila, idx)
-            if clasificacion.tipo in resultados:
-                resultados[clasificacion.tipo].append(clasificacion)
+        def columna(nombre):
+            j = posiciones.get(nombre)
+            return valores[:, j] if j is not None else None
+        
+        reposicion = tiene_salida & tiene_nuevo
+        tipos = np.full(len(df), 'SIN_CLASIFICAR', dtype=object)
+        tipos[reposicion] = np.where(self._mascara_reposicion_nuevo(df, columna)[reposicion],
+                                     'REPOSICION_NUEVO', 'REPOSICION_BAJO')
+        tipos[tiene_salida & ~tiene_nuevo] = 'REPOSICION_BAJO'
+        tipos[~tiene_salida & tiene_nuevo] = 'EXPANSION'
+        
+        zonas_urbanas = ['URBANA', 'URBANO', 'CRITICA', 'CRÍTICA']
+        tipos_inversion = np.full(len(df), '', dtype=object)
+        poblacion_rep = self._texto_columna(columna('Poblacion'), len(df))
+        tipos_inversion[reposicion] = np.where(np.isin(poblacion_rep, zonas_urbanas), 'T1', 'T3')[reposicion]
+        tipos_inversion[tiene_salida & ~tiene_nuevo] = 'T3'
+        expansion = ~tiene_salida & tiene_nuevo
+        poblacion_exp = self._poblacion_expansion(df, indice)
+        tipos_inversion[expansion] = np.where(np.isin(poblacion_exp, zonas_urbanas), 'T2', 'T4')[expansion]
+        
+        fids = np.full(len(df), '', dtype=object)
+        fid_rep = columna('Código FID_rep')
+        fids[tiene_salida] = [str(v) for v in fid_rep[tiene_salida]] if fid_rep is not None else ''
+        
+        # Solo al final se materializa un resultado por fila (y sus datos, si se piden)
+        if not con_datos:
+            filas = ({} for _ in range(len(df)))
+        elif valores.dtype.kind == 'M':
+            filas = [fila.to_dict() for _, fila in df.iterrows()]
+        else:
+            filas = [dict(zip(columnas, fila)) for fila in valores.tolist()]
+        for tipo, tipo_inversion, fid_anterior, datos, idx in zip(tipos, tipos_inversion, fids, filas, df.index):
+            resultados[tipo].append(ClasificacionResultado(
+                tipo=tipo,
+                tipo_inversion=tipo_inversion,
+                fid_anterior=fid_anterior,
+                datos=datos,
+                indice=idx
+            ))
         
         return resultados
     
+    def _mascara_con_datos(self, df: pd.DataFrame, indice: IndiceEncabezados, campos: List[str]) -> np.ndarray:
+        """Versión por columnas de _tiene_datos: True si alguna columna de los campos tiene datos válidos"""
+        mascara = np.zeros(len(df), dtype=bool)
+        for campo in campos:
+            for nombre in indice.columnas_de(campo, 'clasificador'):
+                serie = df[nombre]
+                con_datos = serie.notna().to_numpy(copy=True)
+                if not (pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie)):
+                    texto = serie.astype(object).where(con_datos, '').map(lambda v: str(v).strip())
+                    con_datos &= ((texto != '') & (texto.str.lower() != 'nan')).to_numpy()
+                mascara |= con_datos
+        return mascara
+    
+    def _mascara_reposicion_nuevo(self, df: pd.DataFrame, columna) -> np.ndarray:
+        """Versión por columnas de _clasificar_reposicion: True donde hay mejora en KGF o Altura"""
+        n = len(df)
+        uc_salida = self._texto_columna(columna('Codigo UC_rep'), n, strip=False)
+        distintas = {uc: (self._extraer_kgf_de_uc(uc), self._extraer_altura_de_uc(uc)) for uc in set(uc_salida)}
+        kgf_salida = np.array([distintas[uc][0] for uc in uc_salida], dtype=float)
+        altura_salida = np.array([distintas[uc][1] for uc in uc_salida], dtype=float)
+        
+        kgf_nuevo, kgf_valido = self._float_columna(columna('KGF'), n)
+        altura_nuevo, altura_valido = self._float_columna(columna('Altura'), n)
+        
+        with np.errstate(invalid='ignore'):
+            mejora = (kgf_nuevo > kgf_salida) | (altura_nuevo > altura_salida)
+        # Un valor no numérico en KGF o Altura se trata como reposición bajo
+        return mejora & kgf_valido & altura_valido
+    
+    def _poblacion_expansion(self, df: pd.DataFrame, indice: IndiceEncabezados) -> np.ndarray:
+        """Versión por columnas de _obtener_valor_campo(fila, 'Poblacion').upper()"""
+        poblacion = np.full(len(df), '', dtype=object)
+        pendiente = np.ones(len(df), dtype=bool)
+        for nombre in indice.columnas_de('Poblacion', 'clasificador_valores'):
+            valores = df[nombre].to_numpy(dtype=object)
+            usar = pendiente & pd.notna(valores)
+            poblacion[usar] = [str(v).strip().upper() for v in valores[usar]]
+            pendiente &= ~usar
+        return poblacion
+    
+    @staticmethod
+    def _texto_columna(valores, n: int, strip: bool = True) -> np.ndarray:
+        """str(fila.get(col, '')) por columna (con .upper().strip() si strip)"""
+        if valores is None:
+            return np.full(n, '', dtype=object)
+        if strip:
+            return np.array([str(v).upper().strip() for v in valores], dtype=object)
+        return np.array([str(v) for v in valores], dtype=object)
+    
+    @staticmethod
+    def _float_columna(valores, n: int):
+        """float(fila.get(col, 0)) por columna; retorna (valores, máscara de conversiones válidas)"""
+        if valores is None:
+            return np.zeros(n), np.ones(n, dtype=bool)
+        resultado = np.zeros(n)
+        valido = np.ones(n, dtype=bool)
+        for i, v in enumerate(valores):
+            try:
+                resultado[i] = float(v)
+            except (ValueError, TypeError):
+                valido[i] = False
+        return resultado, valido
+    
     def clasificar_registro(self, fila: pd.Series, indice: int = 0) -> ClasificacionResultado:
         """
         Clasifica un registro individual según las reglas de negocio
@@ -121,46 +243,32 @@ class ClasificadorAutomatico:
         """
         Verifica si al menos uno de los campos tiene datos válidos
         """
-        # Mapeo de nombres de campos para manejar encabezados genéricos
-        mapeo_campos = {
-            'Unidad Constructiva': ['Unidad Constructiva', 'Unnamed: 25'],
-            'Codigo Inventario': ['Codigo Inventario', 'Unnamed: 23'],
-            'Coordenada_X1\nLONGITUD': ['Coordenada_X1\nLONGITUD', 'Unnamed: 0'],
-            'Coordenada_Y1\nLATITUD': ['Coordenada_Y1\nLATITUD', 'Unnamed: 1']
-        }
+        # Encabezados genéricos resueltos una vez por hoja (encabezados.ALIAS_CLASIFICADOR)
+        indice = self._indice_para(fila)
         
         for campo in campos:
-            # Obtener lista de posibles nombres para este campo
-            posibles_nombres = mapeo_campos.get(campo, [campo])
-            
-            for nombre in posibles_nombres:
-                if nombre in fila:
-                    valor = fila[nombre]
-                    if pd.notna(valor) and str(valor).strip() and str(valor).strip().lower() != 'nan':
-                        return True
+            for nombre in indice.columnas_de(campo, 'clasificador'):
+                valor = fila[nombre]
+                if pd.notna(valor) and str(valor).strip() and str(valor).strip().lower() != 'nan':
+                    return True
         return False
     
+    def _indice_para(self, fila: pd.Series) -> IndiceEncabezados:
+        """Índice de encabezados para las columnas de la fila (reutilizado mientras no cambien)"""
+        if fila.index is not self._columnas_indexadas:
+            self._indice_encabezados = IndiceEncabezados.para(fila.index)
+            self._columnas_indexadas = fila.index
+        return self._indice_encabezados
+    
     def _obtener_valor_campo(self, fila: pd.Series, campo: str) -> str:
         """
         Obtiene el valor de un campo aplicando mapeo de nombres
         """
-        # Mapeo de nombres de campos para manejar encabezados genéricos
-        mapeo_campos = {
-            'Unidad Constructiva': ['Unidad Constructiva', 'Unnamed: 25'],
-            'Codigo Inventario': ['Codigo Inventario', 'Unnamed: 23'],
-            'Coordenada_X1\nLONGITUD': ['Coordenada_X1\nLONGITUD', 'Unnamed: 0'],
-            'Coordenada_Y1\nLATITUD': ['Coordenada_Y1\nLATITUD', 'Unnamed: 1'],
-            'Poblacion': ['Poblacion', 'Unnamed: 19']
-        }
-        
-        # Obtener lista de posibles nombres para este campo
-        posibles_nombres = mapeo_campos.get(campo, [campo])
-        
-        for nombre in posibles_nombres:
-            if nombre in fila:
-                valor = fila[nombre]
-                if pd.notna(valor):
-                    return str(valor).strip()
+        # Encabezados genéricos resueltos una vez por hoja (encabezados.ALIAS_CLASIFICADOR_VALORES)
+        for nombre in self._indice_para(fila).columnas_de(campo, 'clasificador_valores'):
+            valor = fila[nombre]
+            if pd.notna(valor):
+                return str(valor).strip()
         return ''
     
     def _clasificar_reposicion(self, fila: pd.Series) -> str:
@@ -243,6 +351,28 @@ class ClasificadorAutomatico:
                 return altura
         return 0
     
+    @staticmethod
+    def resultados_compactos(resultados: Dict[str, List[ClasificacionResultado]], nombre_hoja: str) -> Dict:
+        """
+        Representación compacta de la clasificación para guardar en el proceso.
+        
+        Por tipo guarda solo el índice de fila en la hoja, tipo_inversion y
+        fid_anterior como columnas paralelas. Los datos de cada fila no se copian:
+        están en el Excel y se leen solo para los registros que se muestran.
+        """
+        return {
+            'formato': 'indices',
+            'hoja': nombre_hoja,
+            'tipos': {
+                tipo: {
+                    'indices': [int(r.indice) for r in lista],
+                    'tipo_inversion': [r.tipo_inversion for r in lista],
+                    'fid_anterior': [r.fid_anterior for r in lista],
+                }
+                for tipo, lista in resultados.items()
+            }
+        }
+    
     def generar_resumen(self, resultados: Dict[str, List[ClasificacionResultado]]) -> Dict:
         """
         Genera un resumen estadístico de la clasificación
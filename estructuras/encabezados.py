@@ -0,0 +1,249 @@
+"""
+Resolución de encabezados del Excel.
+
+Los nombres de columna varían entre archivos (tildes, saltos de línea,
+mayúsculas, encabezados genéricos 'Unnamed: N'). Las tablas de alias de este
+módulo reúnen las variantes que antes se repetían dentro de cada método, y
+IndiceEncabezados resuelve una sola vez, para un conjunto de columnas, qué
+columnas reales corresponden a cada campo. Todas las filas de una hoja
+comparten columnas, así que la extracción por fila queda en una consulta a
+diccionario.
+"""
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+
+TRADUCCION_TILDES = str.maketrans('áéíóúÁÉÍÓÚ', 'aeiouAEIOU')
+
+
+@lru_cache(maxsize=4096)
+def _normalizar_texto_columna(nombre: str) -> str:
+    ns = nombre.replace('\n', ' ').replace('\r', ' ')
+    ns = ns.replace('_', ' ')
+    ns = re.sub(r"\s+", ' ', ns)
+    ns = ns.strip().lower()
+    return ns.translate(TRADUCCION_TILDES)
+
+
+def normalizar_nombre_columna(nombre) -> str:
+    """Minúsculas, sin tildes, '_' y saltos de línea como espacio, espacios colapsados"""
+    if nombre is None:
+        return ''
+    return _normalizar_texto_columna(str(nombre))
+
+
+@lru_cache(maxsize=4096)
+def compactar_nombre_columna(nombre: str) -> str:
+    """Minúsculas sin saltos de línea, espacios ni '_' (comparación flexible)"""
+    return nombre.lower().replace('\n', '').replace(' ', '').replace('_', '').strip()
+
+
+# Campos básicos obligatorios del Excel de estructuras (ExcelProcessor._verificar_campos)
+ALIAS_CAMPOS_BASICOS = {
+    'Norma': ('Norma', 'NORMA', 'norma'),
+    'UC': ('UC', 'Unidad_Constructiva', 'Unidad Constructiva', 'UNIDAD_CONSTRUCTIVA',
+           'unidad_constructiva', 'unidad constructiva', 'Unnamed: 25'),
+    'Poblacion': ('Poblacion', 'POBLACION', 'poblacion', 'Población', 'MUNICIPIOS', 'Municipios', 'Municipio', 'municipio'),
+    'CODIGO_MATERIAL': ('Codigo Inventario', 'CODIGO_INVENTARIO', 'Unnamed: 23', 'Material', 'MATERIAL')
+}
+
+# Renombrado de columnas del Excel al nombre esperado por el mapeo (DataTransformer)
+EQUIVALENCIAS_CAMPOS = {
+    'Unidad_Constructiva': 'UC',
+    'Unidad Constructiva': 'UC',
+    'Unnamed: 25': 'UC',  # Para archivos con encabezados genéricos
+    'Unnamed: 23': 'CODIGO_INVENTARIO',  # Para código de inventario
+    'Unnamed: 0': 'COORDENADA_X',  # Para coordenada X
+    'Unnamed: 1': 'COORDENADA_Y',  # Para coordenada Y
+    'UNIDAD_CONSTRUCTIVA': 'UC',
+    'unidad_constructiva': 'UC',
+    'unidad constructiva': 'UC',
+    'Código FID_rep': 'Código FID_rep',
+    'FID_ANTERIOR': 'FID_ANTERIOR',
+    'Tipo_accion_sal': 'Tipo_accion_sal',
+    'Tipo_accion_ent': 'Tipo_accion_ent',
+    # Nuevo: mapear 'Tipo inversión' del Excel para TIPO_PROYECTO
+    'Tipo inversión': 'TIPO_INVERSION_ROMANO',
+    'Tipo inversion': 'TIPO_INVERSION_ROMANO',
+    'TIPO INVERSION': 'TIPO_INVERSION_ROMANO',
+    'TIPO INVERSIÓN': 'TIPO_INVERSION_ROMANO',
+    'tipo inversion': 'TIPO_INVERSION_ROMANO',
+    'tipo inversión': 'TIPO_INVERSION_ROMANO',
+    # NUEVO: soportar el campo del Excel 'CodigoMaterial'
+    'CodigoMaterial': 'CODIGO_MATERIAL',
+    'CODIGOMATERIAL': 'CODIGO_MATERIAL',
+    'codigoMaterial': 'CODIGO_MATERIAL',
+    'codigo_material': 'CODIGO_MATERIAL',
+}
+
+# Claves explícitas del FID de la estructura retirada, en orden de prioridad
+CLAVES_FID_REP = ('Código FID_rep', 'Codigo FID_rep', 'CODIGO_FID_REP', 'codigo_fid_rep', 'FID_ANTERIOR', 'FID')
+
+# Variantes de nombres en la hoja de conductores (FileGenerator._extraer_campo_conductor)
+VARIANTES_CONDUCTOR = {
+    'codigo_fid_git': (
+        'Código FID\nGIT', 'Código FID GIT', 'Codigo FID GIT',
+        'CODIGO_FID_GIT', 'código fid git', 'codigo fid git',
+        'FID_GIT', 'FID GIT', 'Código FID_rep'
+    ),
+    'unidad_constructiva': (
+        'Unidad Constructiva', 'UNIDAD_CONSTRUCTIVA',
+        'unidad constructiva', 'UC', 'UNIDAD CONSTRUCTIVA'
+    ),
+    'identificador': (
+        'Identificador_1', 'Identificador_2', 'Identificador',
+        'IDENTIFICADOR', 'identificador', 'ID', 'Id', 'ENLACE'
+    ),
+    'fecha_instalacion': (
+        'Fecha Instalacion\nDD/MM/YYYY', 'Fecha Instalacion DD/MM/YYYY',
+        'Fecha Instalación', 'FECHA_INSTALACION', 'Fecha Instalacion',
+        'fecha instalacion'
+    ),
+    'coordenada_x1': (
+        'Coordenada_X1\nLONGITUD', 'Coordenada_X1 LONGITUD',
+        'Coordenada_X1', 'COORDENADA_X1', 'coordenada x1',
+        'Coordenada X1', 'LONGITUD'
+    ),
+    'coordenada_y1': (
+        'Coordenada_Y1\nLATITUD', 'Coordenada_Y1 LATITUD',
+        'Coordenada_Y1', 'COORDENADA_Y1', 'coordenada y1',
+        'Coordenada Y1', 'LATITUD'
+    ),
+    'coordenada_x2': (
+        'Coordenada_X2\nLONGITUD2', 'Coordenada_X2 LONGITUD2',
+        'Coordenada_X2', 'COORDENADA_X2', 'coordenada x2',
+        'Coordenada X2', 'LONGITUD2'
+    ),
+    'coordenada_y2': (
+        'Coordenada_Y2\nLATITUD3', 'Coordenada_Y2 LATITUD3',
+        'Coordenada_Y2', 'COORDENADA_Y2', 'coordenada y2',
+        'Coordenada Y2', 'LATITUD3'
+    ),
+    'nivel_tension': (
+        'Nivel de Tension', 'Nivel de Tensión', 'NIVEL_TENSION',
+        'nivel tension', 'Nivel Tension'
+    ),
+    'municipio': (
+        'Municipio', 'MUNICIPIO', 'municipio'
+    ),
+    'fases': (
+        'Fases', 'FASES', 'fases'
+    ),
+    'numero_conductores': (
+        'Número de conductores', 'Numero de conductores',
+        'NUMERO_CONDUCTORES', 'numero conductores'
+    ),
+    'clase': (
+        'CLASE', 'Clase', 'clase'
+    ),
+    'poblacion': (
+        'POBLACION', 'Poblacion', 'poblacion', 'Población'
+    ),
+    'tipo': (
+        'TIPO', 'Tipo', 'tipo'
+    ),
+    'material': (
+        'MATERIAL', 'Material', 'material'
+    ),
+    'calibre': (
+        'CALIBRE', 'Calibre', 'calibre'
+    )
+}
+
+# Encabezados genéricos aceptados por el clasificador automático (ClasificadorAutomatico._tiene_datos)
+ALIAS_CLASIFICADOR = {
+    'Unidad Constructiva': ('Unidad Constructiva', 'Unnamed: 25'),
+    'Codigo Inventario': ('Codigo Inventario', 'Unnamed: 23'),
+    'Coordenada_X1\nLONGITUD': ('Coordenada_X1\nLONGITUD', 'Unnamed: 0'),
+    'Coordenada_Y1\nLATITUD': ('Coordenada_Y1\nLATITUD', 'Unnamed: 1')
+}
+
+# Igual que ALIAS_CLASIFICADOR más Poblacion (ClasificadorAutomatico._obtener_valor_campo)
+ALIAS_CLASIFICADOR_VALORES = dict(ALIAS_CLASIFICADOR, Poblacion=('Poblacion', 'Unnamed: 19'))
+
+
+class IndiceEncabezados:
+    """
+    Índice de encabezados de una hoja: para cada campo canónico guarda las
+    columnas reales que lo contienen, en el orden de prioridad en que deben
+    consultarse. Se construye una vez por conjunto de columnas y se comparte.
+    """
+
+    MAX_INDICES = 64
+    _indices: 'OrderedDict[Tuple, IndiceEncabezados]' = OrderedDict()
+    _lock = threading.Lock()
+
+    # tabla -> (alias por campo, regla de coincidencia, usar el propio campo si no tiene alias)
+    TABLAS = {
+        'basicos': (ALIAS_CAMPOS_BASICOS, 'exacta_strip', True),
+        'clasificador': (ALIAS_CLASIFICADOR, 'exacta', True),
+        'clasificador_valores': (ALIAS_CLASIFICADOR_VALORES, 'exacta', True),
+        'conductor': (VARIANTES_CONDUCTOR, 'compacta', False),
+        'fid_rep': ({'fid_rep': CLAVES_FID_REP}, 'contiene_fid', False),
+    }
+
+    def __init__(self, columnas: Tuple):
+        self.columnas = columnas
+        self._presentes = set(columnas)
+        self._resueltas: Dict[Tuple[str, str], Tuple] = {}
+        self._renombradas = None
+
+    @classmethod
+    def para(cls, columnas: Iterable) -> 'IndiceEncabezados':
+        """Índice compartido para las columnas dadas (lista, Index de pandas o las claves de un registro)"""
+        clave = tuple(columnas)
+        indice = cls._indices.get(clave)
+        if indice is not None:
+            return indice
+
+        with cls._lock:
+            indice = cls._indices.get(clave)
+            if indice is None:
+                indice = cls(clave)
+                cls._indices[clave] = indice
+                while len(cls._indices) > cls.MAX_INDICES:
+                    cls._indices.popitem(last=False)
+        return indice
+
+    def columnas_de(self, campo: str, tabla: str) -> Tuple:
+        """Columnas reales que corresponden a `campo` según la tabla de alias, en orden de consulta"""
+        clave = (tabla, campo)
+        resueltas = self._resueltas.get(clave)
+        if resueltas is None:
+            resueltas = self._resolver(campo, tabla)
+            self._resueltas[clave] = resueltas
+        return resueltas
+
+    def _resolver(self, campo: str, tabla: str) -> Tuple:
+        alias_por_campo, regla, campo_por_defecto = self.TABLAS[tabla]
+        alias = alias_por_campo.get(campo, (campo,) if campo_por_defecto else ())
+
+        if regla == 'exacta_strip':
+            return tuple(col for col in self.columnas if str(col).strip() in alias)
+
+        # Primero los alias exactos presentes, en el orden de la tabla
+        resueltas = [nombre for nombre in alias if nombre in self._presentes]
+
+        if regla == 'compacta':
+            compactos = {compactar_nombre_columna(nombre) for nombre in alias}
+            adicionales = [col for col in self.columnas
+                           if isinstance(col, str) and compactar_nombre_columna(col) in compactos]
+        elif regla == 'contiene_fid':
+            adicionales = [col for col in self.columnas
+                           if isinstance(col, str) and 'fid' in normalizar_nombre_columna(col)]
+        else:
+            adicionales = []
+
+        for col in adicionales:
+            if col not in resueltas:
+                resueltas.append(col)
+        return tuple(resueltas)
+
+    def columnas_renombradas(self) -> Tuple:
+        """Columnas con el nombre esperado por el mapeo (EQUIVALENCIAS_CAMPOS), en el mismo orden"""
+        if self._renombradas is None:
+            self._renombradas = tuple(EQUIVALENCIAS_CAMPOS.get(col, col) for col in self.columnas)
+        return self._renombradas
@@ -0,0 +1,218 @@
+"""
+Catálogo de columnas opcionales del esquema Oracle.
+
+Algunas consultas por FID (obtener_datos_norma_por_fid, obtener_uc_por_fid,
+obtener_datos_txt_por_fids) dependen de columnas que no existen en todas las
+instalaciones (CIRCUITO / NOMBRE_CIRCUITO, CODIGO_TRAFO / COD_TRAFO, UC /
+UNIDAD_CONSTRUCTIVA, CCOMUN.UC, ...). Antes se consultaba USER_TAB_COLUMNS en cada
+llamada, es decir, por cada registro.
+
+EsquemaOracle lee USER_TAB_COLUMNS una vez, resuelve qué columna corresponde a
+cada campo y arma las consultas por FID una sola vez: el texto SQL es siempre el
+mismo y la caché de sentencias de cada sesión del pool lo reutiliza.
+
+El catálogo se guarda por proceso y en ORACLE_ESQUEMA_ARCHIVO (compartido entre
+procesos). Se vuelve a leer de Oracle cuando vence ORACLE_ESQUEMA_TTL o con
+`python manage.py refrescar_esquema_oracle`, que reescribe el archivo; los
+procesos en marcha lo recargan al ver que cambió (lo revisan como mucho cada
+ORACLE_ESQUEMA_REVISION_SEG segundos).
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+# campo -> (tabla, columnas candidatas en orden de prioridad)
+CANDIDATOS_COLUMNAS = {
+    'CIRCUITO': ('CCOMUN', ('CIRCUITO', 'NOMBRE_CIRCUITO', 'CIRCUITO_NOMBRE', 'CIRCUITO_ID', 'ID_CIRCUITO')),
+    'CODIGO_TRAFO': ('EPOSTE_AT', ('CODIGO_TRAFO', 'COD_TRAFO', 'CODIGO_TRANSFORMADOR')),
+    'TIPO_ADECUACION': ('EPOSTE_AT', ('TIPO_ADECUACION',)),
+    'NORMA': ('EPOSTE_AT', ('NORMA', 'CODIGO_NORMA', 'NORMA_ID')),
+    'MACRONORMA': ('EPOSTE_AT', ('MACRONORMA', 'MACRO_NORMA', 'CODIGO_MACRONORMA')),
+    'CANTIDAD': ('EPOSTE_AT', ('CANTIDAD', 'CANT', 'ALTURA')),
+    'UC': ('EPOSTE_AT', ('UC', 'UNIDAD_CONSTRUCTIVA')),
+    'UC_CCOMUN': ('CCOMUN', ('UC',)),
+}
+
+# Campos de norma que se leen de EPOSTE_AT, en el orden de la consulta
+CAMPOS_NORMA_EPOSTE = ('CODIGO_TRAFO', 'TIPO_ADECUACION', 'NORMA', 'MACRONORMA', 'CANTIDAD')
+
+
+class EsquemaOracle:
+    """Columnas opcionales resueltas y consultas por FID construidas a partir de ellas"""
+
+    # Se incrementa si cambia el formato del archivo; los de otra versión se ignoran
+    VERSION = 1
+
+    _actual: Optional['EsquemaOracle'] = None
+    _archivo_mtime: Optional[float] = None
+    _archivo_revisado_en: float = 0.0
+    _lock = threading.Lock()
+
+    def __init__(self, columnas: Dict[str, Tuple[str, ...]], cargado_en: float):
+        self.columnas = columnas
+        self.cargado_en = cargado_en
+
+        self.resueltas: Dict[str, Optional[str]] = {}
+        for campo, (tabla, candidatos) in CANDIDATOS_COLUMNAS.items():
+            presentes = set(columnas.get(tabla, ()))
+            self.resueltas[campo] = next((col for col in candidatos if col in presentes), None)
+
+        self.campos_norma_eposte = tuple(campo for campo in CAMPOS_NORMA_EPOSTE if self.resueltas[campo])
+        self.consultas = self._construir_consultas()
+
+    def _construir_consultas(self) -> Dict[str, Optional[str]]:
+        circuito = self.resueltas['CIRCUITO']
+        uc = self.resueltas['UC']
+        uc_ccomun = self.resueltas['UC_CCOMUN']
+        cols_eposte = ', '.join(self.resueltas[campo] for campo in self.campos_norma_eposte)
+        return {
+            'circuito': f"SELECT {circuito} FROM CCOMUN WHERE G3E_FID = :fid_param" if circuito else None,
+            'norma_eposte': f"SELECT {cols_eposte} FROM EPOSTE_AT WHERE G3E_FID = :fid_param" if cols_eposte else None,
+            'uc_eposte': f"SELECT p.{uc} FROM eposte_at p WHERE p.g3e_fid = :fid_param" if uc else None,
+            'uc_ccomun': f"SELECT c.{uc_ccomun} FROM ccomun c WHERE c.g3e_fid = :fid_param" if uc_ccomun else None,
+        }
+
+    def columna(self, campo: str) -> Optional[str]:
+        """Columna real del campo (CANDIDATOS_COLUMNAS) o None si la tabla no la tiene"""
+        return self.resueltas.get(campo)
+
+    def consulta(self, nombre: str) -> Optional[str]:
+        """SQL por FID ya construido ('circuito', 'norma_eposte', 'uc_eposte', 'uc_ccomun') o None si no aplica"""
+        return self.consultas.get(nombre)
+
+    @property
+    def vencido(self) -> bool:
+        return time.time() - self.cargado_en >= getattr(settings, 'ORACLE_ESQUEMA_TTL', 3600)
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+    @classmethod
+    def obtener(cls, cursor) -> Optional['EsquemaOracle']:
+        """
+        Catálogo vigente. Usa el del proceso si no venció ni cambió el archivo
+        compartido; si no, el del archivo; y si ese también venció, lo lee de
+        Oracle con el cursor dado. Retorna None si no se pudo leer el esquema
+        (las consultas siguen sin las columnas opcionales).
+        """
+        esquema = cls._actual
+        if esquema is not None and not esquema.vencido and not cls._archivo_cambio():
+            return esquema
+
+        with cls._lock:
+            esquema = cls._actual
+            if esquema is not None and not esquema.vencido and cls._mtime_archivo() == cls._archivo_mtime:
+                return esquema
+
+            esquema = cls._leer_archivo()
+            if esquema is None or esquema.vencido:
+                esquema = cls._leer_oracle(cursor)
+                if esquema is None:
+                    # Sin acceso al diccionario de datos: seguir con el catálogo anterior si lo hay
+                    return cls._actual
+                cls._escribir_archivo(esquema)
+            cls._actual = esquema
+            return esquema
+
+    @classmethod
+    def refrescar(cls, cursor) -> Optional['EsquemaOracle']:
+        """Lee de nuevo el esquema desde Oracle y actualiza el archivo compartido"""
+        with cls._lock:
+            esquema = cls._leer_oracle(cursor)
+            if esquema is not None:
+                cls._escribir_archivo(esquema)
+                cls._actual = esquema
+            return esquema
+
+    @classmethod
+    def _leer_oracle(cls, cursor) -> Optional['EsquemaOracle']:
+        tablas = sorted({tabla for tabla, _ in CANDIDATOS_COLUMNAS.values()})
+        try:
+            cursor.execute(
+                f"""
+                SELECT UPPER(TABLE_NAME), UPPER(COLUMN_NAME)
+                FROM USER_TAB_COLUMNS
+                WHERE UPPER(TABLE_NAME) IN ({', '.join(f"'{tabla}'" for tabla in tablas)})
+                """
+            )
+            filas = cursor.fetchall() or []
+        except Exception as e:
+            print(f"DEBUG Oracle: No fue posible leer USER_TAB_COLUMNS: {e}")
+            return None
+
+        columnas: Dict[str, list] = {tabla: [] for tabla in tablas}
+        for tabla, columna in filas:
+            columnas.setdefault(tabla, []).append(columna)
+        esquema = cls({tabla: tuple(sorted(cols)) for tabla, cols in columnas.items()}, time.time())
+        print(f"🗂️ Oracle: esquema cargado ({', '.join(f'{c}={v}' for c, v in esquema.resueltas.items() if v) or 'sin columnas opcionales'})")
+        return esquema
+
+    # ------------------------------------------------------------------
+    # Archivo compartido entre procesos
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _ruta_archivo() -> Optional[str]:
+        ruta = getattr(settings, 'ORACLE_ESQUEMA_ARCHIVO', None)
+        return str(ruta) if ruta else None
+
+    @classmethod
+    def _mtime_archivo(cls) -> Optional[float]:
+        ruta = cls._ruta_archivo()
+        if not ruta:
+            return None
+        try:
+            return os.stat(ruta).st_mtime
+        except OSError:
+            return None
+
+    @classmethod
+    def _archivo_cambio(cls) -> bool:
+        # obtener() corre por cada FID: el archivo se revisa como mucho cada ORACLE_ESQUEMA_REVISION_SEG
+        ahora = time.monotonic()
+        if ahora - cls._archivo_revisado_en < getattr(settings, 'ORACLE_ESQUEMA_REVISION_SEG', 30):
+            return False
+        cls._archivo_revisado_en = ahora
+        return cls._mtime_archivo() != cls._archivo_mtime
+
+    @classmethod
+    def _leer_archivo(cls) -> Optional['EsquemaOracle']:
+        ruta = cls._ruta_archivo()
+        cls._archivo_mtime = cls._mtime_archivo()
+        cls._archivo_revisado_en = time.monotonic()
+        if not ruta or cls._archivo_mtime is None:
+            return None
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('version') != cls.VERSION:
+                return None
+            columnas = {tabla: tuple(cols) for tabla, cols in datos['columnas'].items()}
+            return cls(columnas, float(datos['cargado_en']))
+        except Exception as e:
+            print(f"DEBUG Oracle: archivo de esquema ilegible ({ruta}): {e}")
+            return None
+
+    @classmethod
+    def _escribir_archivo(cls, esquema: 'EsquemaOracle') -> None:
+        ruta = cls._ruta_archivo()
+        if not ruta:
+            return
+        try:
+            os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': cls.VERSION,
+                    'cargado_en': esquema.cargado_en,
+                    'columnas': {tabla: list(cols) for tabla, cols in esquema.columnas.items()},
+                }, f)
+            os.replace(temporal, ruta)
+            cls._archivo_mtime = cls._mtime_archivo()
+            cls._archivo_revisado_en = time.monotonic()
+        except OSError as e:
+            print(f"DEBUG Oracle: no se pudo guardar el esquema en {ruta}: {e}")
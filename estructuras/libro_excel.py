@@ -0,0 +1,764 @@
+"""
+Lectura única de libros Excel por proceso.
+
+Cada archivo subido se parsea una sola vez con openpyxl y las celdas crudas de
+cada hoja quedan en memoria. Las hojas se leen recién cuando se piden: para
+elegir la hoja o la fila de encabezados solo se leen las filas superiores, y
+las hojas auxiliares que ninguna etapa usa no se parsean. Las etapas de
+procesamiento y los generadores piden DataFrames a este objeto en lugar de
+volver a llamar pd.read_excel sobre el mismo archivo.
+
+El resultado del parseo se guarda además en una caché en disco (carpeta
+'<sha256>' dentro de EXCEL_CACHE_PARSEO_DIR), de modo que reabrir un proceso
+antiguo no vuelve a parsear el Excel. La caché está fuera de MEDIA_ROOT (no se
+publica) y guarda las celdas en JSON: leerla nunca ejecuta código.
+`python manage.py limpiar_cache_parseo` borra las entradas sin uso reciente.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as hora, timedelta
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from pandas.io.parsers import TextParser
+
+
+def calcular_hash_archivo(archivo_path: str) -> str:
+    """SHA-256 del contenido del archivo (lectura por bloques)"""
+    sha = hashlib.sha256()
+    with open(archivo_path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _codificar_celda(valor):
+    """Valores de celda que JSON no representa (fechas y horas de openpyxl) como {tipo: texto}"""
+    if isinstance(valor, datetime):
+        return {'datetime': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'date': valor.isoformat()}
+    if isinstance(valor, hora):
+        return {'time': valor.isoformat()}
+    if isinstance(valor, timedelta):
+        return {'timedelta': [valor.days, valor.seconds, valor.microseconds]}
+    raise TypeError(f"Celda no serializable en la caché de parseo: {type(valor).__name__}")
+
+
+def _decodificar_celda(objeto: Dict):
+    # Las celdas nunca son diccionarios: todo objeto JSON es un valor codificado por _codificar_celda
+    (tipo, valor), = objeto.items()
+    if tipo == 'datetime':
+        return datetime.fromisoformat(valor)
+    if tipo == 'date':
+        return date.fromisoformat(valor)
+    if tipo == 'time':
+        return hora.fromisoformat(valor)
+    if tipo == 'timedelta':
+        return timedelta(*valor)
+    raise ValueError(f"Tipo de celda desconocido en la caché de parseo: {tipo}")
+
+
+def serializar_celdas(celdas: List[List]) -> bytes:
+    """Celdas de una hoja en el formato de la caché de parseo (JSON; NaN de celdas con error incluido)"""
+    return json.dumps(celdas, ensure_ascii=False, separators=(',', ':'), default=_codificar_celda).encode('utf-8')
+
+
+def deserializar_celdas(contenido: bytes) -> List[List]:
+    return json.loads(contenido, object_hook=_decodificar_celda)
+
+
+def _parsear_hoja_serializada(archivo_path: str, nombre_hoja: str) -> bytes:
+    """
+    Trabajo de un proceso del pool: parsea una hoja y retorna sus celdas ya
+    serializadas (mismo formato que la caché de parseo), para que el proceso
+    principal pueda guardarlas en la caché sin volver a serializarlas.
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        celdas = LibroExcel._leer_celdas_hoja(libro[nombre_hoja])
+    finally:
+        libro.close()
+    return serializar_celdas(celdas)
+
+
+class LibroExcel:
+    """Libro Excel parseado una sola vez y compartido entre etapas de un proceso"""
+
+    # Libros en memoria por proceso (LRU acotado para no retener archivos viejos)
+    MAX_LIBROS_EN_MEMORIA = 4
+    # Cambiar si cambia el formato de las celdas guardadas en la caché de parseo
+    VERSION_CACHE = 2
+    _libros = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, archivo_path: str):
+        self.archivo_path = archivo_path
+        self.firma = self._firma_archivo(archivo_path)
+        self.nombres_hojas: List[str] = []
+        # Celdas crudas de las hojas ya leídas, mismas conversiones que pandas con openpyxl
+        self.celdas: Dict[str, List[List]] = {}
+        # Filas superiores de hojas aún no leídas completas (selección de hoja y encabezados)
+        self._superiores: Dict[str, List[List]] = {}
+        # DataFrames ya materializados por (hoja, header)
+        self._frames: Dict[tuple, pd.DataFrame] = {}
+        # Resultados de ExcelProcessor ya calculados (datos, faltantes, header, hoja)
+        self.resultados: Dict[tuple, tuple] = {}
+        # Hoja y fila de headers detectadas por cada lector, persistidas en la caché
+        self.metadatos: Dict[str, Dict] = {}
+        self.hash_contenido: Optional[str] = None
+        self._lock_frames = threading.Lock()
+        self._lock_lectura = threading.RLock()
+        self._excel_file = None
+        self._libro_openpyxl = None
+        self._cargar()
+
+    @classmethod
+    def para_proceso(cls, proceso) -> 'LibroExcel':
+        """
+        Retorna el libro parseado del proceso, leyéndolo solo la primera vez.
+
+        Si el archivo cambió en disco (tamaño o fecha de modificación) se
+        vuelve a leer.
+        """
+        archivo_path = proceso.archivo_excel.path
+        clave = str(getattr(proceso, 'id', archivo_path))
+        with cls._lock:
+            libro = cls._libros.get(clave)
+            if libro is not None and libro.archivo_path == archivo_path and \
+                    libro.firma == cls._firma_archivo(archivo_path):
+                cls._libros.move_to_end(clave)
+                return libro
+
+        print(f"📖 Parseando libro Excel para proceso {clave}: {archivo_path}")
+        libro = cls(archivo_path)
+        with cls._lock:
+            cls._libros[clave] = libro
+            cls._libros.move_to_end(clave)
+            while len(cls._libros) > cls.MAX_LIBROS_EN_MEMORIA:
+                _, descartado = cls._libros.popitem(last=False)
+                descartado._cerrar_openpyxl()
+        return libro
+
+    @classmethod
+    def descartar(cls, proceso) -> None:
+        """Libera el libro en memoria de un proceso"""
+        with cls._lock:
+            libro = cls._libros.pop(str(getattr(proceso, 'id', '')), None)
+        if libro is not None:
+            libro._cerrar_openpyxl()
+
+    @staticmethod
+    def _firma_archivo(archivo_path: str) -> tuple:
+        try:
+            stat = os.stat(archivo_path)
+            return (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            return (None, None)
+
+    def _cargar(self) -> None:
+        """Obtiene los nombres de hojas; las celdas de cada hoja se leen al pedirlas"""
+        if not self.archivo_path.lower().endswith(('.xlsx', '.xlsm')):
+            # Formatos que openpyxl no soporta: delegar en pandas con un único ExcelFile
+            self._excel_file = pd.ExcelFile(self.archivo_path)
+            self.nombres_hojas = list(self._excel_file.sheet_names)
+            return
+
+        if self._directorio_cache():
+            try:
+                self.hash_contenido = calcular_hash_archivo(self.archivo_path)
+                if self._cargar_desde_cache():
+                    print(f"⚡ Libro Excel cargado desde caché de parseo ({self.hash_contenido[:12]})")
+                    return
+            except Exception as e:
+                self.hash_contenido = None
+                print(f"⚠️ No se pudo usar la caché de parseo: {e}")
+
+        self.nombres_hojas = list(self._abrir_openpyxl().sheetnames)
+
+    def _abrir_openpyxl(self):
+        """Libro openpyxl (read_only) abierto una vez y compartido por las lecturas de hojas"""
+        with self._lock_lectura:
+            if self._libro_openpyxl is None:
+                from openpyxl import load_workbook
+
+                # Mismos parámetros que usa pandas al leer con openpyxl
+                self._libro_openpyxl = load_workbook(
+                    self.archivo_path, read_only=True, data_only=True, keep_links=False
+                )
+            return self._libro_openpyxl
+
+    def _cerrar_openpyxl(self) -> None:
+        with self._lock_lectura:
+            if self._libro_openpyxl is not None:
+                self._libro_openpyxl.close()
+                self._libro_openpyxl = None
+
+    def _celdas_hoja(self, nombre_hoja: str) -> List[List]:
+        """Celdas completas de una hoja: memoria, caché de parseo u openpyxl, en ese orden"""
+        celdas = self.celdas.get(nombre_hoja)
+        if celdas is not None:
+            return celdas
+
+        with self._lock_lectura:
+            celdas = self.celdas.get(nombre_hoja)
+            if celdas is not None:
+                return celdas
+
+            celdas = self._cargar_hoja_desde_cache(nombre_hoja)
+            if celdas is None:
+                print(f"📄 Parseando hoja '{nombre_hoja}'")
+                celdas = self._leer_celdas_hoja(self._abrir_openpyxl()[nombre_hoja])
+                self._guardar_hoja_cache(nombre_hoja, celdas)
+
+            self._registrar_celdas(nombre_hoja, celdas)
+        return celdas
+
+    def _registrar_celdas(self, nombre_hoja: str, celdas: List[List]) -> None:
+        self.celdas[nombre_hoja] = celdas
+        self._superiores.pop(nombre_hoja, None)
+        if len(self.celdas) == len(self.nombres_hojas):
+            self._cerrar_openpyxl()
+
+    def precargar_hojas(self, nombres_hojas: List[str]) -> None:
+        """
+        Lee por adelantado las hojas indicadas.
+
+        Con EXCEL_PARSEO_PARALELO > 1 (acotado a las CPUs disponibles) y más de
+        una hoja sin leer (ni en memoria ni en la caché de parseo), cada hoja se
+        parsea en un proceso aparte y el libro queda listo en el tiempo de la
+        hoja más grande. Con una sola hoja pendiente, una sola CPU, o si el pool
+        falla, se leen en serie.
+        """
+        nombres = [nombre for nombre in dict.fromkeys(nombres_hojas) if nombre in self.nombres_hojas]
+        procesos = min(getattr(settings, 'EXCEL_PARSEO_PARALELO', 0) or 0, self._cpus_disponibles())
+        pendientes = [
+            nombre for nombre in nombres
+            if nombre not in self.celdas and not self._ruta_hoja_cache(nombre)
+        ]
+
+        if self._excel_file is None and procesos > 1 and len(pendientes) > 1:
+            try:
+                print(f"⚡ Parseando {len(pendientes)} hojas en paralelo: {pendientes}")
+                # 'spawn': el proceso de Django tiene hilos vivos, no es seguro hacer fork
+                with ProcessPoolExecutor(max_workers=min(procesos, len(pendientes)),
+                                         mp_context=multiprocessing.get_context('spawn')) as pool:
+                    futuros = {
+                        nombre: pool.submit(_parsear_hoja_serializada, self.archivo_path, nombre)
+                        for nombre in pendientes
+                    }
+                    serializadas = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+
+                with self._lock_lectura:
+                    for nombre, serializada in serializadas.items():
+                        if nombre in self.celdas:
+                            continue
+                        celdas = deserializar_celdas(serializada)
+                        self._guardar_hoja_cache(nombre, celdas, serializada)
+                        self._registrar_celdas(nombre, celdas)
+            except Exception as e:
+                print(f"⚠️ Parseo en paralelo no disponible, se continúa en serie: {e}")
+
+        for nombre in nombres:
+            self._celdas_hoja(nombre)
+
+    @staticmethod
+    def _cpus_disponibles() -> int:
+        # Cada proceso vuelve a leer sharedStrings del libro: sin CPUs libres el pool es más lento que leer en serie
+        if hasattr(os, 'sched_getaffinity'):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
+
+    def _filas_iniciales(self, nombre_hoja: str, cantidad: int) -> List[List]:
+        """
+        Primeras `cantidad` filas crudas de la hoja. Si la hoja no está leída
+        completa solo se recorren esas filas (el ancho se completa con las
+        filas leídas, por lo que puede haber menos columnas 'Unnamed:' al final).
+        """
+        celdas = self.celdas.get(nombre_hoja)
+        if celdas is None and self._ruta_hoja_cache(nombre_hoja):
+            celdas = self._celdas_hoja(nombre_hoja)
+        if celdas is not None:
+            return celdas[:cantidad]
+
+        with self._lock_lectura:
+            superiores = self._superiores.get(nombre_hoja)
+            if superiores is None or len(superiores) < cantidad:
+                superiores = self._leer_celdas_hoja(self._abrir_openpyxl()[nombre_hoja], max(cantidad, 5))
+                self._superiores[nombre_hoja] = superiores
+        return superiores[:cantidad]
+
+    # ------------------------------------------------------------------
+    # Caché de parseo en disco
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _directorio_cache() -> Optional[str]:
+        """Carpeta de la caché de parseo, o None si está desactivada"""
+        if not getattr(settings, 'EXCEL_CACHE_PARSEO', True):
+            return None
+        directorio = getattr(settings, 'EXCEL_CACHE_PARSEO_DIR', None)
+        return str(directorio) if directorio else None
+
+    def _ruta_cache(self) -> str:
+        return os.path.join(self._directorio_cache(), self.hash_contenido)
+
+    def _cargar_desde_cache(self) -> bool:
+        """Carga nombres de hojas y metadatos desde la caché; False si no existe o no sirve"""
+        ruta_indice = os.path.join(self._ruta_cache(), 'indice.json')
+        if not os.path.exists(ruta_indice):
+            return False
+
+        with open(ruta_indice, 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+        if indice.get('version') != self.VERSION_CACHE or indice.get('sha256') != self.hash_contenido:
+            return False
+
+        self.nombres_hojas = list(indice['hojas'])
+        self.metadatos = indice.get('metadatos', {})
+        # La fecha del índice marca el último uso (limpiar_cache conserva las entradas recientes)
+        try:
+            os.utime(ruta_indice)
+        except OSError:
+            pass
+        return True
+
+    def _ruta_hoja_cache(self, nombre_hoja: str) -> Optional[str]:
+        """Archivo de la hoja en la caché de parseo, o None si aún no fue guardada"""
+        if not self.hash_contenido or nombre_hoja not in self.nombres_hojas:
+            return None
+        ruta = os.path.join(self._ruta_cache(), f"hoja_{self.nombres_hojas.index(nombre_hoja)}.json")
+        return ruta if os.path.exists(ruta) else None
+
+    def _cargar_hoja_desde_cache(self, nombre_hoja: str) -> Optional[List[List]]:
+        ruta = self._ruta_hoja_cache(nombre_hoja)
+        if ruta is None:
+            return None
+        try:
+            with open(ruta, 'rb') as f:
+                return deserializar_celdas(f.read())
+        except Exception as e:
+            print(f"⚠️ No se pudo leer la hoja '{nombre_hoja}' de la caché de parseo: {e}")
+            return None
+
+    def _guardar_hoja_cache(self, nombre_hoja: str, celdas: List[List],
+                            serializada: Optional[bytes] = None) -> None:
+        """Escribe una hoja en la caché de parseo (y el índice, si todavía no existe)"""
+        if not self.hash_contenido:
+            return
+        try:
+            ruta = self._ruta_cache()
+            os.makedirs(ruta, exist_ok=True)
+            self._escribir_atomico(
+                os.path.join(ruta, f"hoja_{self.nombres_hojas.index(nombre_hoja)}.json"),
+                serializada or serializar_celdas(celdas)
+            )
+            if not os.path.exists(os.path.join(ruta, 'indice.json')):
+                self._guardar_indice_cache()
+        except Exception as e:
+            print(f"⚠️ No se pudo escribir la caché de parseo: {e}")
+
+    def _guardar_indice_cache(self) -> None:
+        indice = {
+            'version': self.VERSION_CACHE,
+            'sha256': self.hash_contenido,
+            'archivo': os.path.basename(self.archivo_path),
+            'hojas': self.nombres_hojas,
+            'metadatos': self.metadatos,
+        }
+        self._escribir_atomico(
+            os.path.join(self._ruta_cache(), 'indice.json'),
+            json.dumps(indice, ensure_ascii=False, indent=2).encode('utf-8')
+        )
+
+    @classmethod
+    def limpiar_cache(cls, dias: Optional[float] = None) -> int:
+        """
+        Borra entradas de la caché de parseo: todas, o solo las que no se usan
+        hace más de `dias` días. Borra también las carpetas '<sha256>.parseo' que
+        versiones anteriores dejaban junto a los archivos subidos (en MEDIA_ROOT).
+        Retorna cuántas entradas se borraron.
+        """
+        carpetas = []
+        directorio = getattr(settings, 'EXCEL_CACHE_PARSEO_DIR', None)
+        if directorio and os.path.isdir(directorio):
+            limite = time.time() - dias * 86400 if dias is not None else None
+            for nombre in os.listdir(directorio):
+                ruta = os.path.join(directorio, nombre)
+                if not os.path.isdir(ruta):
+                    continue
+                if limite is not None:
+                    try:
+                        usado_en = os.stat(os.path.join(ruta, 'indice.json')).st_mtime
+                    except OSError:
+                        usado_en = os.stat(ruta).st_mtime
+                    if usado_en >= limite:
+                        continue
+                carpetas.append(ruta)
+
+        subidos = os.path.join(str(settings.MEDIA_ROOT), 'uploads', 'excel')
+        if os.path.isdir(subidos):
+            carpetas.extend(
+                os.path.join(subidos, nombre) for nombre in os.listdir(subidos)
+                if nombre.endswith('.parseo') and os.path.isdir(os.path.join(subidos, nombre))
+            )
+
+        for ruta in carpetas:
+            shutil.rmtree(ruta, ignore_errors=True)
+        return len(carpetas)
+
+    @staticmethod
+    def _escribir_atomico(ruta: str, contenido: bytes) -> None:
+        ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(ruta_tmp, 'wb') as f:
+            f.write(contenido)
+        os.replace(ruta_tmp, ruta)
+
+    def registrar_metadatos(self, lector: str, hoja: str, header_row: int) -> None:
+        """
+        Guarda la hoja y la fila de headers detectadas por un lector ('estructuras',
+        'conductores', 'norma') para que una próxima carga desde caché no tenga que
+        volver a detectarlas.
+        """
+        nuevos = {'hoja': hoja, 'header_row': header_row}
+        if self.metadatos.get(lector) == nuevos:
+            return
+        self.metadatos[lector] = nuevos
+        if self.hash_contenido and os.path.isdir(self._ruta_cache()):
+            try:
+                self._guardar_indice_cache()
+            except Exception as e:
+                print(f"⚠️ No se pudieron guardar metadatos en la caché de parseo: {e}")
+
+    @classmethod
+    def _leer_celdas_hoja(cls, hoja, max_filas: Optional[int] = None) -> List[List]:
+        """
+        Extrae las celdas de una hoja igual que pandas (recorte de filas/columnas vacías).
+        Con max_filas se detiene después de esa cantidad de filas.
+        """
+        hoja.reset_dimensions()
+        data = []
+        ultima_fila_con_datos = -1
+        truncada = False
+        for numero_fila, fila in enumerate(hoja.rows):
+            if max_filas is not None and numero_fila >= max_filas:
+                truncada = True
+                break
+            fila_convertida = [cls._convertir_celda(celda) for celda in fila]
+            while fila_convertida and fila_convertida[-1] == "":
+                fila_convertida.pop()
+            if fila_convertida:
+                ultima_fila_con_datos = numero_fila
+            data.append(fila_convertida)
+        if not truncada:
+            # Las filas vacías solo se descartan al final real de la hoja
+            data = data[: ultima_fila_con_datos + 1]
+
+        if data:
+            ancho = max(len(fila) for fila in data)
+            if min(len(fila) for fila in data) < ancho:
+                data = [fila + [""] * (ancho - len(fila)) for fila in data]
+        return data
+
+    @staticmethod
+    def _convertir_celda(celda):
+        from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+        if celda.value is None:
+            return ""
+        if celda.data_type == TYPE_ERROR:
+            return np.nan
+        if celda.data_type == TYPE_NUMERIC:
+            valor = int(celda.value)
+            if valor == celda.value:
+                return valor
+            return float(celda.value)
+        return celda.value
+
+    def hoja(self, nombre_hoja: str, header: Optional[int] = 0) -> pd.DataFrame:
+        """
+        Equivalente a pd.read_excel(archivo, sheet_name=nombre_hoja, header=header)
+        pero construido desde las celdas ya leídas. Retorna una copia.
+        """
+        clave = (nombre_hoja, header)
+        with self._lock_frames:
+            df = self._frames.get(clave)
+            if df is None:
+                df = self._construir_frame(nombre_hoja, header)
+                self._frames[clave] = df
+        return df.copy()
+
+    def hojas(self, header: Optional[int] = 0) -> Dict[str, pd.DataFrame]:
+        """Equivalente a pd.read_excel(archivo, sheet_name=None, header=header)"""
+        return {nombre: self.hoja(nombre, header=header) for nombre in self.nombres_hojas}
+
+    def filas_superiores(self, nombre_hoja: str, cantidad: int = 5) -> pd.DataFrame:
+        """Primeras filas de la hoja sin encabezado (header=None), sin materializar la hoja completa"""
+        if self._excel_file is not None:
+            return self._excel_file.parse(nombre_hoja, header=None, nrows=cantidad)
+        return self._parsear_celdas(self._filas_iniciales(nombre_hoja, cantidad), None)
+
+    def encabezados(self, nombre_hoja: str, header: int) -> pd.Index:
+        """
+        Columnas que tendría la hoja leída con header=header.
+
+        Solo se parsean las filas hasta el encabezado (más una de datos), por lo
+        que evaluar varias filas candidatas no obliga a leer la hoja completa.
+        """
+        if self._excel_file is not None:
+            return self._excel_file.parse(nombre_hoja, header=header, nrows=1).columns
+        return self._parsear_celdas(self._filas_iniciales(nombre_hoja, header + 2), header).columns
+
+    def detectar_fila_encabezado(self, nombre_hoja: str, criterios, fila_defecto: int = 0) -> int:
+        """
+        Retorna la primera fila candidata cuyas columnas cumplen su criterio.
+
+        Args:
+            nombre_hoja: Hoja a evaluar
+            criterios: Lista de (fila, funcion(columnas) -> bool) en orden de prioridad.
+                Una excepción dentro del criterio se trata como "no cumple".
+            fila_defecto: Fila a usar si ningún criterio se cumple
+        """
+        for fila, criterio in criterios:
+            try:
+                if criterio(self.encabezados(nombre_hoja, fila)):
+                    return fila
+            except Exception as e:
+                print(f"⚠️ Error evaluando encabezado en fila {fila} de '{nombre_hoja}': {e}")
+        return fila_defecto
+
+    def _construir_frame(self, nombre_hoja: str, header: Optional[int]) -> pd.DataFrame:
+        if nombre_hoja not in self.nombres_hojas:
+            raise ValueError(f"Worksheet named '{nombre_hoja}' not found")
+
+        if self._excel_file is not None:
+            return self._excel_file.parse(nombre_hoja, header=header)
+
+        return self._parsear_celdas(self._celdas_hoja(nombre_hoja), header)
+
+    @staticmethod
+    def _parsear_celdas(data: List[List], header: Optional[int]) -> pd.DataFrame:
+        """Convierte celdas crudas en DataFrame con la misma inferencia de tipos de pd.read_excel"""
+        if not data:
+            return pd.DataFrame()
+        try:
+            parser = TextParser(list(data), header=header, skip_blank_lines=False)
+            return parser.read()
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+
+
+class LectorExcelStreaming:
+    """
+    Lector de hojas Excel fila a fila sobre openpyxl read_only.
+
+    No materializa DataFrames ni guarda las celdas de la hoja (a lo sumo
+    MAX_FILAS_UNA_PASADA filas): los registros se entregan uno a uno como
+    diccionarios {columna: texto}. Pensado para libros muy grandes, donde el
+    camino de LibroExcel dispara el consumo de memoria.
+
+    Los nombres de columna se calculan igual que pandas a partir de las filas
+    superiores. Los valores siguen las reglas de ExcelProcessor: vacíos y
+    valores NA quedan en '', las fechas se formatean con la función recibida
+    y el resto se convierte con str().strip(). Para que los números se vean
+    igual que con pandas, el tipo de cada columna (entero/decimal) se decide una
+    vez para toda la hoja: con las filas ya leídas si la hoja tiene hasta
+    MAX_FILAS_UNA_PASADA filas, o con una pasada previa que solo guarda
+    banderas por columna si tiene más.
+    """
+
+    # Valores que pandas interpreta como NA por defecto al leer Excel
+    VALORES_NA = {
+        '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+        '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+        'nan', 'null',
+    }
+    PATRON_NUMERICO = re.compile(r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$')
+    PATRON_ENTERO = re.compile(r'^\s*[-+]?\d+\s*$')
+    # Hojas de hasta estas filas se perfilan con las filas ya leídas (una sola pasada)
+    MAX_FILAS_UNA_PASADA = 5000
+
+    def __init__(self, archivo_path: str):
+        self.archivo_path = archivo_path
+
+    def _abrir(self):
+        from openpyxl import load_workbook
+        return load_workbook(self.archivo_path, read_only=True, data_only=True, keep_links=False)
+
+    def nombres_hojas(self) -> List[str]:
+        libro = self._abrir()
+        try:
+            return list(libro.sheetnames)
+        finally:
+            libro.close()
+
+    def celdas_superiores(self, nombre_hoja: str, cantidad: int) -> List[List]:
+        """Primeras filas crudas de la hoja (mismas conversiones que LibroExcel)"""
+        libro = self._abrir()
+        try:
+            hoja = libro[nombre_hoja]
+            hoja.reset_dimensions()
+            data = []
+            for fila in hoja.iter_rows(max_row=cantidad):
+                fila_convertida = [LibroExcel._convertir_celda(celda) for celda in fila]
+                while fila_convertida and fila_convertida[-1] == "":
+                    fila_convertida.pop()
+                data.append(fila_convertida)
+        finally:
+            libro.close()
+
+        while data and not data[-1]:
+            data.pop()
+        if data:
+            ancho = max(len(fila) for fila in data)
+            data = [fila + [""] * (ancho - len(fila)) for fila in data]
+        return data
+
+    def encabezados(self, nombre_hoja: str, header: int) -> pd.Index:
+        """Columnas de la hoja leída con header=header, parseando solo las filas superiores"""
+        return LibroExcel._parsear_celdas(self.celdas_superiores(nombre_hoja, header + 2), header).columns
+
+    def detectar_fila_encabezado(self, nombre_hoja: str, criterios, fila_defecto: int = 0) -> int:
+        """Misma detección que LibroExcel.detectar_fila_encabezado"""
+        for fila, criterio in criterios:
+            try:
+                if criterio(self.encabezados(nombre_hoja, fila)):
+                    return fila
+            except Exception as e:
+                print(f"⚠️ Error evaluando encabezado en fila {fila} de '{nombre_hoja}': {e}")
+        return fila_defecto
+
+    def iterar_registros(self, nombre_hoja: str, header_row: int, columnas=None,
+                         es_campo_fecha=None, formatear_fecha=None) -> Iterator[Dict[str, str]]:
+        """
+        Genera los registros de la hoja de forma perezosa.
+
+        Las filas vacías intermedias se conservan (como en pandas) y las vacías
+        al final de la hoja se descartan; para eso solo se cuenta cuántas filas
+        vacías van seguidas, sin guardarlas.
+        """
+        if columnas is None:
+            columnas = self.encabezados(nombre_hoja, header_row)
+        columnas = [str(col).strip() for col in columnas]
+        columnas_fecha = set()
+        if es_campo_fecha and formatear_fecha:
+            columnas_fecha = {i for i, col in enumerate(columnas) if es_campo_fecha(col)}
+
+        filas = self._iterar_filas_datos(nombre_hoja, header_row)
+        primeras = list(islice(filas, self.MAX_FILAS_UNA_PASADA + 1))
+        if len(primeras) <= self.MAX_FILAS_UNA_PASADA:
+            tipos_numericos = self._perfilar_filas(primeras)
+            filas = primeras
+        else:
+            # Hoja grande: el tipo de cada columna depende de todas sus filas (como en pandas),
+            # se decide con una pasada previa que no retiene filas
+            filas.close()
+            primeras = None
+            tipos_numericos = self._perfilar_filas(self._iterar_filas_datos(nombre_hoja, header_row))
+            filas = self._iterar_filas_datos(nombre_hoja, header_row)
+
+        for valores in filas:
+            registro = {}
+            for i in range(max(len(columnas), len(valores))):
+                col = columnas[i] if i < len(columnas) else f"Unnamed: {i}"
+                valor = valores[i] if i < len(valores) else ""
+                if self._es_na(valor):
+                    registro[col] = ""
+                    continue
+                if i in tipos_numericos:
+                    valor = self._convertir_numero(valor, tipos_numericos[i])
+                if i in columnas_fecha and valor:
+                    registro[col] = formatear_fecha(valor)
+                else:
+                    registro[col] = str(valor).strip()
+            yield registro
+
+    def _iterar_filas_datos(self, nombre_hoja: str, header_row: int) -> Iterator[List]:
+        """Filas crudas debajo del encabezado, descartando las filas vacías del final"""
+        libro = self._abrir()
+        try:
+            hoja = libro[nombre_hoja]
+            hoja.reset_dimensions()
+            filas_vacias_pendientes = 0
+            for fila in hoja.iter_rows(min_row=header_row + 2):
+                valores = [LibroExcel._convertir_celda(celda) for celda in fila]
+                while valores and valores[-1] == "":
+                    valores.pop()
+                if not valores:
+                    filas_vacias_pendientes += 1
+                    continue
+
+                while filas_vacias_pendientes:
+                    yield []
+                    filas_vacias_pendientes -= 1
+                yield valores
+        finally:
+            libro.close()
+
+    @classmethod
+    def _perfilar_filas(cls, filas: Iterable[List]) -> Dict[int, str]:
+        """
+        Tipo numérico que pandas le daría a cada columna de las filas ('int' o
+        'float'), guardando solo banderas por columna. Así un entero en una
+        columna con vacíos se entrega como '5.0', igual que con read_excel.
+        """
+        no_numericas = set()
+        con_float = set()
+        con_valor = set()
+        ancho_minimo = None
+        for valores in filas:
+            ancho_minimo = len(valores) if ancho_minimo is None else min(ancho_minimo, len(valores))
+            for i, valor in enumerate(valores):
+                if i in no_numericas:
+                    continue
+                if cls._es_na(valor):
+                    con_float.add(i)  # Un vacío en columna numérica la vuelve float
+                    continue
+                con_valor.add(i)
+                if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+                    no_numericas.add(i)
+                elif isinstance(valor, float):
+                    con_float.add(i)
+                elif isinstance(valor, str):
+                    if not cls.PATRON_NUMERICO.match(valor):
+                        no_numericas.add(i)
+                    elif not cls.PATRON_ENTERO.match(valor):
+                        con_float.add(i)
+
+        tipos = {}
+        for i in con_valor - no_numericas:
+            faltan_celdas = ancho_minimo is not None and i >= ancho_minimo
+            tipos[i] = 'float' if (i in con_float or faltan_celdas) else 'int'
+        return tipos
+
+    @staticmethod
+    def _convertir_numero(valor, tipo: str):
+        try:
+            if tipo == 'int':
+                return int(valor) if not isinstance(valor, int) else valor
+            return float(valor)
+        except (TypeError, ValueError):
+            return valor
+
+    @classmethod
+    def _es_na(cls, valor) -> bool:
+        if valor is None:
+            return True
+        if isinstance(valor, float) and np.isnan(valor):
+            return True
+        if isinstance(valor, str) and valor in cls.VALORES_NA:
+            return True
+        return False
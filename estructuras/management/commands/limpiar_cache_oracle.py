@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from estructuras.cache_oracle import CacheOracle
+
+
+class Command(BaseCommand):
+    help = "Borra la caché local de consultas Oracle (ConsultaOracleCache): todo, una entidad o solo lo vencido."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entidad', help="Solo este tipo de consulta (fid_codigo, fid_enlace, datos_txt, norma_fid, conductor_codigo)")
+        parser.add_argument('--vencidas', action='store_true', help="Solo las entradas que ya superaron su vigencia")
+
+    def handle(self, *args, **options):
+        borradas = CacheOracle.limpiar(entidad=options['entidad'], solo_vencidas=options['vencidas'])
+        self.stdout.write(self.style.SUCCESS(f"{borradas} entradas borradas de la caché Oracle"))
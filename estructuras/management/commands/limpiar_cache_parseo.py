@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from estructuras.libro_excel import LibroExcel
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra la caché de parseo de Excel (EXCEL_CACHE_PARSEO_DIR): todo o solo las entradas "
+        "sin uso en EXCEL_CACHE_PARSEO_DIAS. Borra también las carpetas *.parseo antiguas de MEDIA_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vencidas', action='store_true',
+                            help="Solo las entradas sin uso en EXCEL_CACHE_PARSEO_DIAS (o --dias)")
+        parser.add_argument('--dias', type=float, help="Plazo en días para --vencidas")
+
+    def handle(self, *args, **options):
+        dias = None
+        if options['vencidas'] or options['dias'] is not None:
+            dias = options['dias'] if options['dias'] is not None else getattr(settings, 'EXCEL_CACHE_PARSEO_DIAS', 30)
+        borradas = LibroExcel.limpiar_cache(dias=dias)
+        self.stdout.write(self.style.SUCCESS(f"{borradas} entradas borradas de la caché de parseo"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from estructuras.esquema_oracle import CANDIDATOS_COLUMNAS, EsquemaOracle
+from estructuras.services import OracleHelper
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelve a leer de USER_TAB_COLUMNS las columnas opcionales de CCOMUN y EPOSTE_AT "
+        "y actualiza el catálogo compartido (ORACLE_ESQUEMA_ARCHIVO). Los procesos en "
+        "marcha lo recargan en su siguiente consulta."
+    )
+
+    def handle(self, *args, **options):
+        try:
+            with OracleHelper.conexion() as connection:
+                with connection.cursor() as cursor:
+                    esquema = EsquemaOracle.refrescar(cursor)
+        except Exception as e:
+            raise CommandError(f"No se pudo conectar a Oracle: {e}")
+
+        if esquema is None:
+            raise CommandError("No se pudo leer USER_TAB_COLUMNS; el catálogo no cambió")
+
+        for campo, (tabla, _) in CANDIDATOS_COLUMNAS.items():
+            columna = esquema.columna(campo)
+            self.stdout.write(f"  {campo:<16} {tabla}.{columna}" if columna else f"  {campo:<16} (sin columna en {tabla})")
+        self.stdout.write(self.style.SUCCESS("Catálogo de esquema Oracle actualizado"))
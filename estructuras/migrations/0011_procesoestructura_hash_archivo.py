@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estructuras', '0010_add_clasificacion_automatica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='procesoestructura',
+            name='hash_archivo',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estructuras', '0011_procesoestructura_hash_archivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='procesoestructura',
+            name='auditoria_clasificacion',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
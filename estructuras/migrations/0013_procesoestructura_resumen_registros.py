@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estructuras', '0012_procesoestructura_auditoria_clasificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='procesoestructura',
+            name='resumen_registros',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+REGISTROS_POR_BLOQUE = 500
+
+
+def mover_registros_a_bloques(apps, schema_editor):
+    """Copia datos_excel/datos_norma de cada proceso a BloqueRegistros"""
+    ProcesoEstructura = apps.get_model('estructuras', 'ProcesoEstructura')
+    BloqueRegistros = apps.get_model('estructuras', 'BloqueRegistros')
+    
+    procesos = ProcesoEstructura.objects.only('id', 'datos_excel', 'datos_norma')
+    for proceso in procesos.iterator(chunk_size=20):
+        bloques = []
+        for tipo, registros in (('excel', proceso.datos_excel or []), ('norma', proceso.datos_norma or [])):
+            for numero, inicio in enumerate(range(0, len(registros), REGISTROS_POR_BLOQUE)):
+                bloque = registros[inicio:inicio + REGISTROS_POR_BLOQUE]
+                bloques.append(BloqueRegistros(
+                    proceso_id=proceso.id, tipo=tipo, numero=numero, inicio=inicio,
+                    cantidad=len(bloque), registros=bloque
+                ))
+        BloqueRegistros.objects.bulk_create(bloques, batch_size=50)
+
+
+def devolver_registros_al_proceso(apps, schema_editor):
+    """Reversa: reconstruye datos_excel/datos_norma desde los bloques"""
+    ProcesoEstructura = apps.get_model('estructuras', 'ProcesoEstructura')
+    BloqueRegistros = apps.get_model('estructuras', 'BloqueRegistros')
+    
+    for proceso in ProcesoEstructura.objects.only('id').iterator(chunk_size=20):
+        datos = {'excel': [], 'norma': []}
+        bloques = BloqueRegistros.objects.filter(proceso_id=proceso.id).order_by('tipo', 'numero')
+        for tipo, registros in bloques.values_list('tipo', 'registros'):
+            datos[tipo].extend(registros)
+        ProcesoEstructura.objects.filter(id=proceso.id).update(datos_excel=datos['excel'], datos_norma=datos['norma'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estructuras', '0013_procesoestructura_resumen_registros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloqueRegistros',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('excel', 'Datos Excel'), ('norma', 'Datos Norma')], max_length=10)),
+                ('numero', models.IntegerField()),
+                ('inicio', models.IntegerField()),
+                ('cantidad', models.IntegerField(default=0)),
+                ('registros', models.JSONField(blank=True, default=list)),
+                ('proceso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bloques_registros', to='estructuras.procesoestructura')),
+            ],
+            options={
+                'verbose_name': 'Bloque de Registros',
+                'verbose_name_plural': 'Bloques de Registros',
+                'ordering': ['proceso', 'tipo', 'numero'],
+                'constraints': [models.UniqueConstraint(fields=('proceso', 'tipo', 'numero'), name='bloque_registros_unico')],
+            },
+        ),
+        migrations.RunPython(mover_registros_a_bloques, devolver_registros_al_proceso),
+        migrations.RemoveField(
+            model_name='procesoestructura',
+            name='datos_excel',
+        ),
+        migrations.RemoveField(
+            model_name='procesoestructura',
+            name='datos_norma',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estructuras', '0014_bloqueregistros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaOracleCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(max_length=30)),
+                ('clave', models.CharField(max_length=255)),
+                ('valor', models.JSONField(blank=True, null=True)),
+                ('consultado_en', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Consulta Oracle en Caché',
+                'verbose_name_plural': 'Consultas Oracle en Caché',
+                'constraints': [models.UniqueConstraint(fields=('entidad', 'clave'), name='consulta_oracle_cache_unica')],
+            },
+        ),
+    ]
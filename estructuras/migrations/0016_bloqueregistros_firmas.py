@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estructuras', '0015_consultaoraclecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloqueregistros',
+            name='firmas',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
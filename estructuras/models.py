@@ -1,4 +1,12 @@
-from django.db import models
+from bisect import bisect_right
+import hashlib
+import json
+from typing import Dict, Iterator, List
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
 import uuid
 
 class ProcesoEstructura(models.Model):
@@ -15,6 +23,7 @@ class ProcesoEstructura(models.Model):
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     archivo_excel = models.FileField(upload_to='uploads/excel/')
+    hash_archivo = models.CharField(max_length=64, blank=True, db_index=True)  # SHA-256 del Excel (deduplicación de cargas)
     estado = models.CharField(max_length=20, choices=ESTADOS, default='INICIADO')
     circuito = models.CharField(max_length=100, blank=True)
     
@@ -34,12 +43,13 @@ class ProcesoEstructura(models.Model):
     registros_procesados = models.IntegerField(default=0)
     errores = models.JSONField(default=list, blank=True)
     
-    # Datos procesados (almacenados temporalmente para completar campos)
-    datos_excel = models.JSONField(default=list, blank=True)
-    datos_norma = models.JSONField(default=list, blank=True)
+    # Datos procesados (almacenados temporalmente para completar campos).
+    # datos_excel y datos_norma se guardan por bloques en BloqueRegistros (ver propiedades abajo)
     campos_faltantes = models.JSONField(default=dict, blank=True)
     archivos_generados = models.JSONField(default=dict, blank=True)  # {'txt': 'filename.txt', 'xml': 'filename.xml'}
     estadisticas_clasificacion = models.JSONField(default=dict, blank=True)  # Estadísticas de aplicación de reglas
+    auditoria_clasificacion = models.JSONField(default=dict, blank=True)  # Modo, versión de reglas y fecha del último lote clasificado
+    resumen_registros = models.JSONField(default=dict, blank=True)  # Conteos de datos_excel/datos_norma (ResumenRegistros)
     
     # Control de propietarios
     propietario_definido = models.CharField(max_length=50, blank=True)  # Propietario asignado por el usuario
@@ -97,6 +107,354 @@ class ProcesoEstructura(models.Model):
         else:
             return f"Proceso {self.estado} - {self.registros_totales} registros"
     
+    # ------------------------------------------------------------------
+    # Registros (datos_excel / datos_norma) guardados en BloqueRegistros
+    # ------------------------------------------------------------------
+    # Los registros no viajan en la fila del proceso: el sondeo de estado y los
+    # cambios de estado leen y escriben solo los campos de control. datos_excel y
+    # datos_norma se cargan al primer acceso; save() compara cada bloque con la
+    # huella del que está guardado y reescribe solo los bloques que cambiaron,
+    # tanto si se reasignó la lista como si se modificó en el lugar.
+    # firmas_norma (firma de clasificación de cada registro de datos_norma) se
+    # guarda en los mismos bloques, fuera de los registros.
+    # Las cargas grandes escriben los bloques lote a lote con vaciar_registros /
+    # agregar_registros, sin tener la lista completa en memoria.
+    TIPOS_REGISTROS = ('excel', 'norma')
+    
+    @property
+    def datos_excel(self) -> List[Dict]:
+        return self._obtener_registros('excel')
+    
+    @datos_excel.setter
+    def datos_excel(self, registros):
+        self._asignar_registros('excel', registros)
+    
+    @property
+    def datos_norma(self) -> List[Dict]:
+        return self._obtener_registros('norma')
+    
+    @datos_norma.setter
+    def datos_norma(self, registros):
+        self._asignar_registros('norma', registros)
+    
+    @property
+    def firmas_norma(self) -> List[str]:
+        """Firmas de clasificación de datos_norma, en el mismo orden (ClasificadorEstructuras.firmas_lote)"""
+        self._obtener_registros('norma')
+        return self._registros_en_memoria()['norma'][2]
+    
+    @firmas_norma.setter
+    def firmas_norma(self, firmas):
+        self._obtener_registros('norma')
+        self._registros_en_memoria()['norma'][2] = list(firmas or [])
+    
+    def _registros_en_memoria(self) -> Dict:
+        # tipo -> [lista actual, {numero: (id, inicio, cantidad, huella registros, huella firmas)}
+        #          de los bloques guardados o None si no se leyeron, firmas actuales]
+        return self.__dict__.setdefault('_cache_registros', {})
+    
+    @staticmethod
+    def _huella_bloque(registros: List[Dict]) -> str:
+        return hashlib.sha1(json.dumps(registros, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _completar_firmas(firmas: List[str], cantidad: int) -> List[str]:
+        # Bloques sin firmas (o incompletas): firma vacía para esos registros
+        return (list(firmas) + [''] * cantidad)[:cantidad]
+    
+    def _obtener_registros(self, tipo: str) -> List[Dict]:
+        en_memoria = self._registros_en_memoria()
+        if tipo not in en_memoria:
+            registros = []
+            firmas = []
+            guardados = {}
+            if not self._state.adding:
+                bloques = self._bloques(tipo).values_list('numero', 'id', 'inicio', 'cantidad', 'registros', 'firmas')
+                for numero, bloque_id, inicio, cantidad, registros_bloque, firmas_bloque in bloques.iterator(chunk_size=20):
+                    firmas_bloque = self._completar_firmas(firmas_bloque, cantidad)
+                    guardados[numero] = (bloque_id, inicio, cantidad,
+                                         self._huella_bloque(registros_bloque), self._huella_bloque(firmas_bloque))
+                    registros.extend(registros_bloque)
+                    firmas.extend(firmas_bloque)
+            en_memoria[tipo] = [registros, guardados, firmas]
+        return en_memoria[tipo][0]
+    
+    def _asignar_registros(self, tipo: str, registros) -> None:
+        en_memoria = self._registros_en_memoria()
+        guardados = en_memoria[tipo][1] if tipo in en_memoria else None
+        # Las firmas eran de los registros anteriores: se asignan de nuevo después (firmas_norma)
+        en_memoria[tipo] = [registros if registros is not None else [], guardados, []]
+    
+    def save(self, *args, **kwargs):
+        # Los tipos leídos o asignados; _guardar_registros decide qué bloques cambiaron
+        tipos = [tipo for tipo in self.TIPOS_REGISTROS if tipo in self._registros_en_memoria()]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # datos_excel/datos_norma no son columnas: se guardan aparte si se pidieron
+            campos = set(update_fields)
+            tipos = [tipo for tipo in tipos if f'datos_{tipo}' in campos]
+            kwargs['update_fields'] = [campo for campo in update_fields if campo not in ('datos_excel', 'datos_norma')]
+        
+        if not tipos:
+            return super().save(*args, **kwargs)
+        
+        with transaction.atomic(using=kwargs.get('using') or self._state.db):
+            super().save(*args, **kwargs)
+            for tipo in tipos:
+                self._guardar_registros(tipo)
+    
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        # Los registros en memoria se vuelven a leer al próximo acceso
+        self._registros_en_memoria().clear()
+    
+    def _guardar_registros(self, tipo: str) -> None:
+        """Escribe los bloques del tipo cuyo contenido difiere del guardado (inserción/actualización masiva)"""
+        registros, guardados, firmas = self._registros_en_memoria()[tipo]
+        tamano = max(int(getattr(settings, 'REGISTROS_POR_BLOQUE', 500)), 1)
+        
+        if guardados is None:
+            # Lista asignada sin haber leído los bloques: se reemplazan todos
+            BloqueRegistros.objects.filter(proceso=self, tipo=tipo).delete()
+            guardados = {}
+        
+        nuevos, actuales = [], {}
+        modificados = {}  # campos a actualizar -> bloques
+        for numero, inicio in enumerate(range(0, len(registros), tamano)):
+            registros_bloque = registros[inicio:inicio + tamano]
+            firmas_bloque = firmas[inicio:inicio + tamano]
+            huellas = (self._huella_bloque(registros_bloque), self._huella_bloque(firmas_bloque))
+            previo = guardados.get(numero)
+            if previo is not None and previo[1:] == (inicio, len(registros_bloque)) + huellas:
+                actuales[numero] = previo
+                continue
+            bloque = BloqueRegistros(
+                proceso=self, tipo=tipo, numero=numero, inicio=inicio,
+                cantidad=len(registros_bloque), registros=registros_bloque, firmas=firmas_bloque
+            )
+            if previo is not None:
+                bloque.id = previo[0]
+                campos = ('inicio', 'cantidad')
+                if previo[3] != huellas[0]:
+                    campos += ('registros',)
+                if previo[4] != huellas[1]:
+                    campos += ('firmas',)
+                modificados.setdefault(campos, []).append(bloque)
+            else:
+                nuevos.append(bloque)
+            actuales[numero] = (bloque.id, inicio, len(registros_bloque)) + huellas
+        
+        sobrantes = [previo[0] for numero, previo in guardados.items() if numero not in actuales]
+        if sobrantes:
+            BloqueRegistros.objects.filter(id__in=sobrantes).delete()
+        for campos, bloques in modificados.items():
+            BloqueRegistros.objects.bulk_update(bloques, list(campos), batch_size=50)
+        if nuevos:
+            BloqueRegistros.objects.bulk_create(nuevos, batch_size=50)
+            ids = dict(self._bloques(tipo).filter(numero__in=[b.numero for b in nuevos]).values_list('numero', 'id'))
+            for bloque in nuevos:
+                actuales[bloque.numero] = (ids[bloque.numero],) + actuales[bloque.numero][1:]
+        
+        self._registros_en_memoria()[tipo][1] = actuales
+    
+    def _bloques(self, tipo: str):
+        return BloqueRegistros.objects.filter(proceso_id=self.pk, tipo=tipo).order_by('numero')
+    
+    def iterar_registros(self, tipo: str) -> Iterator[Dict]:
+        """Recorre los registros del tipo ('excel' o 'norma') bloque a bloque, sin cargarlos todos"""
+        en_memoria = self._registros_en_memoria().get(tipo)
+        if en_memoria is not None:
+            yield from en_memoria[0]
+            return
+        if self._state.adding:
+            return
+        for registros in self._bloques(tipo).values_list('registros', flat=True).iterator(chunk_size=20):
+            yield from registros
+    
+    def contar_registros(self, tipo: str) -> int:
+        en_memoria = self._registros_en_memoria().get(tipo)
+        if en_memoria is not None:
+            return len(en_memoria[0])
+        if self._state.adding:
+            return 0
+        return self._bloques(tipo).aggregate(total=Sum('cantidad'))['total'] or 0
+    
+    def tiene_registros(self, tipo: str) -> bool:
+        en_memoria = self._registros_en_memoria().get(tipo)
+        if en_memoria is not None:
+            return bool(en_memoria[0])
+        return not self._state.adding and self._bloques(tipo).exists()
+    
+    def obtener_registros(self, tipo: str, inicio: int, fin: int) -> List[Dict]:
+        """Registros [inicio, fin) del tipo, leyendo solo los bloques que los contienen"""
+        en_memoria = self._registros_en_memoria().get(tipo)
+        if en_memoria is not None:
+            return en_memoria[0][inicio:fin]
+        if self._state.adding or fin <= inicio:
+            return []
+        
+        bloques = self._bloques(tipo).alias(fin_bloque=F('inicio') + F('cantidad')).filter(
+            inicio__lt=fin, fin_bloque__gt=inicio
+        ).values_list('inicio', 'registros')
+        registros = []
+        primero = None
+        for inicio_bloque, registros_bloque in bloques:
+            if primero is None:
+                primero = inicio_bloque
+            registros.extend(registros_bloque)
+        if primero is None:
+            return []
+        return registros[inicio - primero:fin - primero]
+    
+    def actualizar_registros(self, tipo: str, cambios: Dict[int, Dict]) -> None:
+        """
+        Actualiza campos de registros puntuales: {índice: {campo: valor}}.
+        Solo se reescriben los bloques que contienen esos registros.
+        """
+        if not cambios:
+            return
+        self._aplicar_en_memoria(tipo, cambios)
+        
+        ubicaciones = list(self._bloques(tipo).values_list('inicio', 'id'))
+        inicios = [inicio for inicio, _ in ubicaciones]
+        por_bloque = {}
+        for indice, campos in cambios.items():
+            posicion = bisect_right(inicios, indice) - 1
+            if posicion < 0:
+                raise IndexError(f"Registro {indice} fuera de rango en datos_{tipo}")
+            inicio, bloque_id = ubicaciones[posicion]
+            por_bloque.setdefault(bloque_id, {})[indice - inicio] = campos
+        
+        bloques = list(BloqueRegistros.objects.filter(id__in=por_bloque))
+        for bloque in bloques:
+            for posicion, campos in por_bloque[bloque.id].items():
+                if posicion >= bloque.cantidad:
+                    raise IndexError(f"Registro {bloque.inicio + posicion} fuera de rango en datos_{tipo}")
+                bloque.registros[posicion].update(campos)
+        BloqueRegistros.objects.bulk_update(bloques, ['registros'], batch_size=50)
+        self._actualizar_huellas(tipo, bloques)
+    
+    def asignar_campos_registros(self, tipo: str, campos: Dict) -> int:
+        """Asigna los mismos valores de campo a todos los registros del tipo; devuelve cuántos se actualizaron"""
+        en_memoria = self._registros_en_memoria().get(tipo)
+        if en_memoria is not None:
+            for registro in en_memoria[0]:
+                registro.update(campos)
+        if self._state.adding:
+            return len(en_memoria[0]) if en_memoria is not None else 0
+        
+        total = 0
+        ids = list(self._bloques(tipo).values_list('id', flat=True))
+        for desde in range(0, len(ids), 20):
+            bloques = list(BloqueRegistros.objects.filter(id__in=ids[desde:desde + 20]))
+            for bloque in bloques:
+                for registro in bloque.registros:
+                    registro.update(campos)
+                total += bloque.cantidad
+            BloqueRegistros.objects.bulk_update(bloques, ['registros'], batch_size=50)
+            self._actualizar_huellas(tipo, bloques)
+        return total
+    
+    def vaciar_registros(self, tipo: str) -> None:
+        """Borra los registros guardados del tipo (antes de cargarlos de nuevo con agregar_registros)"""
+        self._registros_en_memoria().pop(tipo, None)
+        if not self._state.adding:
+            BloqueRegistros.objects.filter(proceso=self, tipo=tipo).delete()
+    
+    def agregar_registros(self, tipo: str, registros: List[Dict], firmas: List[str] = None) -> None:
+        """
+        Agrega registros (y sus firmas) al final de los guardados del tipo,
+        escribiendo sus bloques de inmediato sin retenerlos en memoria. Para
+        cargas por lotes; con lotes múltiplos de REGISTROS_POR_BLOQUE los
+        bloques quedan iguales a los que escribiría save().
+        """
+        if not registros:
+            return
+        # Los registros en memoria dejarían de coincidir con los guardados: se releen al próximo acceso
+        self._registros_en_memoria().pop(tipo, None)
+        tamano = max(int(getattr(settings, 'REGISTROS_POR_BLOQUE', 500)), 1)
+        guardados = self._bloques(tipo).aggregate(numero=Max('numero'), total=Sum('cantidad'))
+        numero = guardados['numero'] + 1 if guardados['numero'] is not None else 0
+        total = guardados['total'] or 0
+        firmas = self._completar_firmas(firmas, len(registros)) if firmas else []
+        
+        BloqueRegistros.objects.bulk_create([
+            BloqueRegistros(
+                proceso=self, tipo=tipo, numero=numero + i, inicio=total + desde,
+                cantidad=len(registros[desde:desde + tamano]),
+                registros=registros[desde:desde + tamano], firmas=firmas[desde:desde + tamano]
+            )
+            for i, desde in enumerate(range(0, len(registros), tamano))
+        ], batch_size=50)
+    
+    def _actualizar_huellas(self, tipo: str, bloques: List['BloqueRegistros']) -> None:
+        # Bloques ya escritos: save() no debe volver a escribirlos
+        en_memoria = self._registros_en_memoria().get(tipo)
+        if en_memoria is None or en_memoria[1] is None:
+            return
+        for bloque in bloques:
+            en_memoria[1][bloque.numero] = (bloque.id, bloque.inicio, bloque.cantidad,
+                                            self._huella_bloque(bloque.registros),
+                                            self._huella_bloque(self._completar_firmas(bloque.firmas, bloque.cantidad)))
+    
+    def _aplicar_en_memoria(self, tipo: str, cambios: Dict[int, Dict]) -> None:
+        en_memoria = self._registros_en_memoria().get(tipo)
+        if en_memoria is None:
+            return
+        for indice, campos in cambios.items():
+            if 0 <= indice < len(en_memoria[0]):
+                en_memoria[0][indice].update(campos)
+    
+    # ------------------------------------------------------------------
+    # Escrituras puntuales: solo las columnas que cambian
+    # ------------------------------------------------------------------
+    def guardar_campos(self, *campos: str) -> None:
+        """Guarda solo los campos indicados (y updated_at) en lugar de la fila completa"""
+        update_fields = list(dict.fromkeys(campos))
+        if 'updated_at' not in update_fields:
+            update_fields.append('updated_at')
+        self.save(update_fields=update_fields)
+    
+    def cambiar_estado(self, estado: str, **campos) -> None:
+        """Cambia el estado (y los campos dados) guardando solo esas columnas"""
+        self.estado = estado
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+        self.guardar_campos('estado', *campos)
+    
+    def registrar_errores(self, errores: List, estado: str = 'ERROR') -> None:
+        """Guarda los errores del proceso y lo deja en `estado`"""
+        self.cambiar_estado(estado, errores=list(errores))
+    
+    def registrar_archivo(self, tipo_archivo: str, nombre: str) -> None:
+        """Registra un archivo generado (archivos_generados[tipo_archivo] = nombre)"""
+        if not self.archivos_generados:
+            self.archivos_generados = {}
+        self.archivos_generados[tipo_archivo] = nombre
+        self.guardar_campos('archivos_generados')
+    
+    def actualizar_progreso(self, registros_procesados: int, forzar: bool = False) -> None:
+        """
+        Actualiza registros_procesados en memoria y lo guarda cada
+        PROGRESO_INTERVALO_REGISTROS registros o PROGRESO_INTERVALO_SEGUNDOS
+        segundos (siempre al llegar al total o con forzar=True).
+        """
+        self.registros_procesados = registros_procesados
+        ultimo_registros, ultimo_momento = self.__dict__.get('_ultimo_progreso', (0, None))
+        ahora = timezone.now()
+        
+        intervalo_registros = getattr(settings, 'PROGRESO_INTERVALO_REGISTROS', 1000)
+        intervalo_segundos = getattr(settings, 'PROGRESO_INTERVALO_SEGUNDOS', 2)
+        if not (forzar
+                or ultimo_momento is None
+                or registros_procesados >= self.registros_totales
+                or registros_procesados - ultimo_registros >= intervalo_registros
+                or (ahora - ultimo_momento).total_seconds() >= intervalo_segundos):
+            return
+        
+        self.guardar_campos('registros_procesados')
+        self.__dict__['_ultimo_progreso'] = (registros_procesados, ahora)
+    
     @property
     def progreso_porcentaje(self):
         if self.registros_totales > 0:
@@ -119,3 +477,48 @@ class ProcesoEstructura(models.Model):
             return " + ".join(tipos_detectados) if tipos_detectados else "Sin clasificar"
         else:
             return f"Procesando... ({self.registros_totales} registros)"
+
+
+class BloqueRegistros(models.Model):
+    """Bloque consecutivo de registros (datos_excel o datos_norma) de un proceso"""
+    TIPOS = [
+        ('excel', 'Datos Excel'),
+        ('norma', 'Datos Norma'),
+    ]
+    
+    proceso = models.ForeignKey(ProcesoEstructura, on_delete=models.CASCADE, related_name='bloques_registros')
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    numero = models.IntegerField()  # Orden del bloque dentro del tipo
+    inicio = models.IntegerField()  # Índice del primer registro del bloque
+    cantidad = models.IntegerField(default=0)
+    registros = models.JSONField(default=list, blank=True)
+    firmas = models.JSONField(default=list, blank=True)  # Firma de clasificación de cada registro (solo datos_norma)
+    
+    class Meta:
+        verbose_name = "Bloque de Registros"
+        verbose_name_plural = "Bloques de Registros"
+        ordering = ['proceso', 'tipo', 'numero']
+        constraints = [
+            models.UniqueConstraint(fields=['proceso', 'tipo', 'numero'], name='bloque_registros_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.proceso_id} {self.tipo} [{self.inicio}:{self.inicio + self.cantidad}]"
+
+
+class ConsultaOracleCache(models.Model):
+    """Resultado de una consulta de referencia a Oracle guardado localmente (estructuras/cache_oracle.py)"""
+    entidad = models.CharField(max_length=30)  # Tipo de consulta (claves de ORACLE_CACHE_TTL_DIAS)
+    clave = models.CharField(max_length=255)  # Código operativo, ENLACE o FID
+    valor = models.JSONField(null=True, blank=True)  # None: Oracle no encontró la clave (caché negativa)
+    consultado_en = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Consulta Oracle en Caché"
+        verbose_name_plural = "Consultas Oracle en Caché"
+        constraints = [
+            models.UniqueConstraint(fields=['entidad', 'clave'], name='consulta_oracle_cache_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.entidad}:{self.clave}"
@@ -0,0 +1,185 @@
+"""
+Resumen de los registros de un proceso en una sola pasada.
+
+La página de detalle y completar_campos necesitan varios conteos sobre los
+mismos registros: tipos y grupos (estadísticas de clasificación), propietarios
+encontrados y si hay ESTADO_SALUD vacío en los datos del Excel. Antes cada
+consulta recorría todos los registros por separado y en cada carga de página.
+
+ResumenRegistros junta esos conteos en un recorrido, se guarda en el proceso
+(ProcesoEstructura.resumen_registros) cuando se producen los datos y se
+actualiza cuando cambian, de modo que las vistas leen números ya calculados.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+
+class ResumenRegistros:
+    """Conteos de datos_excel y datos_norma de un proceso"""
+
+    # Se incrementa si cambian los conteos guardados; los resúmenes de otra versión se recalculan
+    VERSION = 1
+
+    def __init__(self):
+        self.total_excel = 0
+        self.estado_salud_vacio = 0
+        self._reiniciar_norma()
+
+    def _reiniciar_norma(self):
+        self.total_norma = 0
+        self.por_tipo = Counter()
+        self.por_grupo = Counter()
+        self.por_tipo_clasificado = Counter()
+        self.con_observacion_clasificacion = 0
+        self.propietarios = Counter()
+        self.sin_propietario = 0
+
+    @classmethod
+    def calcular(cls, datos_excel: Optional[Iterable[Dict]] = None,
+                 datos_norma: Optional[Iterable[Dict]] = None) -> 'ResumenRegistros':
+        """Resumen de ambas listas de registros (una pasada por lista)"""
+        resumen = cls()
+        for registro in datos_excel or ():
+            resumen.agregar_excel(registro)
+        for registro in datos_norma or ():
+            resumen.agregar_norma(registro)
+        return resumen
+
+    # ------------------------------------------------------------------
+    # Actualización
+    # ------------------------------------------------------------------
+    def agregar_excel(self, registro: Dict, signo: int = 1) -> None:
+        """Suma (signo=1) o resta (signo=-1) un registro de datos_excel"""
+        self.total_excel += signo
+        if self._estado_salud_vacio(registro.get('ESTADO_SALUD')):
+            self.estado_salud_vacio += signo
+
+    def agregar_norma(self, registro: Dict, signo: int = 1) -> None:
+        """Suma (signo=1) o resta (signo=-1) un registro de datos_norma"""
+        self.total_norma += signo
+        self.por_tipo[registro.get('TIPO', 'SIN_TIPO')] += signo
+        self.por_grupo[registro.get('GRUPO', 'SIN_GRUPO')] += signo
+        self.por_tipo_clasificado[registro.get('TIPO_CLASIFICADO', 'SIN_CLASIFICACION')] += signo
+        if registro.get('OBSERVACION_CLASIFICACION'):
+            self.con_observacion_clasificacion += signo
+
+        propietario = registro.get('PROPIETARIO', '')
+        propietario = str(propietario).strip() if propietario is not None else ''
+        if propietario:
+            self.propietarios[propietario] += signo
+        else:
+            self.sin_propietario += signo
+
+    def reemplazar_norma(self, datos_norma: Iterable[Dict]) -> None:
+        """Recalcula solo la parte de datos_norma (datos_excel no cambió)"""
+        self._reiniciar_norma()
+        for registro in datos_norma:
+            self.agregar_norma(registro)
+
+    def asignar_propietario(self, propietario: str) -> None:
+        """Refleja que el mismo propietario se aplicó a todos los registros de datos_norma"""
+        propietario = str(propietario).strip()
+        self.propietarios = Counter({propietario: self.total_norma} if propietario and self.total_norma else {})
+        self.sin_propietario = 0 if propietario else self.total_norma
+
+    @staticmethod
+    def _estado_salud_vacio(valor) -> bool:
+        return not valor or (isinstance(valor, str) and valor.strip() == '')
+
+    # ------------------------------------------------------------------
+    # Persistencia (JSONField del proceso)
+    # ------------------------------------------------------------------
+    def a_dict(self) -> Dict:
+        return {
+            'version': self.VERSION,
+            'excel': {
+                'total': self.total_excel,
+                'estado_salud_vacio': self.estado_salud_vacio,
+            },
+            'norma': {
+                'total': self.total_norma,
+                'por_tipo': self._sin_ceros(self.por_tipo),
+                'por_grupo': self._sin_ceros(self.por_grupo),
+                'por_tipo_clasificado': self._sin_ceros(self.por_tipo_clasificado),
+                'con_observacion_clasificacion': self.con_observacion_clasificacion,
+                'propietarios': self._sin_ceros(self.propietarios),
+                'sin_propietario': self.sin_propietario,
+            },
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: Optional[Dict]) -> Optional['ResumenRegistros']:
+        """Resumen guardado, o None si no existe o es de otra versión"""
+        if not datos or datos.get('version') != cls.VERSION:
+            return None
+        resumen = cls()
+        excel = datos.get('excel', {})
+        norma = datos.get('norma', {})
+        resumen.total_excel = excel.get('total', 0)
+        resumen.estado_salud_vacio = excel.get('estado_salud_vacio', 0)
+        resumen.total_norma = norma.get('total', 0)
+        resumen.por_tipo = Counter(norma.get('por_tipo', {}))
+        resumen.por_grupo = Counter(norma.get('por_grupo', {}))
+        resumen.por_tipo_clasificado = Counter(norma.get('por_tipo_clasificado', {}))
+        resumen.con_observacion_clasificacion = norma.get('con_observacion_clasificacion', 0)
+        resumen.propietarios = Counter(norma.get('propietarios', {}))
+        resumen.sin_propietario = norma.get('sin_propietario', 0)
+        return resumen
+
+    @staticmethod
+    def _sin_ceros(contador: Counter) -> Dict:
+        return {clave: cantidad for clave, cantidad in contador.items() if cantidad}
+
+    # ------------------------------------------------------------------
+    # Vistas derivadas (mismo formato que los métodos de ClasificadorEstructuras)
+    # ------------------------------------------------------------------
+    @property
+    def tiene_estado_salud_vacio(self) -> bool:
+        return self.estado_salud_vacio > 0
+
+    def propietarios_info(self) -> Dict:
+        """Formato de ClasificadorEstructuras.verificar_propietarios_en_excel"""
+        propietarios_unicos = [nombre for nombre, cantidad in self.propietarios.items() if cantidad]
+        return {
+            'tiene_propietarios': len(propietarios_unicos) > 0,
+            'propietarios_unicos': propietarios_unicos,
+            'registros_con_propietario': sum(self._sin_ceros(self.propietarios).values()),
+            'registros_sin_propietario': self.sin_propietario,
+            'total_registros': self.total_norma,
+            'propietario_unico': propietarios_unicos[0] if len(propietarios_unicos) == 1 else None
+        }
+
+    def estadisticas(self) -> Dict:
+        """Formato de ClasificadorEstructuras.obtener_estadisticas"""
+        por_grupo = self._sin_ceros(self.por_grupo)
+        estadisticas = {
+            'total_registros': self.total_norma,
+            'por_tipo_estructura': self._sin_ceros(self.por_tipo),
+            'clasificaciones_aplicadas': [],
+            'por_grupo_estructura': por_grupo,
+        }
+
+        if self.con_observacion_clasificacion:
+            estadisticas['clasificaciones_aplicadas'].append({
+                'tipo_original': 'Estructura con GRUPO',
+                'tipo_nuevo': 'POSTE',
+                'cantidad': self.con_observacion_clasificacion
+            })
+
+        # Estadística fija para GRUPO -> ESTRUCTURAS EYT
+        if por_grupo.get('ESTRUCTURAS EYT', 0) > 0:
+            estadisticas['clasificaciones_aplicadas'].append({
+                'tipo_original': 'Todas las estructuras',
+                'tipo_nuevo': 'ESTRUCTURAS EYT',
+                'cantidad': por_grupo['ESTRUCTURAS EYT']
+            })
+        return estadisticas
+
+    def resumen_clasificacion(self) -> Dict:
+        """Formato de ClasificadorEstructuras.obtener_resumen_clasificacion"""
+        return {
+            'total_registros': self.total_norma,
+            'tipos_encontrados': self._sin_ceros(self.por_tipo),
+            'grupos_encontrados': self._sin_ceros(self.por_grupo),
+            'clasificaciones_aplicadas': self._sin_ceros(self.por_tipo_clasificado),
+        }
@@ -1,7 +1,12 @@
 import pandas as pd
-from typing import List, Dict, Tuple
+import numpy as np
+from typing import List, Dict, Tuple, Iterator, Iterable, Callable, Optional
 from datetime import datetime
+import hashlib
 import os
+import threading
+from contextlib import contextmanager
+from collections import Counter
 import re
 from django.conf import settings
 import oracledb
@@ -12,6 +17,11 @@ from .constants import (
     CATALOGO_MATERIALES, MAPEO_UC_MATERIAL, ESTADOS_SALUD
 )
 from .models import ProcesoEstructura
+from .libro_excel import LibroExcel, LectorExcelStreaming
+from .encabezados import IndiceEncabezados, ALIAS_CAMPOS_BASICOS, normalizar_nombre_columna
+from .resumen_registros import ResumenRegistros
+from .esquema_oracle import EsquemaOracle
+from .cache_oracle import CacheOracle
 
 class DataUtils:
     """Utilidades centralizadas para procesamiento de datos"""
@@ -30,11 +40,70 @@ class DataUtils:
         'SALINIDAD': 'NO'
     }
     
+    # Normalización de fechas: cada valor crudo distinto se convierte una sola vez
+    FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d')
+    PATRON_FECHA_DD_MM_YYYY = re.compile(r'^\d{2}/\d{2}/\d{4}$')
+    MAX_FECHAS_EN_CACHE = 20000
+    _cache_fechas: Dict[tuple, str] = {}
+    
     @staticmethod
     def formatear_fecha(fecha) -> str:
         """
-        Formatea una fecha para mostrar solo la fecha sin la hora en formato DD/MM/YYYY
+        Formatea una fecha para mostrar solo la fecha sin la hora en formato DD/MM/YYYY.
+        
+        El resultado se memoriza por (tipo, valor): las fechas de instalación se
+        repiten mucho dentro de un circuito y la misma fecha pasa por lectura,
+        transformación, clasificación y preparación de salida.
+        """
+        # NaN/NaT no se memorizan: nan != nan, cada celda vacía sería una entrada nueva
+        if fecha is None or (pd.api.types.is_scalar(fecha) and pd.isna(fecha)):
+            return ''
+        
+        try:
+            clave = (type(fecha), fecha)
+            return DataUtils._cache_fechas[clave]
+        except KeyError:
+            pass
+        except TypeError:
+            # Valor no hasheable: convertir sin memorizar
+            return DataUtils._convertir_fecha(fecha)
+        
+        resultado = DataUtils._convertir_fecha(fecha)
+        if len(DataUtils._cache_fechas) >= DataUtils.MAX_FECHAS_EN_CACHE:
+            DataUtils._cache_fechas.clear()
+        DataUtils._cache_fechas[clave] = resultado
+        return resultado
+    
+    @staticmethod
+    def formatear_columna_fechas(valores, nulos=None, formatear_fecha=None) -> List[str]:
         """
+        Normaliza una columna completa de fechas (seriales de Excel, datetime,
+        textos en distintos formatos) a DD/MM/YYYY, convirtiendo cada valor
+        distinto una sola vez.
+        
+        Nulos -> ''; valores falsos (0, '') -> str(valor).strip(), igual que el
+        recorrido por celda de ExcelProcessor.
+        """
+        if nulos is None:
+            nulos = pd.isna(valores)
+        formatear_fecha = formatear_fecha or DataUtils.formatear_fecha
+        
+        distintos = {}
+        resultado = []
+        for v, nulo in zip(valores, nulos):
+            if nulo:
+                resultado.append('')
+                continue
+            clave = (type(v), v)
+            texto = distintos.get(clave)
+            if texto is None:
+                texto = formatear_fecha(v) if v else str(v).strip()
+                distintos[clave] = texto
+            resultado.append(texto)
+        return resultado
+    
+    @staticmethod
+    def _convertir_fecha(fecha) -> str:
         if not fecha or str(fecha).strip() == '':
             return ''
         
@@ -42,8 +111,7 @@ class DataUtils:
             fecha_str = str(fecha).strip()
             
             # Si ya está en formato DD/MM/YYYY, retornar tal como está
-            import re
-            if re.match(r'^\d{2}/\d{2}/\d{4}$', fecha_str):
+            if DataUtils.PATRON_FECHA_DD_MM_YYYY.match(fecha_str):
                 return fecha_str
             
             # Si es un objeto datetime de pandas
@@ -65,8 +133,7 @@ class DataUtils:
                     fecha_str = fecha_str.split(' ')[0]
                 
                 # Intentar diferentes formatos
-                formatos = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']
-                for formato in formatos:
+                for formato in DataUtils.FORMATOS_FECHA:
                     try:
                         fecha_obj = datetime.strptime(fecha_str, formato)
                         return fecha_obj.strftime('%d/%m/%Y')
@@ -140,11 +207,52 @@ class DataUtils:
             return s
         except Exception:
             return ''
-    
+
+    @staticmethod
+    def registros_desde_dataframe(df: pd.DataFrame, es_campo_fecha=None, formatear_fecha=None) -> List[Dict]:
+        """
+        Convierte un DataFrame leído del Excel a lista de diccionarios columna a columna.
+
+        Produce exactamente lo mismo que recorrer con iterrows():
+        - NaN/None -> ''
+        - Columnas de fecha (es_campo_fecha(col)) con valor -> formatear_fecha(valor)
+        - Resto -> str(valor).strip()
+
+        Los valores se toman de df.values, igual que iterrows, para conservar los
+        mismos tipos (p. ej. enteros en columnas con vacíos quedan como '5.0').
+        """
+        columnas = list(df.columns)
+        if not len(df):
+            return []
+        valores = df.values
+
+        columnas_texto = []
+        for j, col in enumerate(columnas):
+            columna = valores[:, j]
+            nulos = pd.isna(columna)
+            if es_campo_fecha and formatear_fecha and es_campo_fecha(col):
+                texto = DataUtils.formatear_columna_fechas(columna, nulos, formatear_fecha)
+            elif not nulos.any():
+                texto = [str(v).strip() for v in columna]
+            else:
+                texto = ['' if nulo else str(v).strip() for v, nulo in zip(columna, nulos)]
+            columnas_texto.append(texto)
+
+        # zip en lugar de to_dict('records') para respetar columnas duplicadas como el recorrido por celda
+        return [dict(zip(columnas, fila)) for fila in zip(*columnas_texto)]
+
 
 class OracleHelper:
     """Helper para consultas a Oracle Database"""
     
+    # Pool de sesiones del proceso (ver _obtener_pool)
+    _pool = None
+    _pool_pid = None
+    _pool_lock = threading.Lock()
+    
+    # Límite de Oracle para expresiones en una lista IN (ORA-01795)
+    MAX_BINDS_IN = 1000
+    
     @classmethod
     def get_oracle_config(cls):
         """Obtiene la configuración de Oracle desde Django settings"""
@@ -176,26 +284,93 @@ class OracleHelper:
             'dsn': dsn
         }
     
+    @classmethod
+    def _obtener_pool(cls):
+        """
+        Pool de sesiones Oracle compartido por el proceso, creado en el primer uso.
+        
+        Las consultas por FID son de una sola fila; abrir una conexión por consulta
+        costaba un handshake TCP + autenticación cada vez. El pool mantiene sesiones
+        abiertas (ORACLE_POOL_MIN..ORACLE_POOL_MAX), verifica las que llevan más de
+        ORACLE_POOL_PING_INTERVAL segundos sin uso antes de entregarlas y cada sesión
+        conserva su caché de sentencias (ORACLE_STMT_CACHE_SIZE).
+        """
+        pool = cls._pool
+        if pool is not None and cls._pool_pid == os.getpid():
+            return pool
+        
+        with cls._pool_lock:
+            # Tras un fork (workers) el pool heredado no sirve: cada proceso crea el suyo
+            if cls._pool is None or cls._pool_pid != os.getpid():
+                oracle_config = cls.get_oracle_config()
+                cls._pool = oracledb.create_pool(
+                    **oracle_config,
+                    min=getattr(settings, 'ORACLE_POOL_MIN', 1),
+                    max=getattr(settings, 'ORACLE_POOL_MAX', 4),
+                    increment=getattr(settings, 'ORACLE_POOL_INCREMENT', 1),
+                    getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                    wait_timeout=getattr(settings, 'ORACLE_POOL_ESPERA_MS', 5000),
+                    timeout=getattr(settings, 'ORACLE_POOL_INACTIVIDAD', 300),
+                    ping_interval=getattr(settings, 'ORACLE_POOL_PING_INTERVAL', 60),
+                    stmtcachesize=getattr(settings, 'ORACLE_STMT_CACHE_SIZE', 50),
+                    tcp_connect_timeout=getattr(settings, 'ORACLE_CONNECTION_TIMEOUT', 10),
+                )
+                cls._pool_pid = os.getpid()
+                print(f"🔌 Oracle: pool creado ({cls._pool.min}-{cls._pool.max} sesiones) para {oracle_config['dsn']}")
+            return cls._pool
+    
+    @classmethod
+    @contextmanager
+    def conexion(cls):
+        """
+        Toma una sesión del pool y la devuelve al salir del bloque 'with'.
+        
+        Único punto de acceso a Oracle: todas las consultas de OracleHelper (y las
+        de FileGenerator) pasan por aquí. Si la sesión quedó inservible (red caída,
+        sesión terminada) se descarta del pool en lugar de devolverse.
+        
+        Example:
+            with OracleHelper.conexion() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM DUAL")
+        """
+        pool = cls._obtener_pool()
+        connection = pool.acquire()
+        try:
+            yield connection
+        finally:
+            try:
+                if connection.is_healthy():
+                    pool.release(connection)
+                else:
+                    pool.drop(connection)
+            except Exception as e:
+                print(f"DEBUG Oracle: no se pudo devolver la sesión al pool: {e}")
+    
+    @classmethod
+    def cerrar_pool(cls):
+        """Cierra el pool del proceso (se recrea en la siguiente consulta)"""
+        with cls._pool_lock:
+            pool, cls._pool, cls._pool_pid = cls._pool, None, None
+        if pool is not None:
+            try:
+                pool.close(force=True)
+            except Exception as e:
+                print(f"DEBUG Oracle: error cerrando el pool: {e}")
+    
     @classmethod
     def get_connection(cls):
         """
-        Crea y retorna una conexión a Oracle usando las credenciales de settings.
-        Esta es una función de contexto (context manager) que debe usarse con 'with'.
+        Retorna una sesión del pool compartido (ver conexion()).
+        Debe usarse con 'with': al cerrarla vuelve al pool en lugar de desconectarse.
         
         Returns:
             oracledb.Connection: Conexión a Oracle
             
         Raises:
             Exception: Si no se puede conectar a Oracle
-            
-        Example:
-            with OracleHelper.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM table")
-                result = cursor.fetchall()
         """
-        oracle_config = cls.get_oracle_config()
-        return oracledb.connect(**oracle_config)
+        return cls._obtener_pool().acquire()
     
     @classmethod
     def test_connection(cls) -> bool:
@@ -206,8 +381,7 @@ class OracleHelper:
             True si la conexión es exitosa, False en caso contrario
         """
         try:
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     cursor.execute("SELECT 1 FROM DUAL")
                     result = cursor.fetchone()
@@ -249,8 +423,7 @@ class OracleHelper:
                     pass
             
             # Conectar a Oracle
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     # Configurar timeout para queries largas (5 segundos en milisegundos)
                     try:
@@ -319,8 +492,7 @@ class OracleHelper:
         print(f"🔍 Buscando FID para código operativo: {codigo_limpio}")
         
         try:
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     # Configurar timeout
                     try:
@@ -357,6 +529,88 @@ class OracleHelper:
                 print(f"❌ Oracle ERROR para código operativo {codigo_limpio}: {error_msg}")
             return ''
 
+    @classmethod
+    def obtener_fids_desde_codigos_operativos(cls, codigos_operativos: Iterable[str],
+                                              usar_cache: bool = True) -> Dict[str, str]:
+        """
+        Resuelve en bloque códigos operativos -> FID (misma consulta que
+        obtener_fid_desde_codigo_operativo, con IN de hasta MAX_BINDS_IN códigos).
+        
+        Args:
+            codigos_operativos: Códigos del trabajo (pueden repetirse o venir vacíos)
+            usar_cache: False consulta todos los códigos en Oracle (reposiciones: la
+                reposición cambia el FID del código) y actualiza la caché con lo obtenido
+            
+        Returns:
+            Dict {codigo (sin espacios): FID}. Los códigos sin FID en la BD (o no
+            consultados por un error de conexión) no aparecen en el diccionario.
+        """
+        if hasattr(settings, 'ORACLE_ENABLED') and not settings.ORACLE_ENABLED:
+            print("DEBUG Oracle: Consultas Oracle deshabilitadas para resolución de códigos operativos")
+            return {}
+        
+        # Únicos y limpios, en orden de aparición
+        codigos = list(dict.fromkeys(
+            codigo for codigo in (str(c).strip() for c in codigos_operativos if c is not None)
+            if codigo and codigo.lower() not in ('nan', 'none')
+        ))
+        if not codigos:
+            return {}
+        
+        # Caché local (estructuras/cache_oracle.py): a Oracle solo van los códigos que faltan o vencieron
+        en_cache = CacheOracle.obtener_varios('fid_codigo', codigos) if usar_cache else {}
+        fids: Dict[str, str] = {codigo: fid for codigo, fid in en_cache.items() if fid}
+        pendientes = CacheOracle.pendientes(codigos, en_cache)
+        if not pendientes:
+            return fids
+        
+        consultados: Dict[str, str] = {}
+        print(f"🔍 Buscando FID para {len(pendientes)} códigos operativos ({-(-len(pendientes) // cls.MAX_BINDS_IN)} consultas)")
+        
+        try:
+            with cls.conexion() as connection:
+                with connection.cursor() as cursor:
+                    for bloque in cls._bloques_binds(pendientes):
+                        try:
+                            cursor.callTimeout = 5000 + 10 * len(bloque)
+                        except AttributeError:
+                            pass
+                        
+                        binds = {f"c{n}": codigo for n, codigo in enumerate(bloque)}
+                        query = f"""
+                        SELECT c.codigo_operativo, c.g3e_fid
+                        FROM ccomun c
+                        WHERE codigo_operativo IN ({', '.join(':' + nombre for nombre in binds)})
+                        """
+                        cursor.execute(query, binds)
+                        encontrados: Dict[str, str] = {}
+                        for codigo_op, fid_real in cursor.fetchall():
+                            if codigo_op is not None and fid_real is not None:
+                                # Igual que fetchone() en la consulta individual: la primera fila gana
+                                encontrados.setdefault(str(codigo_op), str(fid_real))
+                        for codigo in bloque:
+                            consultados[codigo] = encontrados.get(codigo)
+        except Exception as e:
+            error_msg = str(e)
+            if "timed out" in error_msg.lower():
+                print(f"⏱️ Oracle TIMEOUT resolviendo códigos operativos: Conexión expiró. Consultados {len(consultados)} de {len(pendientes)}.")
+            elif "connection" in error_msg.lower():
+                print(f"🔌 Oracle CONEXIÓN resolviendo códigos operativos: No se pudo conectar. Consultados {len(consultados)} de {len(pendientes)}.")
+            else:
+                print(f"❌ Oracle ERROR resolviendo códigos operativos: {error_msg}")
+        
+        # Solo los bloques que Oracle respondió (None = sin FID, caché negativa)
+        CacheOracle.guardar_varios('fid_codigo', consultados)
+        fids.update((codigo, fid) for codigo, fid in consultados.items() if fid)
+        print(f"✅ Oracle: {len(fids)} de {len(codigos)} códigos operativos con FID")
+        return fids
+    
+    @classmethod
+    def _bloques_binds(cls, valores: List[str]) -> Iterator[List[str]]:
+        """Divide los valores en bloques que caben en una lista IN de Oracle (máximo 1000 expresiones)"""
+        for inicio in range(0, len(valores), cls.MAX_BINDS_IN):
+            yield valores[inicio:inicio + cls.MAX_BINDS_IN]
+
     @classmethod
     def obtener_fid_desde_enlace(cls, enlace: str) -> str:
         """
@@ -384,8 +638,7 @@ class OracleHelper:
         print(f"🔍 Buscando FID para ENLACE: {enlace_limpio}")
         
         try:
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     # Configurar timeout
                     try:
@@ -422,6 +675,79 @@ class OracleHelper:
                 print(f"❌ Oracle ERROR para ENLACE {enlace_limpio}: {error_msg}")
             return ''
 
+    @classmethod
+    def obtener_fids_desde_enlaces(cls, enlaces: Iterable[str]) -> Dict[str, str]:
+        """
+        Resuelve en bloque ENLACE -> FID (misma consulta que obtener_fid_desde_enlace,
+        con IN de hasta MAX_BINDS_IN enlaces).
+        
+        Args:
+            enlaces: ENLACE del trabajo (pueden repetirse o venir vacíos)
+            
+        Returns:
+            Dict {enlace (sin espacios, en mayúsculas): FID}. Los enlaces sin FID en la BD
+            (o no consultados por un error de conexión) no aparecen en el diccionario.
+        """
+        if hasattr(settings, 'ORACLE_ENABLED') and not settings.ORACLE_ENABLED:
+            print("DEBUG Oracle: Consultas Oracle deshabilitadas para resolución de ENLACE")
+            return {}
+        
+        # Únicos y limpios, en orden de aparición
+        enlaces_limpios = list(dict.fromkeys(
+            enlace for enlace in (str(e).strip().upper() for e in enlaces if e is not None)
+            if enlace and enlace.lower() not in ('nan', 'none')
+        ))
+        if not enlaces_limpios:
+            return {}
+        
+        # Caché local (estructuras/cache_oracle.py): a Oracle solo van los enlaces que faltan o vencieron
+        en_cache = CacheOracle.obtener_varios('fid_enlace', enlaces_limpios)
+        fids: Dict[str, str] = {enlace: fid for enlace, fid in en_cache.items() if fid}
+        pendientes = CacheOracle.pendientes(enlaces_limpios, en_cache)
+        if not pendientes:
+            return fids
+        
+        consultados: Dict[str, str] = {}
+        print(f"🔍 Buscando FID para {len(pendientes)} ENLACE ({-(-len(pendientes) // cls.MAX_BINDS_IN)} consultas)")
+        
+        try:
+            with cls.conexion() as connection:
+                with connection.cursor() as cursor:
+                    for bloque in cls._bloques_binds(pendientes):
+                        try:
+                            cursor.callTimeout = 5000 + 10 * len(bloque)
+                        except AttributeError:
+                            pass
+                        
+                        binds = {f"e{n}": enlace for n, enlace in enumerate(bloque)}
+                        query = f"""
+                        SELECT UPPER(enlace), g3e_fid
+                        FROM ccomun
+                        WHERE UPPER(enlace) IN ({', '.join(':' + nombre for nombre in binds)})
+                        """
+                        cursor.execute(query, binds)
+                        encontrados: Dict[str, str] = {}
+                        for enlace, fid_real in cursor.fetchall():
+                            if enlace is not None and fid_real is not None:
+                                # Igual que fetchone() en la consulta individual: la primera fila gana
+                                encontrados.setdefault(str(enlace), str(fid_real))
+                        for enlace in bloque:
+                            consultados[enlace] = encontrados.get(enlace)
+        except Exception as e:
+            error_msg = str(e)
+            if "timed out" in error_msg.lower():
+                print(f"⏱️ Oracle TIMEOUT resolviendo ENLACE: Conexión expiró. Consultados {len(consultados)} de {len(pendientes)}.")
+            elif "connection" in error_msg.lower():
+                print(f"🔌 Oracle CONEXIÓN resolviendo ENLACE: No se pudo conectar. Consultados {len(consultados)} de {len(pendientes)}.")
+            else:
+                print(f"❌ Oracle ERROR resolviendo ENLACE: {error_msg}")
+        
+        # Solo los bloques que Oracle respondió (None = sin FID, caché negativa)
+        CacheOracle.guardar_varios('fid_enlace', consultados)
+        fids.update((enlace, fid) for enlace, fid in consultados.items() if fid)
+        print(f"✅ Oracle: {len(fids)} de {len(enlaces_limpios)} ENLACE con FID")
+        return fids
+
     @classmethod
     def obtener_datos_completos_por_fid(cls, fid_real: str) -> Dict[str, str]:
         """
@@ -449,8 +775,7 @@ class OracleHelper:
         print(f"🔍 Buscando datos completos para FID real: {fid_limpio}")
         
         try:
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     # Configurar timeout
                     try:
@@ -532,8 +857,7 @@ class OracleHelper:
         print(f"🔍 Buscando datos TXT nuevo para FID real: {fid_limpio}")
         
         try:
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     # Configurar timeout
                     try:
@@ -589,6 +913,146 @@ class OracleHelper:
                 print(f"❌ Oracle ERROR para FID TXT nuevo {fid_limpio}: {error_msg}")
             return {}
 
+    @classmethod
+    def obtener_datos_txt_por_fids(cls, fids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Datos de enriquecimiento del TXT para un lote de FID: los campos de
+        obtener_datos_txt_nuevo_por_fid más UC (como obtener_uc_por_fid: CCOMUN.UC
+        y, si está vacía, la columna de UC de EPOSTE_AT), en una consulta con JOIN
+        por cada bloque de hasta MAX_BINDS_IN FID. Las columnas de UC solo se piden
+        si EsquemaOracle las encuentra: sin ellas la consulta sigue trayendo el resto.
+        
+        Args:
+            fids: FID reales del trabajo (pueden repetirse)
+            
+        Returns:
+            Dict {fid (como se recibió, sin espacios): datos} con claves UC, COORDENADA_X,
+            COORDENADA_Y, TIPO, TIPO_ADECUACION, PROPIETARIO, UBICACION y CLASIFICACION_MERCADO.
+            Los FID sin registro en CCOMUN solo traen {'UC': ...} si EPOSTE_AT tiene UC
+            para ellos; si tampoco, no aparecen.
+        """
+        if hasattr(settings, 'ORACLE_ENABLED') and not settings.ORACLE_ENABLED:
+            print("DEBUG Oracle: Consultas Oracle deshabilitadas para datos TXT por lote")
+            return {}
+        
+        # FID limpio (sin .0) -> formas en que lo pasó quien llama
+        fids_limpios: Dict[str, List[str]] = {}
+        for fid in fids:
+            fid_str = str(fid).strip() if fid is not None else ''
+            if not fid_str or fid_str.lower() in ('nan', 'none'):
+                continue
+            fid_limpio = fid_str
+            if fid_limpio.endswith('.0'):
+                try:
+                    f = float(fid_limpio)
+                    if f.is_integer():
+                        fid_limpio = str(int(f))
+                except (ValueError, OverflowError):
+                    pass
+            formas = fids_limpios.setdefault(fid_limpio, [])
+            if fid_str not in formas:
+                formas.append(fid_str)
+        if not fids_limpios:
+            return {}
+        
+        # Caché local (estructuras/cache_oracle.py): a Oracle solo van los FID que faltan o vencieron
+        en_cache = CacheOracle.obtener_varios('datos_txt', fids_limpios)
+        resultado: Dict[str, Dict[str, str]] = {
+            fid: datos for fid_limpio, datos in en_cache.items() if datos for fid in fids_limpios[fid_limpio]
+        }
+        pendientes = CacheOracle.pendientes(fids_limpios, en_cache)
+        if not pendientes:
+            return resultado
+        
+        consultados: Dict[str, Dict[str, str]] = {}
+        print(f"🔍 Buscando datos TXT para {len(pendientes)} FID en bloque")
+        
+        def texto(valor):
+            return str(valor) if valor is not None else ''
+        
+        try:
+            with cls.conexion() as connection:
+                with connection.cursor() as cursor:
+                    # Columnas de UC en CCOMUN y EPOSTE_AT (EsquemaOracle); no todas las instalaciones las tienen
+                    esquema = EsquemaOracle.obtener(cursor)
+                    uc_col = esquema.columna('UC') if esquema else None
+                    uc_ccomun_col = esquema.columna('UC_CCOMUN') if esquema else None
+                    
+                    uc_ccomun_sql = f"c.{uc_ccomun_col}" if uc_ccomun_col else "NULL"
+                    uc_eposte_sql = f"p.{uc_col}" if uc_col else "NULL"
+                    for bloque in cls._bloques_binds(pendientes):
+                        try:
+                            cursor.callTimeout = 5000 + 10 * len(bloque)
+                        except AttributeError:
+                            pass
+                        
+                        binds = {f"f{n}": fid for n, fid in enumerate(bloque)}
+                        query = f"""
+                        SELECT 
+                            c.g3e_fid,
+                            c.coor_gps_lon,
+                            c.coor_gps_lat,
+                            p.tipo,
+                            p.tipo_adecuacion,
+                            pr.propietario_1,
+                            c.ubicacion,
+                            c.clasificacion_mercado,
+                            {uc_ccomun_sql},
+                            {uc_eposte_sql}
+                        FROM ccomun c
+                            LEFT JOIN eposte_at p ON c.g3e_fid = p.g3e_fid
+                            LEFT JOIN cpropietario pr ON c.g3e_fid = pr.g3e_fid
+                        WHERE c.g3e_fid IN ({', '.join(':' + nombre for nombre in binds)})
+                        """
+                        cursor.execute(query, binds)
+                        encontrados: Dict[str, Dict[str, str]] = {}
+                        for g3e_fid, lon, lat, tipo, tipo_adec, propietario, ubicacion, clasif_mercado, uc, uc_eposte in cursor.fetchall():
+                            fid_limpio = texto(g3e_fid)
+                            # Igual que fetchone() en la consulta individual: la primera fila gana
+                            if fid_limpio in encontrados:
+                                continue
+                            encontrados[fid_limpio] = {
+                                'UC': texto(uc).strip() or texto(uc_eposte).strip(),
+                                'COORDENADA_X': texto(lon),
+                                'COORDENADA_Y': texto(lat),
+                                'TIPO': texto(tipo),
+                                'TIPO_ADECUACION': texto(tipo_adec),
+                                'PROPIETARIO': texto(propietario),
+                                'UBICACION': texto(ubicacion),
+                                'CLASIFICACION_MERCADO': texto(clasif_mercado)
+                            }
+                        
+                        # FID sin registro en CCOMUN: la UC puede estar igual en EPOSTE_AT
+                        sin_ccomun = [fid_limpio for fid_limpio in bloque if fid_limpio not in encontrados]
+                        if uc_col and sin_ccomun:
+                            binds = {f"f{n}": fid for n, fid in enumerate(sin_ccomun)}
+                            cursor.execute(
+                                f"SELECT p.g3e_fid, p.{uc_col} FROM eposte_at p "
+                                f"WHERE p.g3e_fid IN ({', '.join(':' + nombre for nombre in binds)})",
+                                binds
+                            )
+                            for g3e_fid, uc_eposte in cursor.fetchall():
+                                fid_limpio = texto(g3e_fid)
+                                if fid_limpio not in encontrados and texto(uc_eposte).strip():
+                                    encontrados[fid_limpio] = {'UC': texto(uc_eposte).strip()}
+                        
+                        for fid_limpio in bloque:
+                            consultados[fid_limpio] = encontrados.get(fid_limpio)
+        except Exception as e:
+            error_msg = str(e)
+            if "timed out" in error_msg.lower():
+                print(f"⏱️ Oracle TIMEOUT consultando datos TXT por lote: Conexión expiró. Consultados {len(consultados)} de {len(pendientes)}.")
+            elif "connection" in error_msg.lower():
+                print(f"🔌 Oracle CONEXIÓN consultando datos TXT por lote: No se pudo conectar. Consultados {len(consultados)} de {len(pendientes)}.")
+            else:
+                print(f"❌ Oracle ERROR consultando datos TXT por lote: {error_msg}")
+        
+        # Solo los bloques que Oracle respondió (None = FID sin registro, caché negativa)
+        CacheOracle.guardar_varios('datos_txt', consultados)
+        resultado.update((fid, datos) for fid_limpio, datos in consultados.items() if datos for fid in fids_limpios[fid_limpio])
+        print(f"✅ Oracle: datos TXT para {len(resultado)} de {sum(map(len, fids_limpios.values()))} FID")
+        return resultado
+
     @classmethod
     def obtener_datos_txt_baja_por_fid(cls, fid_real: str) -> Dict[str, str]:
         """
@@ -632,8 +1096,7 @@ class OracleHelper:
             return resultado
 
         try:
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     # Configurar timeout
                     try:
@@ -641,124 +1104,39 @@ class OracleHelper:
                     except AttributeError:
                         pass
 
-                    # 1) Detectar columnas disponibles para CIRCUITO en CCOMUN
-                    circuito_col = None
-                    try:
-                        cursor.execute(
-                            """
-                            SELECT UPPER(COLUMN_NAME)
-                            FROM USER_TAB_COLUMNS
-                            WHERE UPPER(TABLE_NAME) = 'CCOMUN'
-                            """
-                        )
-                        cols = {row[0] for row in (cursor.fetchall() or [])}
-                        for candidato in ['CIRCUITO', 'NOMBRE_CIRCUITO', 'CIRCUITO_NOMBRE', 'CIRCUITO_ID', 'ID_CIRCUITO']:
-                            if candidato in cols:
-                                circuito_col = candidato
-                                break
-                    except Exception as e_cols:
-                        print(f"DEBUG Oracle: No fue posible leer columnas de CCOMUN: {e_cols}")
+                    # Columnas opcionales y consultas resueltas una vez por proceso (EsquemaOracle)
+                    esquema = EsquemaOracle.obtener(cursor)
+                    if esquema is None:
+                        return resultado
 
-                    if circuito_col:
+                    # 1) CIRCUITO desde CCOMUN
+                    consulta_circuito = esquema.consulta('circuito')
+                    if consulta_circuito:
                         try:
-                            cursor.execute(
-                                f"SELECT {circuito_col} FROM CCOMUN WHERE G3E_FID = :fid_param",
-                                {"fid_param": fid_limpio}
-                            )
+                            cursor.execute(consulta_circuito, {"fid_param": fid_limpio})
                             row = cursor.fetchone()
                             circuito_val = str(row[0]).strip() if row and row[0] is not None else ''
                             if circuito_val:
                                 resultado['CIRCUITO'] = circuito_val
                         except Exception as e_circ:
-                            print(f"DEBUG Oracle: Error consultando CIRCUITO ({circuito_col}) en CCOMUN: {e_circ}")
-
-                    # 2) Detectar columnas disponibles para CODIGO_TRAFO, TIPO_ADECUACION, NORMA, MACRONORMA, CANTIDAD en EPOSTE_AT
-                    trafo_col = None
-                    tipo_adecuacion_col = None
-                    norma_col = None
-                    macronorma_col = None
-                    cantidad_col = None
-                    try:
-                        cursor.execute(
-                            """
-                            SELECT UPPER(COLUMN_NAME)
-                            FROM USER_TAB_COLUMNS
-                            WHERE UPPER(TABLE_NAME) = 'EPOSTE_AT'
-                            """
-                        )
-                        cols_p = {row[0] for row in (cursor.fetchall() or [])}
-                        for candidato in ['CODIGO_TRAFO', 'COD_TRAFO', 'CODIGO_TRANSFORMADOR']:
-                            if candidato in cols_p:
-                                trafo_col = candidato
-                                break
-                        for candidato in ['TIPO_ADECUACION']:
-                            if candidato in cols_p:
-                                tipo_adecuacion_col = candidato
-                                break
-                        for candidato in ['NORMA', 'CODIGO_NORMA', 'NORMA_ID']:
-                            if candidato in cols_p:
-                                norma_col = candidato
-                                break
-                        for candidato in ['MACRONORMA', 'MACRO_NORMA', 'CODIGO_MACRONORMA']:
-                            if candidato in cols_p:
-                                macronorma_col = candidato
-                                break
-                        for candidato in ['CANTIDAD', 'CANT', 'ALTURA']:
-                            if candidato in cols_p:
-                                cantidad_col = candidato
-                                break
-                    except Exception as e_cols2:
-                        print(f"DEBUG Oracle: No fue posible leer columnas de EPOSTE_AT: {e_cols2}")
+                            print(f"DEBUG Oracle: Error consultando CIRCUITO ({esquema.columna('CIRCUITO')}) en CCOMUN: {e_circ}")
 
-                    # Construir query dinámica si hay alguna columna disponible
-                    if any([trafo_col, tipo_adecuacion_col, norma_col, macronorma_col, cantidad_col]):
+                    # 2) CODIGO_TRAFO, TIPO_ADECUACION, NORMA, MACRONORMA, CANTIDAD desde EPOSTE_AT
+                    consulta_eposte = esquema.consulta('norma_eposte')
+                    if consulta_eposte:
                         try:
-                            select_cols = []
-                            if trafo_col:
-                                select_cols.append(trafo_col)
-                            if tipo_adecuacion_col:
-                                select_cols.append(tipo_adecuacion_col)
-                            if norma_col:
-                                select_cols.append(norma_col)
-                            if macronorma_col:
-                                select_cols.append(macronorma_col)
-                            if cantidad_col:
-                                select_cols.append(cantidad_col)
-                            cols_sql = ', '.join(select_cols)
-                            cursor.execute(
-                                f"SELECT {cols_sql} FROM EPOSTE_AT WHERE G3E_FID = :fid_param",
-                                {"fid_param": fid_limpio}
-                            )
+                            cursor.execute(consulta_eposte, {"fid_param": fid_limpio})
                             row = cursor.fetchone()
                             if row:
-                                idx = 0
-                                if trafo_col:
-                                    val = row[idx]
-                                    idx += 1
-                                    if val is not None and str(val).strip():
-                                        resultado['CODIGO_TRAFO'] = str(val).strip()
-                                if tipo_adecuacion_col:
-                                    val = row[idx]
-                                    idx += 1
-                                    if val is not None and str(val).strip():
-                                        resultado['TIPO_ADECUACION'] = str(val).strip()
-                                if norma_col:
-                                    val = row[idx]
-                                    idx += 1
-                                    if val is not None and str(val).strip():
-                                        resultado['NORMA'] = str(val).strip()
-                                if macronorma_col:
-                                    val = row[idx]
-                                    idx += 1
-                                    if val is not None and str(val).strip():
-                                        resultado['MACRONORMA'] = str(val).strip()
-                                if cantidad_col:
-                                    val = row[idx]
-                                    # idx += 1  # último opcional
-                                    if val is not None and str(val).strip():
+                                for campo, val in zip(esquema.campos_norma_eposte, row):
+                                    if val is None or not str(val).strip():
+                                        continue
+                                    if campo == 'CANTIDAD':
                                         resultado['CANTIDAD'] = str(int(val)) if str(val).strip().isdigit() else str(val).strip()
+                                    else:
+                                        resultado[campo] = str(val).strip()
                         except Exception as e_ep:
-                            print(f"DEBUG Oracle: Error consultando EPOSTE_AT ({cols_sql}): {e_ep}")
+                            print(f"DEBUG Oracle: Error consultando EPOSTE_AT ({consulta_eposte}): {e_ep}")
 
         except Exception as e:
             print(f"❌ Oracle ERROR obtener_datos_norma_por_fid({fid_limpio}): {e}")
@@ -791,69 +1169,35 @@ class OracleHelper:
             return ''
 
         try:
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     try:
                         cursor.callTimeout = 5000
                     except AttributeError:
                         pass
 
-                    # 1) Intentar CCOMUN.UC
-                    try:
-                        cursor.execute(
-                            """
-                            SELECT c.uc
-                            FROM ccomun c
-                            WHERE c.g3e_fid = :fid_param
-                            """,
-                            {"fid_param": fid_limpio}
-                        )
-                        row = cursor.fetchone()
-                        uc = str(row[0]).strip() if row and row[0] is not None else ''
-                        if uc:
-                            print(f"✅ Oracle: UC (CCOMUN) para FID {fid_limpio} = {uc}")
-                            return uc
-                    except Exception as e1:
-                        print(f"DEBUG Oracle: fallo consulta UC en CCOMUN para FID {fid_limpio}: {e1}")
-
-                    # 2) Fallback: intentar EPOSTE_AT con columnas posibles
-                    uc_col = None
-                    try:
-                        cursor.execute(
-                            """
-                            SELECT COUNT(*)
-                            FROM USER_TAB_COLUMNS
-                            WHERE UPPER(TABLE_NAME) = 'EPOSTE_AT' AND UPPER(COLUMN_NAME) = 'UC'
-                            """
-                        )
-                        has_uc = (cursor.fetchone() or [0])[0] > 0
-                        if has_uc:
-                            uc_col = 'UC'
-                        else:
-                            cursor.execute(
-                                """
-                                SELECT COUNT(*)
-                                FROM USER_TAB_COLUMNS
-                                WHERE UPPER(TABLE_NAME) = 'EPOSTE_AT' AND UPPER(COLUMN_NAME) = 'UNIDAD_CONSTRUCTIVA'
-                                """
-                            )
-                            has_uc2 = (cursor.fetchone() or [0])[0] > 0
-                            if has_uc2:
-                                uc_col = 'UNIDAD_CONSTRUCTIVA'
-                    except Exception as ecols:
-                        print(f"DEBUG Oracle: fallo obteniendo metadatos de columnas para EPOSTE_AT: {ecols}")
+                    # Columnas de UC en CCOMUN y EPOSTE_AT (EsquemaOracle); no todas las instalaciones las tienen
+                    esquema = EsquemaOracle.obtener(cursor)
 
-                    if uc_col:
+                    # 1) Intentar CCOMUN.UC (solo si la columna existe)
+                    consulta_uc_ccomun = esquema.consulta('uc_ccomun') if esquema else None
+                    if consulta_uc_ccomun:
                         try:
-                            cursor.execute(
-                                f"""
-                                SELECT p.{uc_col}
-                                FROM eposte_at p
-                                WHERE p.g3e_fid = :fid_param
-                                """,
-                                {"fid_param": fid_limpio}
-                            )
+                            cursor.execute(consulta_uc_ccomun, {"fid_param": fid_limpio})
+                            row = cursor.fetchone()
+                            uc = str(row[0]).strip() if row and row[0] is not None else ''
+                            if uc:
+                                print(f"✅ Oracle: UC (CCOMUN) para FID {fid_limpio} = {uc}")
+                                return uc
+                        except Exception as e1:
+                            print(f"DEBUG Oracle: fallo consulta UC en CCOMUN para FID {fid_limpio}: {e1}")
+
+                    # 2) Fallback: EPOSTE_AT con la columna de UC que exista
+                    consulta_uc = esquema.consulta('uc_eposte') if esquema else None
+                    if consulta_uc:
+                        uc_col = esquema.columna('UC')
+                        try:
+                            cursor.execute(consulta_uc, {"fid_param": fid_limpio})
                             row = cursor.fetchone()
                             uc = str(row[0]).strip() if row and row[0] is not None else ''
                             if uc:
@@ -889,8 +1233,7 @@ class OracleHelper:
             return {}
 
         try:
-            oracle_config = cls.get_oracle_config()
-            with oracledb.connect(**oracle_config) as connection:
+            with cls.conexion() as connection:
                 with connection.cursor() as cursor:
                     try:
                         cursor.callTimeout = 5000
@@ -917,17 +1260,7 @@ class OracleHelper:
                     result = cursor.fetchone()
                     
                     if result:
-                        norma, grupo, circuito, codigo_trafo, macronorma, cantidad, tipo_adec = result
-                        
-                        datos = {
-                            'NORMA': str(norma).strip() if norma is not None else '',
-                            'GRUPO': str(grupo).strip() if grupo is not None else '',
-                            'CIRCUITO': str(circuito).strip() if circuito is not None else '',
-                            'CODIGO_TRAFO': str(codigo_trafo).strip() if codigo_trafo is not None else '',
-                            'MACRONORMA': str(macronorma).strip() if macronorma is not None else '',
-                            'CANTIDAD': str(int(cantidad)) if cantidad is not None and str(cantidad).strip() != '' else '',
-                            'TIPO_ADECUACION': str(tipo_adec).strip() if tipo_adec is not None else ''
-                        }
+                        datos = cls._datos_norma_desde_fila(*result)
                         
                         print(f"✅ Oracle obtener_norma_por_fid({fid_limpio}): NORMA={datos['NORMA']}, CIRCUITO={datos['CIRCUITO']}, CANTIDAD={datos['CANTIDAD']}")
                         return datos
@@ -941,6 +1274,102 @@ class OracleHelper:
             return {}
 
 
+    @staticmethod
+    def _datos_norma_desde_fila(norma, grupo, circuito, codigo_trafo, macronorma, cantidad, tipo_adec) -> Dict[str, str]:
+        """Fila de ccomun JOIN norma -> dict de obtener_norma_por_fid"""
+        return {
+            'NORMA': str(norma).strip() if norma is not None else '',
+            'GRUPO': str(grupo).strip() if grupo is not None else '',
+            'CIRCUITO': str(circuito).strip() if circuito is not None else '',
+            'CODIGO_TRAFO': str(codigo_trafo).strip() if codigo_trafo is not None else '',
+            'MACRONORMA': str(macronorma).strip() if macronorma is not None else '',
+            'CANTIDAD': str(int(cantidad)) if cantidad is not None and str(cantidad).strip() != '' else '',
+            'TIPO_ADECUACION': str(tipo_adec).strip() if tipo_adec is not None else ''
+        }
+
+    @classmethod
+    def obtener_normas_por_fids(cls, fids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Datos de norma de un lote de FID: la consulta de obtener_norma_por_fid con IN
+        de hasta MAX_BINDS_IN FID por bloque.
+        
+        Args:
+            fids: FID reales del trabajo (pueden repetirse o venir vacíos)
+            
+        Returns:
+            Dict {fid (sin espacios): datos} con las claves de obtener_norma_por_fid.
+            Los FID sin norma en la BD (o no consultados por un error de conexión)
+            no aparecen en el diccionario.
+        """
+        if hasattr(settings, 'ORACLE_ENABLED') and not settings.ORACLE_ENABLED:
+            print("DEBUG Oracle: Consultas Oracle deshabilitadas para datos de norma por lote")
+            return {}
+        
+        fids_limpios = list(dict.fromkeys(
+            fid for fid in (str(f).strip() for f in fids if f is not None)
+            if fid and fid.lower() not in ('nan', 'none')
+        ))
+        if not fids_limpios:
+            return {}
+        
+        # Caché local (estructuras/cache_oracle.py): a Oracle solo van los FID que faltan o vencieron
+        en_cache = CacheOracle.obtener_varios('norma_fid', fids_limpios)
+        resultado: Dict[str, Dict[str, str]] = {fid: datos for fid, datos in en_cache.items() if datos}
+        pendientes = CacheOracle.pendientes(fids_limpios, en_cache)
+        if not pendientes:
+            return resultado
+        
+        consultados: Dict[str, Dict[str, str]] = {}
+        print(f"🔍 Buscando datos de norma para {len(pendientes)} FID en bloque")
+        
+        try:
+            with cls.conexion() as connection:
+                with connection.cursor() as cursor:
+                    for bloque in cls._bloques_binds(pendientes):
+                        try:
+                            cursor.callTimeout = 5000 + 10 * len(bloque)
+                        except AttributeError:
+                            pass
+                        
+                        binds = {f"f{n}": fid for n, fid in enumerate(bloque)}
+                        query = f"""
+                        SELECT 
+                            c.g3e_fid,
+                            n.norma,
+                            n.grupo,
+                            n.circuito,
+                            n.codigo_trafo,
+                            n.macronorma,
+                            n.cantidad,
+                            n.tipo_adecuacion
+                        FROM ccomun c
+                        JOIN norma n ON c.g3e_fid = n.g3e_fid
+                        WHERE c.g3e_fid IN ({', '.join(':' + nombre for nombre in binds)})
+                        """
+                        cursor.execute(query, binds)
+                        encontrados: Dict[str, Dict[str, str]] = {}
+                        for g3e_fid, *fila in cursor.fetchall():
+                            fid = str(g3e_fid) if g3e_fid is not None else ''
+                            # Igual que fetchone() en la consulta individual: la primera fila gana
+                            if fid and fid not in encontrados:
+                                encontrados[fid] = cls._datos_norma_desde_fila(*fila)
+                        for fid in bloque:
+                            consultados[fid] = encontrados.get(fid)
+        except Exception as e:
+            error_msg = str(e)
+            if "timed out" in error_msg.lower():
+                print(f"⏱️ Oracle TIMEOUT consultando datos de norma por lote: Conexión expiró. Consultados {len(consultados)} de {len(pendientes)}.")
+            elif "connection" in error_msg.lower():
+                print(f"🔌 Oracle CONEXIÓN consultando datos de norma por lote: No se pudo conectar. Consultados {len(consultados)} de {len(pendientes)}.")
+            else:
+                print(f"❌ Oracle ERROR consultando datos de norma por lote: {error_msg}")
+        
+        # Solo los bloques que Oracle respondió (None = FID sin norma, caché negativa)
+        CacheOracle.guardar_varios('norma_fid', consultados)
+        resultado.update((fid, datos) for fid, datos in consultados.items() if datos)
+        print(f"✅ Oracle: datos de norma para {len(resultado)} de {len(fids_limpios)} FID")
+        return resultado
+
 class ExcelProcessor:
     """Procesa archivos Excel extrayendo y normalizando datos de estructura"""
     
@@ -961,122 +1390,41 @@ class ExcelProcessor:
             archivo_path = self.proceso.archivo_excel.path
             print(f"Procesando archivo: {archivo_path}")
             
-            # Leer todas las hojas del Excel
-            df_dict = pd.read_excel(archivo_path, sheet_name=None)
-            
-            # Determinar qué hoja usar basado en el modo de clasificación
-            if self.proceso.clasificacion_confirmada:
-                # FORZAR USO DE LA HOJA ESTRUCTURAS PARA DEBUG
-                nombre_hoja = None
-                
-                # Buscar específicamente la hoja de estructuras
-                if 'Estructuras_N1-N2-N3' in df_dict:
-                    nombre_hoja = 'Estructuras_N1-N2-N3'
-                    print(f"FORZANDO uso de hoja de estructuras: '{nombre_hoja}'")
-                else:
-                    # Fallback al algoritmo original si no existe esa hoja
-                    mejor_puntaje = 0
-                    print(f"Buscando la hoja correcta entre {len(df_dict)} hojas disponibles...")
-                    
-                    # Buscar en todas las hojas la que tenga más columnas de normas
-                    for hoja_nombre, df_temp in df_dict.items():
-                        try:
-                            columnas_hoja = [str(col).strip() for col in df_temp.columns]
-                            print(f"Revisando hoja '{hoja_nombre}' con {len(columnas_hoja)} columnas")
-                            
-                            # Calcular puntaje basado en columnas clave encontradas
-                            puntaje = 0
-                            
-                            for col in columnas_hoja:
-                                col_lower = str(col).lower().strip()
-                                # Buscar coincidencias más flexibles
-                                if ('norma' in col_lower or 
-                                    'poblacion' in col_lower or 'población' in col_lower or 'municipio' in col_lower or
-                                    'unidad' in col_lower and 'constructiva' in col_lower or
-                                    'codigo' in col_lower and 'inventario' in col_lower or
-                                    'material' in col_lower or
-                                    'altura' in col_lower):
-                                    puntaje += 1
-                                    print(f"    Columna clave encontrada: '{col}'")
-                            
-                            print(f"  Hoja '{hoja_nombre}': puntaje {puntaje}/6 columnas clave")
-                            
-                            if puntaje > mejor_puntaje:
-                                mejor_puntaje = puntaje
-                                nombre_hoja = hoja_nombre
-                                print(f"  Nueva mejor hoja: '{nombre_hoja}' con puntaje {puntaje}")
-                        
-                        except Exception as e:
-                            print(f"  Error revisando hoja '{hoja_nombre}': {e}")
-                            continue
-                    
-                    # Si no encuentra hoja específica, usar la primera
-                    if not nombre_hoja:
-                        nombre_hoja = list(df_dict.keys())[0]
-                        print(f"No se encontró hoja específica, usando la primera: '{nombre_hoja}'")
-                        
-                    print(f"Hoja seleccionada: '{nombre_hoja}' (puntaje: {mejor_puntaje}/6)")
+            # El libro se parsea una sola vez por proceso y se comparte entre etapas
+            libro = LibroExcel.para_proceso(self.proceso)
+            clave_resultado = (bool(self.proceso.clasificacion_confirmada), self.tipo_estructura)
+            if clave_resultado in libro.resultados:
+                datos, campos_faltantes, header_row, nombre_hoja = libro.resultados[clave_resultado]
+                self.header_row_detected = header_row
+                self.sheet_used = nombre_hoja
+                print(f"Reutilizando Excel ya procesado: hoja '{nombre_hoja}', {len(datos)} registros")
+                return [dict(registro) for registro in datos], list(campos_faltantes)
+            
+            # Hoja y fila de headers: reutilizar las detectadas en una lectura anterior (caché de parseo)
+            clave_metadatos = f"estructuras|{clave_resultado[0]}|{self.tipo_estructura}"
+            metadatos = libro.metadatos.get(clave_metadatos)
+            if metadatos and metadatos.get('hoja') in libro.nombres_hojas:
+                nombre_hoja = metadatos['hoja']
+                header_row = metadatos['header_row']
+                print(f"Usando hoja '{nombre_hoja}' con headers en fila {header_row} (caché de parseo)")
             else:
-                # Buscar hoja de datos específica
-                hoja_datos = self.estructura_config['ARCHIVOS_FUENTE']['hoja_datos']
-                if hoja_datos in df_dict:
-                    nombre_hoja = hoja_datos
-                else:
-                    # Fallback: usar la primera hoja
-                    nombre_hoja = list(df_dict.keys())[0]
-                    print(f"Hoja '{hoja_datos}' no encontrada, usando '{nombre_hoja}'")
-            
-            # Leer la hoja sin headers para investigar
-            datos_df_raw = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=None)
-            print("Primeras 5 filas del Excel:")
-            for i in range(min(5, len(datos_df_raw))):
-                print(f"Fila {i}: {list(datos_df_raw.iloc[i].values)}")
-            
-            # Intentar diferentes estrategias para encontrar headers
-            datos_df = None
-            header_row = None
-            
-            # Estrategia 1: Headers en fila 0 (default)
-            try:
-                temp_df = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=0)
-                # Verificar si tiene headers válidos (no solo "Unnamed" y no todos nan)
-                valid_headers = [col for col in temp_df.columns if not col.startswith('Unnamed:') and str(col) != 'nan']
-                if len(valid_headers) > 3:  # Al menos 3 headers válidos
-                    datos_df = temp_df
-                    header_row = 0
-                    print("Headers encontrados en fila 0")
-            except Exception:
-                pass
-            
-            # Estrategia 2: Headers en fila 1
-            if datos_df is None:
-                try:
-                    temp_df = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=1)
-                    # Verificar si tiene headers válidos
-                    valid_headers = [col for col in temp_df.columns if not col.startswith('Unnamed:') and str(col) != 'nan']
-                    if len(valid_headers) > 3:  # Al menos 3 headers válidos
-                        datos_df = temp_df
-                        header_row = 1
-                        print("Headers encontrados en fila 1")
-                except Exception:
-                    pass
-            
-            # Estrategia 3: Headers en fila 2
-            if datos_df is None:
-                try:
-                    temp_df = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=2)
-                    if not all(col.startswith('Unnamed:') for col in temp_df.columns):
-                        datos_df = temp_df
-                        header_row = 2
-                        print("Headers encontrados en fila 2")
-                except Exception:
-                    pass
+                # Determinar qué hoja usar basado en el modo de clasificación
+                # Puntuar hojas solo con sus encabezados (no se cargan hojas completas)
+                nombre_hoja = self._seleccionar_hoja(libro.nombres_hojas, lambda hoja: libro.encabezados(hoja, 0))
+                
+                # Leer solo las primeras filas sin headers para investigar
+                datos_df_raw = libro.filas_superiores(nombre_hoja, 5)
+                print("Primeras 5 filas del Excel:")
+                for i in range(min(5, len(datos_df_raw))):
+                    print(f"Fila {i}: {list(datos_df_raw.iloc[i].values)}")
+                
+                # Detectar la fila de headers evaluando solo las filas superiores de la hoja
+                header_row = libro.detectar_fila_encabezado(nombre_hoja, self._criterios_encabezado(), fila_defecto=0)
+                print(f"Headers encontrados en fila {header_row}")
+                libro.registrar_metadatos(clave_metadatos, nombre_hoja, header_row)
             
-            # Si no encontramos headers válidos, usar fila 0 como fallback
-            if datos_df is None:
-                datos_df = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=0)
-                header_row = 0
-                print("Usando fila 0 como headers (fallback)")
+            # Materializar la hoja una sola vez con la fila de headers detectada
+            datos_df = libro.hoja(nombre_hoja, header=header_row)
             
             print(f"Datos de hoja '{nombre_hoja}': {len(datos_df)} filas (header en fila {header_row})")
             # Guardar metadata detectada para uso posterior
@@ -1096,47 +1444,166 @@ class ExcelProcessor:
             if campos_faltantes:
                 print(f"Campos faltantes: {campos_faltantes}")
                 print(f"Se encontraron: {list(datos_df.columns)}")
-                return [], campos_faltantes
-            
-            # Convertir a lista de diccionarios y limpiar NaN
-            datos = []
-            for _, row in datos_df.iterrows():
-                registro = {}
-                for col, val in row.items():
-                    if pd.isna(val):
-                        registro[col] = ""
-                    else:
-                        # Formatear fechas directamente al leer del Excel
-                        if self._es_campo_fecha(col) and val:
-                            # Si es un campo de fecha, formatear inmediatamente
-                            registro[col] = self._formatear_fecha_excel(val)
-                        else:
-                            registro[col] = str(val).strip()
-                datos.append(registro)
+                libro.resultados[clave_resultado] = ([], campos_faltantes, header_row, nombre_hoja)
+                return [], list(campos_faltantes)
+            
+            # Convertir a lista de diccionarios y limpiar NaN (columna a columna);
+            # las fechas se formatean directamente al leer del Excel
+            datos = DataUtils.registros_desde_dataframe(
+                datos_df,
+                es_campo_fecha=self._es_campo_fecha,
+                formatear_fecha=self._formatear_fecha_excel
+            )
             
             print(f"Registros procesados: {len(datos)}")
             
-            return datos, []
+            libro.resultados[clave_resultado] = (datos, [], header_row, nombre_hoja)
+            return [dict(registro) for registro in datos], []
+            
+        except Exception as e:
+            print(f"Error procesando Excel: {str(e)}")
+            raise Exception(f"Error procesando Excel: {str(e)}")
+    
+    def procesar_archivo_streaming(self) -> Tuple[Iterator[Dict], List[str]]:
+        """
+        Variante por bloques de filas de procesar_archivo para libros muy grandes.
+        
+        La selección de hoja, la detección de headers y la verificación de campos
+        se hacen de inmediato leyendo solo las filas superiores; los registros se
+        entregan con un generador que lee la hoja fila a fila (openpyxl read_only).
+        
+        Returns:
+            Tuple[Iterator[Dict], List[str]]: (generador_de_registros, campos_faltantes)
+        """
+        try:
+            archivo_path = self.proceso.archivo_excel.path
+            print(f"Procesando archivo en modo streaming: {archivo_path}")
+            
+            lector = LectorExcelStreaming(archivo_path)
+            nombres_hojas = lector.nombres_hojas()
+            nombre_hoja = self._seleccionar_hoja(nombres_hojas, lambda hoja: lector.encabezados(hoja, 0))
+            
+            header_row = lector.detectar_fila_encabezado(nombre_hoja, self._criterios_encabezado(), fila_defecto=0)
+            columnas = [self._normalizar_columna(col) for col in lector.encabezados(nombre_hoja, header_row)]
+            print(f"Hoja '{nombre_hoja}' con headers en fila {header_row}")
+            print(f"Columnas encontradas: {columnas}")
+            
+            self.header_row_detected = header_row
+            self.sheet_used = nombre_hoja
             
+            campos_faltantes = self._verificar_campos(columnas)
+            if campos_faltantes:
+                print(f"Campos faltantes: {campos_faltantes}")
+                return iter([]), campos_faltantes
+            
+            registros = lector.iterar_registros(
+                nombre_hoja,
+                header_row,
+                columnas=columnas,
+                es_campo_fecha=self._es_campo_fecha,
+                formatear_fecha=self._formatear_fecha_excel
+            )
+            return registros, []
+        
         except Exception as e:
             print(f"Error procesando Excel: {str(e)}")
             raise Exception(f"Error procesando Excel: {str(e)}")
     
+    def _seleccionar_hoja(self, nombres_hojas: List[str], obtener_columnas) -> str:
+        """
+        Elige la hoja de datos según el modo de clasificación.
+        
+        Args:
+            nombres_hojas: Hojas del libro en orden
+            obtener_columnas: Función que recibe el nombre de una hoja y retorna sus columnas (header=0)
+        """
+        if self.proceso.clasificacion_confirmada:
+            # FORZAR USO DE LA HOJA ESTRUCTURAS PARA DEBUG
+            nombre_hoja = None
+            
+            # Buscar específicamente la hoja de estructuras
+            if 'Estructuras_N1-N2-N3' in nombres_hojas:
+                nombre_hoja = 'Estructuras_N1-N2-N3'
+                print(f"FORZANDO uso de hoja de estructuras: '{nombre_hoja}'")
+            else:
+                # Fallback al algoritmo original si no existe esa hoja
+                mejor_puntaje = 0
+                print(f"Buscando la hoja correcta entre {len(nombres_hojas)} hojas disponibles...")
+                
+                # Buscar en todas las hojas la que tenga más columnas de normas
+                for hoja_nombre in nombres_hojas:
+                    try:
+                        columnas_hoja = [str(col).strip() for col in obtener_columnas(hoja_nombre)]
+                        print(f"Revisando hoja '{hoja_nombre}' con {len(columnas_hoja)} columnas")
+                        
+                        # Calcular puntaje basado en columnas clave encontradas
+                        puntaje = 0
+                        
+                        for col in columnas_hoja:
+                            col_lower = str(col).lower().strip()
+                            # Buscar coincidencias más flexibles
+                            if ('norma' in col_lower or 
+                                'poblacion' in col_lower or 'población' in col_lower or 'municipio' in col_lower or
+                                'unidad' in col_lower and 'constructiva' in col_lower or
+                                'codigo' in col_lower and 'inventario' in col_lower or
+                                'material' in col_lower or
+                                'altura' in col_lower):
+                                puntaje += 1
+                                print(f"    Columna clave encontrada: '{col}'")
+                        
+                        print(f"  Hoja '{hoja_nombre}': puntaje {puntaje}/6 columnas clave")
+                        
+                        if puntaje > mejor_puntaje:
+                            mejor_puntaje = puntaje
+                            nombre_hoja = hoja_nombre
+                            print(f"  Nueva mejor hoja: '{nombre_hoja}' con puntaje {puntaje}")
+                    
+                    except Exception as e:
+                        print(f"  Error revisando hoja '{hoja_nombre}': {e}")
+                        continue
+                
+                # Si no encuentra hoja específica, usar la primera
+                if not nombre_hoja:
+                    nombre_hoja = nombres_hojas[0]
+                    print(f"No se encontró hoja específica, usando la primera: '{nombre_hoja}'")
+                    
+                print(f"Hoja seleccionada: '{nombre_hoja}' (puntaje: {mejor_puntaje}/6)")
+        else:
+            # Buscar hoja de datos específica
+            hoja_datos = self.estructura_config['ARCHIVOS_FUENTE']['hoja_datos']
+            if hoja_datos in nombres_hojas:
+                nombre_hoja = hoja_datos
+            else:
+                # Fallback: usar la primera hoja
+                nombre_hoja = nombres_hojas[0]
+                print(f"Hoja '{hoja_datos}' no encontrada, usando '{nombre_hoja}'")
+        
+        return nombre_hoja
+    
+    def _criterios_encabezado(self) -> List[Tuple]:
+        """
+        Criterios para detectar la fila de headers: fila 0 y 1 requieren más de
+        3 headers válidos, fila 2 al menos uno con nombre. Si ninguna cumple se
+        usa la fila 0 como fallback.
+        """
+        return [
+            (0, lambda columnas: len(self._headers_validos(columnas)) > 3),
+            (1, lambda columnas: len(self._headers_validos(columnas)) > 3),
+            (2, lambda columnas: not all(col.startswith('Unnamed:') for col in columnas)),
+        ]
+    
+    def _headers_validos(self, columnas) -> List[str]:
+        """Headers con nombre real (no 'Unnamed:' ni 'nan')"""
+        return [col for col in columnas if not col.startswith('Unnamed:') and str(col) != 'nan']
+    
     def _normalizar_columna(self, columna: str) -> str:
         """Normaliza nombres de columnas manteniendo errores tipográficos del Excel"""
         return str(columna).strip()
     
     def _verificar_campos(self, columnas_excel: List[str]) -> List[str]:
         """Verifica qué campos obligatorios faltan"""
-        # Usar validación permisiva por defecto (mapeo de equivalencias)
-        # Mapeo de equivalencias de nombres de campos (ACTUALIZADO con columnas reales del Excel)
-        equivalencias = {
-            'Norma': ['Norma', 'NORMA', 'norma'],
-            'UC': ['UC', 'Unidad_Constructiva', 'Unidad Constructiva', 'UNIDAD_CONSTRUCTIVA', 
-                   'unidad_constructiva', 'unidad constructiva', 'Unnamed: 25'],
-            'Poblacion': ['Poblacion', 'POBLACION', 'poblacion', 'Población', 'MUNICIPIOS', 'Municipios', 'Municipio', 'municipio'],
-            'CODIGO_MATERIAL': ['Codigo Inventario', 'CODIGO_INVENTARIO', 'Unnamed: 23', 'Material', 'MATERIAL']
-        }
+        # Validación permisiva: equivalencias de nombres en encabezados.ALIAS_CAMPOS_BASICOS
+        indice = IndiceEncabezados.para(columnas_excel)
         
         # Solo verificar campos básicos
         campos_basicos = ['Norma', 'UC', 'Poblacion']
@@ -1146,17 +1613,13 @@ class ExcelProcessor:
         print(f"DEBUG: Columnas del Excel: {columnas_excel}")
         
         for campo in campos_basicos:
-            campo_encontrado = False
-            posibles_nombres = equivalencias.get(campo, [campo])
+            posibles_nombres = list(ALIAS_CAMPOS_BASICOS.get(campo, (campo,)))
             print(f"DEBUG: Buscando campo '{campo}' en posibles nombres: {posibles_nombres}")
             
-            for col in columnas_excel:
-                if str(col).strip() in posibles_nombres:
-                    print(f"DEBUG: Campo '{campo}' encontrado como '{col}'")
-                    campo_encontrado = True
-                    break
-            
-            if not campo_encontrado:
+            encontradas = indice.columnas_de(campo, 'basicos')
+            if encontradas:
+                print(f"DEBUG: Campo '{campo}' encontrado como '{encontradas[0]}'")
+            else:
                 print(f"DEBUG: Campo '{campo}' NO encontrado")
                 campos_faltantes.append(campo)
         
@@ -1176,6 +1639,9 @@ class ExcelProcessor:
 class DataTransformer:
     """Transformador de datos del Excel de entrada a estructura de salida"""
     
+    # Registros que se clasifican juntos (por columnas); acota la memoria con lectura streaming
+    TAMANO_BLOQUE_CLASIFICACION = 5000
+    
     def __init__(self, tipo_estructura: str):
         self.tipo_estructura = tipo_estructura
         self.mapeo = MAPEO_EXCEL_A_SALIDA.get(tipo_estructura, {})
@@ -1184,104 +1650,111 @@ class DataTransformer:
     
     def _normalizar_nombres_campos(self, registro: Dict) -> Dict:
         """Normaliza los nombres de campos para que coincidan con el mapeo esperado"""
-        equivalencias = {
-            'Unidad_Constructiva': 'UC',
-            'Unidad Constructiva': 'UC',
-            'Unnamed: 25': 'UC',  # Para archivos con encabezados genéricos
-            'Unnamed: 23': 'CODIGO_INVENTARIO',  # Para código de inventario
-            'Unnamed: 0': 'COORDENADA_X',  # Para coordenada X
-            'Unnamed: 1': 'COORDENADA_Y',  # Para coordenada Y
-            'UNIDAD_CONSTRUCTIVA': 'UC',
-            'unidad_constructiva': 'UC',
-            'unidad constructiva': 'UC',
-            'Código FID_rep': 'Código FID_rep',
-            'FID_ANTERIOR': 'FID_ANTERIOR',
-            'Tipo_accion_sal': 'Tipo_accion_sal',
-            'Tipo_accion_ent': 'Tipo_accion_ent',
-            # Nuevo: mapear 'Tipo inversión' del Excel para TIPO_PROYECTO
-            'Tipo inversión': 'TIPO_INVERSION_ROMANO',
-            'Tipo inversion': 'TIPO_INVERSION_ROMANO',
-            'TIPO INVERSION': 'TIPO_INVERSION_ROMANO',
-            'TIPO INVERSIÓN': 'TIPO_INVERSION_ROMANO',
-            'tipo inversion': 'TIPO_INVERSION_ROMANO',
-            'tipo inversión': 'TIPO_INVERSION_ROMANO',
-            # NUEVO: soportar el campo del Excel 'CodigoMaterial'
-            'CodigoMaterial': 'CODIGO_MATERIAL',
-            'CODIGOMATERIAL': 'CODIGO_MATERIAL',
-            'codigoMaterial': 'CODIGO_MATERIAL',
-            'codigo_material': 'CODIGO_MATERIAL',
-        }
-        
-        registro_normalizado = {}
-        for campo, valor in registro.items():
-            # Usar el nombre normalizado si existe, sino usar el original
-            campo_normalizado = equivalencias.get(campo, campo)
-            registro_normalizado[campo_normalizado] = valor
+        # Los registros de una hoja comparten columnas: el renombrado se resuelve una vez por hoja
+        nombres = IndiceEncabezados.para(registro).columnas_renombradas()
+        registro_normalizado = dict(zip(nombres, registro.values()))
         
         return registro_normalizado
     
-    def transformar_datos(self, datos_excel: List[Dict]) -> List[Dict]:
-        """Transforma datos del Excel a la estructura de salida"""
+    def transformar_datos(self, datos_excel: Iterable[Dict], progreso: Callable[[int], None] = None) -> List[Dict]:
+        """
+        Transforma datos del Excel a la estructura de salida (acepta lista o generador).
+        `progreso`, si se indica, recibe la cantidad de registros transformados tras cada bloque.
+        """
         datos_transformados = []
+        for bloque in self.transformar_por_bloques(datos_excel, progreso):
+            datos_transformados.extend(bloque)
+        return datos_transformados
+    
+    def transformar_por_bloques(self, datos_excel: Iterable[Dict],
+                                progreso: Callable[[int], None] = None) -> Iterator[List[Dict]]:
+        """
+        Igual que transformar_datos, pero entrega cada bloque de
+        TAMANO_BLOQUE_CLASIFICACION registros ya clasificados en cuanto está
+        listo, sin acumular la hoja completa.
+        """
+        total = 0
+        pendientes = []
+        
+        for registro_excel in datos_excel:
+            pendientes.append(self._transformar_registro(registro_excel))
+            if len(pendientes) >= self.TAMANO_BLOQUE_CLASIFICACION:
+                bloque = self._clasificar_bloque(pendientes, total)
+                pendientes = []
+                total += len(bloque)
+                if progreso:
+                    progreso(total)
+                yield bloque
+        
+        bloque = self._clasificar_bloque(pendientes, total)
+        total += len(bloque)
+        if progreso:
+            progreso(total)
+        if bloque:
+            yield bloque
+    
+    def _transformar_registro(self, registro_excel: Dict) -> Dict:
+        """Registro del Excel en la estructura de salida (sin clasificar)"""
+        # Normalizar nombres de campos en el registro
+        registro_normalizado = self._normalizar_nombres_campos(registro_excel)
+        registro_salida = {}
+        
+        # Mapear campos según el tipo de estructura
+        for campo_excel, campo_salida in self.mapeo.items():
+            valor = registro_normalizado.get(campo_excel, "")
+            
+            # Formatear fechas durante el mapeo
+            if campo_salida in ['FECHA_INSTALACION', 'FECHA_OPERACION'] and valor:
+                valor = self.clasificador._formatear_fecha(str(valor))
+            
+            registro_salida[campo_salida] = valor
+
+        # NUEVO: si el Excel trae la columna 'CodigoMaterial', reflejarla SIEMPRE (aunque esté vacía)
+        # y marcar que proviene del Excel con un flag para evitar fallback por UC cuando esté vacía.
+        if 'CODIGO_MATERIAL' in registro_normalizado:
+            cm_excel_val = registro_normalizado.get('CODIGO_MATERIAL', '')
+            registro_salida['CODIGO_MATERIAL'] = DataUtils.normalizar_codigo_material(cm_excel_val)
+            registro_salida['_CODIGO_MATERIAL_FROM_EXCEL'] = True
+        else:
+            registro_salida['_CODIGO_MATERIAL_FROM_EXCEL'] = False
+
+        # NUEVO: si el Excel trae 'Tipo inversión' (en romano), convertir a Tn y colocar en TIPO_PROYECTO
+        try:
+            tipo_inv_excel = registro_normalizado.get('TIPO_INVERSION_ROMANO', '')
+            if tipo_inv_excel:
+                tipo_excel_convertido = self.clasificador._convertir_tipo_proyecto(str(tipo_inv_excel))
+                if tipo_excel_convertido:
+                    registro_salida['TIPO_PROYECTO'] = tipo_excel_convertido
+                    # Guardar un respaldo para preservar este valor tras la clasificación
+                    registro_salida['_TIPO_PROYECTO_EXCEL'] = tipo_excel_convertido
+        except Exception:
+            pass
+        
+        # Agregar campos faltantes con valores por defecto
+        for campo_salida in self.estructura_config['CAMPOS_SALIDA_DATOS']:
+            if campo_salida not in registro_salida:
+                registro_salida[campo_salida] = ""
+        
+        return registro_salida
+    
+    def _clasificar_bloque(self, pendientes: List[Dict], inicio: int) -> List[Dict]:
+        """Aplica las reglas de clasificación a un bloque de registros que empieza en el registro `inicio`"""
+        if not pendientes:
+            return []
         
-        for registro_excel in datos_excel:
-            # Normalizar nombres de campos en el registro
-            registro_normalizado = self._normalizar_nombres_campos(registro_excel)
-            registro_salida = {}
-            
-            # Mapear campos según el tipo de estructura
-            for campo_excel, campo_salida in self.mapeo.items():
-                valor = registro_normalizado.get(campo_excel, "")
-                
-                # Formatear fechas durante el mapeo
-                if campo_salida in ['FECHA_INSTALACION', 'FECHA_OPERACION'] and valor:
-                    valor = self.clasificador._formatear_fecha(str(valor))
-                
-                registro_salida[campo_salida] = valor
-
-            # NUEVO: si el Excel trae la columna 'CodigoMaterial', reflejarla SIEMPRE (aunque esté vacía)
-            # y marcar que proviene del Excel con un flag para evitar fallback por UC cuando esté vacía.
-            if 'CODIGO_MATERIAL' in registro_normalizado:
-                cm_excel_val = registro_normalizado.get('CODIGO_MATERIAL', '')
-                registro_salida['CODIGO_MATERIAL'] = DataUtils.normalizar_codigo_material(cm_excel_val)
-                registro_salida['_CODIGO_MATERIAL_FROM_EXCEL'] = True
-            else:
-                registro_salida['_CODIGO_MATERIAL_FROM_EXCEL'] = False
-
-            # NUEVO: si el Excel trae 'Tipo inversión' (en romano), convertir a Tn y colocar en TIPO_PROYECTO
-            try:
-                tipo_inv_excel = registro_normalizado.get('TIPO_INVERSION_ROMANO', '')
-                if tipo_inv_excel:
-                    tipo_excel_convertido = self.clasificador._convertir_tipo_proyecto(str(tipo_inv_excel))
-                    if tipo_excel_convertido:
-                        registro_salida['TIPO_PROYECTO'] = tipo_excel_convertido
-                        # Guardar un respaldo para preservar este valor tras la clasificación
-                        registro_salida['_TIPO_PROYECTO_EXCEL'] = tipo_excel_convertido
-            except Exception:
-                pass
-            
-            # Agregar campos faltantes con valores por defecto
-            for campo_salida in self.estructura_config['CAMPOS_SALIDA_DATOS']:
-                if campo_salida not in registro_salida:
-                    registro_salida[campo_salida] = ""
-            
-            # APLICAR REGLAS DE CLASIFICACIÓN
-            registro_salida = self.clasificador.clasificar_estructura(registro_salida)
-            
+        # APLICAR REGLAS DE CLASIFICACIÓN (por columnas sobre el bloque)
+        registros_clasificados, _ = self.clasificador.clasificar_registros(pendientes)
+        
+        for posicion, registro_salida in enumerate(registros_clasificados):
             # REGLA ESPECIAL: EMPRESA debe tener el mismo valor que PROPIETARIO para todos los tipos
             propietario = registro_salida.get('PROPIETARIO', '')
             registro_salida['EMPRESA'] = propietario
 
             # Guardar índice relativo para mensajes (se complementará luego con header_row)
             if '_row_index' not in registro_salida:
-                try:
-                    registro_salida['_row_index'] = len(datos_transformados)  # índice base 0
-                except Exception:
-                    pass
-            
-            datos_transformados.append(registro_salida)
+                registro_salida['_row_index'] = inicio + posicion  # índice base 0
         
-        return datos_transformados
+        return registros_clasificados
     
     def obtener_estadisticas_clasificacion(self, datos_transformados: List[Dict]) -> Dict:
         """Obtiene estadísticas de la clasificación aplicada"""
@@ -1337,6 +1810,160 @@ class DataMapper:
         return '1'
 
 # Función principal del servicio
+def _usar_lectura_streaming(proceso) -> bool:
+    """Indica si el archivo del proceso supera el umbral de lectura streaming (EXCEL_STREAMING_MIN_MB)"""
+    umbral_mb = getattr(settings, 'EXCEL_STREAMING_MIN_MB', None)
+    if not umbral_mb:
+        return False
+    try:
+        return os.path.getsize(proceso.archivo_excel.path) >= umbral_mb * 1024 * 1024
+    except OSError:
+        return False
+
+
+def precargar_hojas_requeridas(libro: LibroExcel, adicionales: List[str] = None) -> None:
+    """
+    Lee de una vez las hojas que usan las etapas del proceso (estructuras,
+    conductores y norma, identificadas por nombre) más las adicionales.
+    En paralelo si EXCEL_PARSEO_PARALELO lo permite.
+    """
+    nombres_norma = ('norma de expansion', 'normas', 'norma', 'norma de reposicion', 'norma de reposición')
+    requeridas = list(adicionales or [])
+    for hoja in libro.nombres_hojas:
+        nombre = str(hoja).strip().lower()
+        if 'estructura' in nombre or nombre in nombres_norma or \
+                ('conductor' in nombre and ('n1' in nombre or 'n2' in nombre or 'n3' in nombre)):
+            requeridas.append(hoja)
+    try:
+        libro.precargar_hojas(requeridas)
+    except Exception as e:
+        # Las hojas se volverán a pedir en cada etapa; el error real aparecerá ahí
+        print(f"⚠️ No se pudieron precargar las hojas {requeridas}: {e}")
+
+
+def _almacenar_datos_transformados(proceso, datos_transformados: List[Dict]) -> None:
+    """Pasos 3 a 6 del procesamiento a partir de los datos ya transformados del Excel"""
+    _almacenar_bloques_transformados(proceso, [datos_transformados])
+
+
+def _almacenar_bloques_transformados(proceso, bloques: Iterable[List[Dict]]) -> None:
+    """
+    Pasos 3 a 6 del procesamiento, bloque a bloque: cada bloque de datos
+    transformados se mapea a norma, se clasifica y se guarda antes de pedir el
+    siguiente. Con un generador (lectura streaming) la hoja nunca está completa
+    en memoria.
+    """
+    # Para clasificación automática, usamos EXPANSION como tipo base
+    mapper = DataMapper('EXPANSION')
+    clasificador = ClasificadorEstructuras()
+    resumen = ResumenRegistros()
+    total = 0
+    
+    proceso.vaciar_registros('excel')
+    proceso.vaciar_registros('norma')
+    for datos_transformados in bloques:
+        # 3. Almacenar datos transformados en el proceso
+        proceso.agregar_registros('excel', datos_transformados)
+        
+        # 4. Mapear a norma (usando el circuito del proceso)
+        datos_norma = mapper.mapear_a_norma(datos_transformados, proceso.circuito or "")
+        
+        # 5. Aplicar clasificación inicial
+        datos_clasificados, _ = clasificador.clasificar_registros(datos_norma)
+        # Firmas del registro que reclasifica completar_campos (datos_excel combinado con datos_norma):
+        # reclasificarlo da el mismo registro de norma, así que solo se reclasifica lo que el usuario cambie
+        firmas = [
+            clasificador.firma_clasificacion({**registro_excel, **registro_norma})
+            for registro_excel, registro_norma in zip(datos_transformados, datos_clasificados)
+        ]
+        proceso.agregar_registros('norma', datos_clasificados, firmas)
+        
+        for registro in datos_transformados:
+            resumen.agregar_excel(registro)
+        for registro in datos_clasificados:
+            resumen.agregar_norma(registro)
+        total += len(datos_transformados)
+    
+    proceso.registros_totales = total
+    proceso.auditoria_clasificacion = clasificador.resumen_auditoria()
+    proceso.resumen_registros = resumen.a_dict()
+    
+    # 6. Detectar campos faltantes para completar
+    campos_faltantes = {'CIRCUITO': list(range(total))}  # Siempre falta circuito
+    
+    # ESTADO_SALUD siempre se debe completar por el usuario ya que no suele venir en archivos Excel
+    # o viene como información técnica incorrecta (como "Nivel de Tension")
+    campos_faltantes['ESTADO_SALUD'] = list(range(total))
+    
+    proceso.campos_faltantes = campos_faltantes
+    proceso.registros_procesados = proceso.registros_totales
+    proceso.estado = 'COMPLETANDO_DATOS'
+    proceso.guardar_campos(
+        'registros_totales', 'registros_procesados',
+        'auditoria_clasificacion', 'resumen_registros', 'campos_faltantes', 'estado'
+    )
+
+
+def obtener_resumen_registros(proceso) -> ResumenRegistros:
+    """
+    Resumen de registros guardado en el proceso. Los procesos anteriores a
+    resumen_registros (o de otra versión) lo calculan una vez y lo guardan.
+    """
+    resumen = ResumenRegistros.desde_dict(proceso.resumen_registros)
+    if resumen is None:
+        resumen = ResumenRegistros.calcular(proceso.iterar_registros('excel'), proceso.iterar_registros('norma'))
+        proceso.resumen_registros = resumen.a_dict()
+        if proceso.pk and (resumen.total_excel or resumen.total_norma):
+            # Solo si nadie guardó el proceso mientras tanto (p. ej. el hilo de procesamiento)
+            ProcesoEstructura.objects.filter(pk=proceso.pk, updated_at=proceso.updated_at).update(
+                resumen_registros=proceso.resumen_registros
+            )
+            print(f"📊 Resumen de registros calculado para el proceso {proceso.id}")
+    return resumen
+
+
+def buscar_proceso_reutilizable(hash_archivo: str, excluir_id=None):
+    """
+    Retorna el proceso más reciente con el mismo contenido de Excel que ya fue
+    clasificado y procesado (tiene datos_excel), o None si no existe.
+    """
+    if not hash_archivo:
+        return None
+    candidatos = ProcesoEstructura.objects.filter(
+        hash_archivo=hash_archivo,
+        estado__in=['COMPLETANDO_DATOS', 'GENERANDO_ARCHIVOS', 'COMPLETADO']
+    ).order_by('-created_at')
+    if excluir_id:
+        candidatos = candidatos.exclude(id=excluir_id)
+    for candidato in candidatos[:5]:
+        if candidato.clasificacion_automatica and candidato.tiene_registros('excel'):
+            return candidato
+    return None
+
+
+def reutilizar_procesamiento_previo(proceso, previo) -> None:
+    """
+    Completa un proceso nuevo copiando la clasificación automática y los datos
+    transformados de un proceso anterior con el mismo archivo, sin volver a
+    leer ni clasificar el Excel.
+
+    datos_norma se reconstruye desde los datos_excel copiados: la copia del
+    proceso anterior puede traer circuito/propietario que ya completó otro usuario.
+    """
+    print(f"♻️ Reutilizando procesamiento del proceso {previo.id} para {proceso.id} (mismo archivo)")
+    proceso.cambiar_estado(
+        'PROCESANDO',
+        clasificacion_automatica=previo.clasificacion_automatica,
+        total_expansion=previo.total_expansion,
+        total_reposicion_nuevo=previo.total_reposicion_nuevo,
+        total_reposicion_bajo=previo.total_reposicion_bajo,
+        total_desmantelado=previo.total_desmantelado,
+        clasificacion_confirmada=True,
+    )
+    _almacenar_datos_transformados(proceso, [dict(registro) for registro in previo.datos_excel])
+    print(f"Procesamiento reutilizado: {proceso.registros_totales} registros")
+
+
 def procesar_estructura_completo(proceso_id: str) -> None:
     """Función principal que orquesta todo el procesamiento"""
     proceso = ProcesoEstructura.objects.get(id=proceso_id)
@@ -1345,60 +1972,33 @@ def procesar_estructura_completo(proceso_id: str) -> None:
         print(f"Iniciando procesamiento del proceso {proceso_id}")
         
         # 1. Procesar Excel
-        proceso.estado = 'PROCESANDO'
-        proceso.save()
+        proceso.cambiar_estado('PROCESANDO', registros_procesados=0)
         
         processor = ExcelProcessor(proceso)
-        datos, campos_faltantes_excel = processor.procesar_archivo()
+        if _usar_lectura_streaming(proceso):
+            # Libros muy grandes: leer fila a fila sin materializar DataFrames
+            datos, campos_faltantes_excel = processor.procesar_archivo_streaming()
+        else:
+            precargar_hojas_requeridas(LibroExcel.para_proceso(proceso))
+            datos, campos_faltantes_excel = processor.procesar_archivo()
         
         if campos_faltantes_excel:
-            proceso.estado = 'ERROR'
-            proceso.errores = [f"Campos faltantes en Excel: {', '.join(campos_faltantes_excel)}"]
-            proceso.save()
+            proceso.registrar_errores([f"Campos faltantes en Excel: {', '.join(campos_faltantes_excel)}"])
             print(f"Error: campos faltantes {campos_faltantes_excel}")
             return
         
-        # 2. Transformar datos a estructura de salida
+        # 2. Transformar datos a estructura de salida (por bloques)
         # Para clasificación automática, usamos EXPANSION como tipo base
         transformer = DataTransformer('EXPANSION')
-        datos_transformados = transformer.transformar_datos(datos)
-        
-        # 3. Almacenar datos transformados en el proceso
-        proceso.registros_totales = len(datos_transformados)
-        proceso.datos_excel = datos_transformados
-        
-        # 4. Mapear a norma (usando el circuito del proceso)
-        # Para clasificación automática, usamos EXPANSION como tipo base
-        mapper = DataMapper('EXPANSION')
-        datos_norma = mapper.mapear_a_norma(datos_transformados, proceso.circuito or "")
-        
-        # 5. Aplicar clasificación inicial
-        clasificador = ClasificadorEstructuras()
-        datos_clasificados = []
-        for registro in datos_norma:
-            registro_clasificado = clasificador.clasificar_estructura(registro)
-            datos_clasificados.append(registro_clasificado)
+        bloques = transformer.transformar_por_bloques(datos, progreso=proceso.actualizar_progreso)
         
-        proceso.datos_norma = datos_clasificados
+        # 3-6. Almacenar, mapear a norma, clasificar y marcar campos por completar, bloque a bloque
+        _almacenar_bloques_transformados(proceso, bloques)
         
-        # 6. Detectar campos faltantes para completar
-        campos_faltantes = {'CIRCUITO': list(range(len(datos_transformados)))}  # Siempre falta circuito
-        
-        # ESTADO_SALUD siempre se debe completar por el usuario ya que no suele venir en archivos Excel
-        # o viene como información técnica incorrecta (como "Nivel de Tension")
-        campos_faltantes['ESTADO_SALUD'] = list(range(len(datos_transformados)))
-        
-        proceso.campos_faltantes = campos_faltantes
-        proceso.registros_procesados = proceso.registros_totales
-        proceso.estado = 'COMPLETANDO_DATOS'
-        proceso.save()
-        
-        print(f"Procesamiento completado: {len(datos_transformados)} registros transformados")
+        print(f"Procesamiento completado: {proceso.registros_totales} registros transformados")
         
     except Exception as e:
-        proceso.estado = 'ERROR'
-        proceso.errores = [str(e)]
-        proceso.save()
+        proceso.registrar_errores([str(e)])
         print(f"Error en procesamiento: {str(e)}")
         raise
 
@@ -1498,32 +2098,15 @@ class FileGenerator:
         Extrae el valor de 'Código FID_rep' de un registro probando varias claves
         y normalizando el resultado. Retorna cadena vacía si no existe o es inválido.
         """
-        # 1. Comprobar claves explícitas comunes
-        explicit_keys = ['Código FID_rep', 'Codigo FID_rep', 'CODIGO_FID_REP', 'codigo_fid_rep', 'FID_ANTERIOR', 'FID']
-        for k in explicit_keys:
-            if k in registro:
-                v = registro.get(k)
-                if v is None:
-                    continue
-                vs = self._limpiar_fid(v)
-                if vs:
-                    return vs
-
-        # 2. Buscar cualquier clave cuyo nombre normalizado contenga 'fid' (aceptar variantes)
-        try:
-            for key in registro.keys():
-                if not isinstance(key, str):
-                    continue
-                key_norm = self._normalize_col_name(key)
-                if 'fid' in key_norm:
-                    v = registro.get(key)
-                    if v is None:
-                        continue
-                    vs = self._limpiar_fid(v)
-                    if vs:
-                        return vs
-        except Exception:
-            pass
+        # Claves explícitas comunes primero y luego cualquier clave cuyo nombre
+        # normalizado contenga 'fid' (resuelto una vez por conjunto de columnas)
+        for k in IndiceEncabezados.para(registro).columnas_de('fid_rep', 'fid_rep'):
+            v = registro[k]
+            if v is None:
+                continue
+            vs = self._limpiar_fid(v)
+            if vs:
+                return vs
 
         return ''
 
@@ -2154,22 +2737,51 @@ class FileGenerator:
                     registros_enriquecidos = 0
                     muestras = []  # Guardar algunas muestras de cambios para diagnóstico
                     
+                    # Buscar código operativo usando detección robusta (patrón Z+digitos en cualquier campo)
+                    # Usar la fila CRUDA original mapeada por índice para que siga alineada tras el filtrado
+                    codigos_por_registro = []
+                    for i, registro in enumerate(datos_finales):
+                        idx_excel = idx_map[i] if 'idx_map' in locals() and i < len(idx_map) else i
+                        registro_excel = raw_datos_excel[idx_excel] if idx_excel < len(raw_datos_excel) else {}
+                        try:
+                            codigos_por_registro.append(self._extraer_codigo_operativo(registro, registro_excel))
+                        except Exception:
+                            codigos_por_registro.append('')
+                    
+                    # PASO 1: Obtener FID real de todos los códigos operativos en bloque
+                    # (los de reposiciones sin caché: la reposición cambia el FID del código)
+                    codigos_reposicion = set()
+                    if 'indices_con_fid_rep' in locals():
+                        for i, codigo in enumerate(codigos_por_registro):
+                            idx_excel = idx_map[i] if 'idx_map' in locals() and i < len(idx_map) else i
+                            if idx_excel in indices_con_fid_rep:
+                                codigos_reposicion.add(codigo)
+                    fids_por_codigo = OracleHelper.obtener_fids_desde_codigos_operativos(
+                        codigo for codigo in codigos_por_registro
+                        if codigo and str(codigo).strip().upper().startswith('Z') and codigo not in codigos_reposicion
+                    )
+                    fids_por_codigo.update(OracleHelper.obtener_fids_desde_codigos_operativos(
+                        (codigo for codigo in codigos_reposicion
+                         if codigo and str(codigo).strip().upper().startswith('Z')),
+                        usar_cache=False
+                    ))
+                    
+                    # PASO 2 (en bloque): UC, coordenadas, tipo y propietario de todos los FID resueltos
+                    datos_por_fid = OracleHelper.obtener_datos_txt_por_fids(fids_por_codigo.values())
+                    
                     for i, registro in enumerate(datos_finales):
                         try:
-                            # Buscar código operativo usando detección robusta (patrón Z+digitos en cualquier campo)
-                            # Usar la fila CRUDA original mapeada por índice para que siga alineada tras el filtrado
                             idx_excel = idx_map[i] if 'idx_map' in locals() and i < len(idx_map) else i
                             registro_excel = raw_datos_excel[idx_excel] if idx_excel < len(raw_datos_excel) else {}
                             # Determinar si es REPOSICIÓN (tiene 'Código FID_rep' en el Excel original exacto)
                             es_reposicion = 'indices_con_fid_rep' in locals() and idx_excel in indices_con_fid_rep
-                            codigo_operativo = self._extraer_codigo_operativo(registro, registro_excel)
+                            codigo_operativo = codigos_por_registro[i]
                             
                             if codigo_operativo and str(codigo_operativo).strip().upper().startswith('Z'):
                                 codigos_encontrados += 1
                                 print(f"🔍 Registro NUEVO {i+1} - Código operativo: {codigo_operativo}")
                                 
-                                # PASO 1: Obtener FID real desde código operativo
-                                fid_real = OracleHelper.obtener_fid_desde_codigo_operativo(codigo_operativo)
+                                fid_real = fids_por_codigo.get(str(codigo_operativo).strip(), '')
                                 
                                 if fid_real:
                                     # Si es reposición, asignar FID_ANTERIOR
@@ -2178,18 +2790,16 @@ class FileGenerator:
                                             registro['FID_ANTERIOR'] = self._limpiar_fid(fid_real)
                                         except Exception:
                                             registro['FID_ANTERIOR'] = str(fid_real)
-                                    # NUEVO: Intentar obtener UC desde BD por FID para TXT NUEVO
-                                    try:
-                                        uc_db = OracleHelper.obtener_uc_por_fid(fid_real)
-                                        if uc_db:
-                                            registro['UC'] = uc_db
-                                            print(f"   UC desde BD aplicada (NUEVO): {uc_db}")
-                                    except Exception as e:
-                                        print(f"   DEBUG: fallo obteniendo UC (NUEVO) por FID {fid_real}: {e}")
-                                    # PASO 2: Obtener datos específicos para TXT nuevo desde Oracle
-                                    datos_oracle = OracleHelper.obtener_datos_txt_nuevo_por_fid(fid_real)
+                                    # PASO 2: Datos específicos para TXT nuevo (consultados en bloque)
+                                    datos_oracle = datos_por_fid.get(fid_real, {})
+                                    # NUEVO: UC desde BD por FID para TXT NUEVO
+                                    uc_db = datos_oracle.get('UC', '')
+                                    if uc_db:
+                                        registro['UC'] = uc_db
+                                        print(f"   UC desde BD aplicada (NUEVO): {uc_db}")
                                     
-                                    if datos_oracle:
+                                    # Solo con UC (sin COORDENADA_X): FID sin registro en CCOMUN
+                                    if 'COORDENADA_X' in datos_oracle:
                                         # Aplicar enriquecimiento Oracle (IGUAL QUE EN TXT BAJA)
                                         print(f"📊 Enriqueciendo registro NUEVO {i+1} con datos Oracle:")
                                         print(f"   Coordenadas Excel: X={registro.get('COORDENADA_X')}, Y={registro.get('COORDENADA_Y')}")
@@ -2291,9 +2901,7 @@ class FileGenerator:
             # Si hay errores (incluyendo UC), persistir y abortar antes de escribir archivos
             if errores_validacion:
                 try:
-                    self.proceso.errores = errores_validacion
-                    self.proceso.estado = 'ERROR'
-                    self.proceso.save()
+                    self.proceso.registrar_errores(errores_validacion)
                 except Exception:
                     pass
                 raise Exception("VALIDATION_ERRORS")
@@ -2417,16 +3025,7 @@ class FileGenerator:
             raise Exception(f"Error generando archivo TXT: {str(e)}")
 
     def _normalize_col_name(self, s):
-        if s is None:
-            return ''
-        ns = str(s)
-        ns = ns.replace('\n', ' ').replace('\r', ' ')
-        ns = ns.replace('_', ' ')
-        ns = re.sub(r"\s+", ' ', ns)
-        ns = ns.strip().lower()
-        trans = str.maketrans('áéíóúÁÉÍÓÚ', 'aeiouAEIOU')
-        ns = ns.translate(trans)
-        return ns
+        return normalizar_nombre_columna(s)
 
     def generar_txt_baja(self):
         """
@@ -2667,6 +3266,7 @@ class FileGenerator:
             codigos_encontrados = 0
             registros_resueltos = 0
 
+            codigos_por_registro = []
             for i, registro in enumerate(datos_finales):
                 try:
                     codigo = self._extraer_fid_rep(registro) or registro.get('FID_ANTERIOR', '')
@@ -2677,12 +3277,28 @@ class FileGenerator:
                             if v and str(v).strip():
                                 codigo = str(v).strip()
                                 break
+                    codigos_por_registro.append(str(codigo).strip() if codigo else '')
+                except Exception as e:
+                    print(f"❌ Error resolviendo G3E_FID en registro BAJA {i+1}: {e}")
+                    codigos_por_registro.append(None)
+
+            # Códigos operativos (Z...) resueltos en bloque
+            fids_por_codigo = {}
+            if oracle_disponible:
+                fids_por_codigo = OracleHelper.obtener_fids_desde_codigos_operativos(
+                    codigo for codigo in codigos_por_registro if codigo and codigo.upper().startswith('Z')
+                )
+
+            for i, registro in enumerate(datos_finales):
+                try:
+                    codigo_norm = codigos_por_registro[i]
+                    if codigo_norm is None:
+                        continue
 
-                    if codigo:
+                    if codigo_norm:
                         codigos_encontrados += 1
-                        codigo_norm = str(codigo).strip()
                         if oracle_disponible and codigo_norm.upper().startswith('Z'):
-                            fid_real = OracleHelper.obtener_fid_desde_codigo_operativo(codigo_norm)
+                            fid_real = fids_por_codigo.get(codigo_norm, '')
                             if fid_real:
                                 registro['G3E_FID'] = str(fid_real)
                                 registros_resueltos += 1
@@ -3303,11 +3919,11 @@ class FileGenerator:
             # 1) Intentar leer hoja de Normas explícita del Excel como fuente preferida
             registros_norma = []
             try:
-                archivo_path = self.proceso.archivo_excel.path
+                libro = LibroExcel.para_proceso(self.proceso)
                 # Candidatos de nombre de hoja
                 hojas_candidatas = []
                 try:
-                    hojas = pd.ExcelFile(archivo_path).sheet_names
+                    hojas = libro.nombres_hojas
                     hojas_candidatas = [
                         h for h in hojas if str(h).strip().lower() in (
                             'norma de expansion', 'normas', 'norma', 'norma de reposicion', 'norma de reposición'
@@ -3318,19 +3934,21 @@ class FileGenerator:
 
                 if hojas_candidatas:
                     nombre_hoja_norma = hojas_candidatas[0]
-                    # Detectar fila de encabezado 0-2
-                    df_norma = None
-                    for header_row in [0, 1, 2]:
-                        try:
-                            temp_df = pd.read_excel(archivo_path, sheet_name=nombre_hoja_norma, header=header_row)
-                            valid_headers = [c for c in temp_df.columns if not str(c).startswith('Unnamed:') and str(c).strip().lower() != 'nan']
-                            if len(valid_headers) >= 3:
-                                df_norma = temp_df
-                                break
-                        except Exception:
-                            continue
-                    if df_norma is None:
-                        df_norma = pd.read_excel(archivo_path, sheet_name=nombre_hoja_norma, header=0)
+                    # Detectar fila de encabezado 0-2 (al menos 3 headers válidos) sobre las filas superiores
+                    def headers_norma_validos(columnas):
+                        valid_headers = [c for c in columnas if not str(c).startswith('Unnamed:') and str(c).strip().lower() != 'nan']
+                        return len(valid_headers) >= 3
+                    metadatos = libro.metadatos.get('norma')
+                    if metadatos and metadatos.get('hoja') == nombre_hoja_norma:
+                        header_row = metadatos['header_row']
+                    else:
+                        header_row = libro.detectar_fila_encabezado(
+                            nombre_hoja_norma,
+                            [(fila, headers_norma_validos) for fila in (0, 1, 2)],
+                            fila_defecto=0
+                        )
+                        libro.registrar_metadatos('norma', nombre_hoja_norma, header_row)
+                    df_norma = libro.hoja(nombre_hoja_norma, header=header_row)
 
                     # Normalizar y mapear
                     for _, row in df_norma.iterrows():
@@ -3374,16 +3992,16 @@ class FileGenerator:
                 archivo_path = self.proceso.archivo_excel.path
                 print(f"[TXT Norma] Leyendo archivo Excel para detectar bajas: {archivo_path}")
                 
-                # Leer todas las hojas
-                df_dict = pd.read_excel(archivo_path, sheet_name=None)
+                # Reutilizar el libro ya parseado del proceso
+                libro = LibroExcel.para_proceso(self.proceso)
                 
                 # Buscar la hoja de estructuras
                 nombre_hoja_estructuras = None
-                if 'Estructuras_N1-N2-N3' in df_dict:
+                if 'Estructuras_N1-N2-N3' in libro.nombres_hojas:
                     nombre_hoja_estructuras = 'Estructuras_N1-N2-N3'
                 else:
                     # Buscar hojas que contengan "Estructura" en el nombre
-                    for hoja in df_dict.keys():
+                    for hoja in libro.nombres_hojas:
                         if 'estructura' in str(hoja).lower():
                             nombre_hoja_estructuras = hoja
                             break
@@ -3392,16 +4010,16 @@ class FileGenerator:
                     print(f"[TXT Norma] Hoja de estructuras encontrada: '{nombre_hoja_estructuras}'")
                     
                     # Leer la hoja de estructuras SIN PROCESAR ENCABEZADOS primero para detectar formato
-                    df_test = pd.read_excel(archivo_path, sheet_name=nombre_hoja_estructuras, nrows=2)
-                    tiene_encabezados = not all('Unnamed:' in str(col) for col in df_test.columns)
+                    columnas_test = libro.encabezados(nombre_hoja_estructuras, 0)
+                    tiene_encabezados = not all('Unnamed:' in str(col) for col in columnas_test)
                     
                     if not tiene_encabezados:
                         print("[TXT Norma] ⚠️ Excel sin encabezados detectado. Leyendo con header=None")
                         # Leer sin encabezados
-                        df_estructuras = pd.read_excel(archivo_path, sheet_name=nombre_hoja_estructuras, header=None)
+                        df_estructuras = libro.hoja(nombre_hoja_estructuras, header=None)
                     else:
                         # Leer con encabezados normales
-                        df_estructuras = pd.read_excel(archivo_path, sheet_name=nombre_hoja_estructuras)
+                        df_estructuras = libro.hoja(nombre_hoja_estructuras)
                         df_estructuras.columns = [str(col).strip() for col in df_estructuras.columns]
                     
                     print(f"[TXT Norma] Total filas en estructuras: {len(df_estructuras)}")
@@ -3456,24 +4074,35 @@ class FileGenerator:
             # ORDEN IGUAL QUE XML NORMA (sin ENLACE)
             campos_orden = ['NORMA', 'GRUPO', 'CIRCUITO', 'CODIGO_TRAFO', 'MACRONORMA', 'CANTIDAD', 'TIPO_ADECUACION']
 
+            # Base de cada registro: datos del Excel
+            filas_norma = []
+            for reg in registros_norma:
+                reg_out = {c: str(reg.get(c, '') or '').strip() for c in campos_orden}
+                enlace_upper = reg_out.get('ENLACE', '').strip().upper()
+                filas_norma.append((reg_out, enlace_upper, enlace_a_codigo_op.get(enlace_upper)))
+
+            # FID de las bajas (código operativo) y del resto (ENLACE), y su norma en BD, en bloque
+            fids_por_codigo = OracleHelper.obtener_fids_desde_codigos_operativos(enlace_a_codigo_op.values())
+            fids_por_enlace = OracleHelper.obtener_fids_desde_enlaces(
+                enlace_upper for _, enlace_upper, codigo_op in filas_norma if not codigo_op
+            )
+            normas_por_fid = OracleHelper.obtener_normas_por_fids(
+                fids_por_codigo.get(str(codigo_op).strip(), '') if codigo_op else fids_por_enlace.get(enlace_upper, '')
+                for _, enlace_upper, codigo_op in filas_norma
+            )
+
             with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
                 f.write('|'.join(campos_orden) + '\n')
 
-                for reg in registros_norma:
-                    # Base: datos del Excel
-                    reg_out = {c: str(reg.get(c, '') or '').strip() for c in campos_orden}
-                    
-                    enlace_upper = reg_out.get('ENLACE', '').strip().upper()
-                    codigo_op = enlace_a_codigo_op.get(enlace_upper)
-                    
+                for reg_out, enlace_upper, codigo_op in filas_norma:
                     # CASO 1: Si es BAJA (tiene código operativo) - merge BD completo
                     if codigo_op:
                         try:
                             # Resolver FID desde código operativo
-                            fid_real = OracleHelper.obtener_fid_desde_codigo_operativo(codigo_op)
+                            fid_real = fids_por_codigo.get(str(codigo_op).strip(), '')
                             if fid_real:
-                                # Consultar BD
-                                datos_bd = OracleHelper.obtener_norma_por_fid(fid_real) or {}
+                                # Datos de norma en BD (consultados en bloque)
+                                datos_bd = normas_por_fid.get(str(fid_real).strip()) or {}
                                 # Merge campo a campo: BD tiene prioridad si no vacío
                                 for campo in ['NORMA', 'GRUPO', 'CIRCUITO', 'CODIGO_TRAFO', 'MACRONORMA', 'CANTIDAD', 'TIPO_ADECUACION']:
                                     val_bd = str(datos_bd.get(campo, '') or '').strip()
@@ -3489,11 +4118,11 @@ class FileGenerator:
                     else:
                         try:
                             # Buscar FID desde ENLACE
-                            fid_desde_enlace = OracleHelper.obtener_fid_desde_enlace(enlace_upper)
+                            fid_desde_enlace = fids_por_enlace.get(enlace_upper, '')
                             
                             if fid_desde_enlace:
-                                # Consultar datos de norma en BD
-                                datos_bd = OracleHelper.obtener_norma_por_fid(fid_desde_enlace) or {}
+                                # Datos de norma en BD (consultados en bloque)
+                                datos_bd = normas_por_fid.get(str(fid_desde_enlace).strip()) or {}
                                 
                                 # Validación campo por campo: solo cambiar si Excel != BD
                                 cambios = []
@@ -4042,15 +4671,22 @@ class FileGenerator:
             # 3. Resolver G3E_FID (convertir código operativo a FID si es necesario)
             oracle_disponible = OracleHelper.test_connection()
             
+            codigos_git = [self._extraer_campo_conductor(registro, 'codigo_fid_git') for registro in datos_baja]
+            fids_por_codigo = {}
+            if oracle_disponible:
+                fids_por_codigo = OracleHelper.obtener_fids_desde_codigos_operativos(
+                    codigo for codigo in codigos_git if codigo and str(codigo).strip().upper().startswith('Z')
+                )
+            
             for i, registro in enumerate(datos_baja):
-                codigo_git = self._extraer_campo_conductor(registro, 'codigo_fid_git')
+                codigo_git = codigos_git[i]
                 
                 if codigo_git:
                     codigo_norm = str(codigo_git).strip()
                     
                     # Si el código empieza con 'Z', es código operativo y debe convertirse
                     if oracle_disponible and codigo_norm.upper().startswith('Z'):
-                        fid_real = OracleHelper.obtener_fid_desde_codigo_operativo(codigo_norm)
+                        fid_real = fids_por_codigo.get(codigo_norm, '')
                         if fid_real:
                             registro['G3E_FID'] = str(fid_real)
                             print(f"✅ Código operativo '{codigo_norm}' convertido a FID '{fid_real}'")
@@ -4349,14 +4985,14 @@ class FileGenerator:
             Lista de diccionarios con los datos de conductores
         """
         try:
-            archivo_path = self.proceso.archivo_excel.path
-            
-            # Leer todas las hojas
-            df_dict = pd.read_excel(archivo_path, sheet_name=None)
+            # Reutilizar el libro ya parseado del proceso
+            libro = LibroExcel.para_proceso(self.proceso)
+            if ('conductores',) in libro.resultados:
+                return [dict(registro) for registro in libro.resultados[('conductores',)]]
             
             # Buscar la hoja de conductores
             nombre_hoja = None
-            for hoja in df_dict.keys():
+            for hoja in libro.nombres_hojas:
                 if 'conductor' in hoja.lower() and ('n1' in hoja.lower() or 'n2' in hoja.lower() or 'n3' in hoja.lower()):
                     nombre_hoja = hoja
                     break
@@ -4368,9 +5004,6 @@ class FileGenerator:
             
             # Intentar diferentes estrategias para encontrar headers (igual que estructuras)
             # Para conductores, buscamos headers que contengan nombres de campos esperados
-            df = None
-            header_row = None
-            
             # Palabras clave que identifican headers reales de conductores
             keywords_conductor = ['coordenada', 'identificador', 'código', 'fid', 'unidad', 'constructiva',
                                  'longitud', 'latitud', 'calibre', 'tensión', 'propietario']
@@ -4385,49 +5018,28 @@ class FileGenerator:
                         count += 1
                 return count
             
-            # Estrategia 1: Headers en fila 0
-            try:
-                temp_df = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=0)
-                valid_count = contar_headers_conductor(temp_df.columns)
-                print(f"🔍 Fila 0: {valid_count} headers de conductor encontrados")
-                if valid_count >= 5:  # Al menos 5 campos esperados
-                    df = temp_df
-                    header_row = 0
-                    print("✅ Headers de conductor encontrados en fila 0")
-            except Exception as e:
-                print(f"⚠️ Error leyendo fila 0: {e}")
-            
-            # Estrategia 2: Headers en fila 1
-            if df is None:
-                try:
-                    temp_df = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=1)
-                    valid_count = contar_headers_conductor(temp_df.columns)
-                    print(f"🔍 Fila 1: {valid_count} headers de conductor encontrados")
-                    if valid_count >= 5:
-                        df = temp_df
-                        header_row = 1
-                        print("✅ Headers de conductor encontrados en fila 1")
-                except Exception as e:
-                    print(f"⚠️ Error leyendo fila 1: {e}")
-            
-            # Estrategia 3: Headers en fila 2
-            if df is None:
-                try:
-                    temp_df = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=2)
-                    valid_count = contar_headers_conductor(temp_df.columns)
-                    print(f"🔍 Fila 2: {valid_count} headers de conductor encontrados")
-                    if valid_count >= 5:
-                        df = temp_df
-                        header_row = 2
-                        print("✅ Headers de conductor encontrados en fila 2")
-                except Exception as e:
-                    print(f"⚠️ Error leyendo fila 2: {e}")
-            
-            # Si no encontramos headers válidos, usar fila 2 como fallback (más probable para conductores)
-            if df is None:
-                print("⚠️ No se detectaron headers automáticamente, usando fila 2 como fallback")
-                df = pd.read_excel(archivo_path, sheet_name=nombre_hoja, header=2)
-                header_row = 2
+            def es_header_conductor(fila):
+                def criterio(columns):
+                    valid_count = contar_headers_conductor(columns)
+                    print(f"🔍 Fila {fila}: {valid_count} headers de conductor encontrados")
+                    return valid_count >= 5  # Al menos 5 campos esperados
+                return criterio
+            
+            metadatos = libro.metadatos.get('conductores')
+            if metadatos and metadatos.get('hoja') == nombre_hoja:
+                header_row = metadatos['header_row']
+                print(f"✅ Headers de conductor en fila {header_row} (caché de parseo)")
+            else:
+                # Evaluar filas 0, 1 y 2 leyendo solo las filas superiores; si ninguna
+                # cumple, usar fila 2 como fallback (más probable para conductores)
+                header_row = libro.detectar_fila_encabezado(
+                    nombre_hoja,
+                    [(fila, es_header_conductor(fila)) for fila in (0, 1, 2)],
+                    fila_defecto=2
+                )
+                print(f"✅ Headers de conductor en fila {header_row}")
+                libro.registrar_metadatos('conductores', nombre_hoja, header_row)
+            df = libro.hoja(nombre_hoja, header=header_row)
             
             print(f"📊 Columnas encontradas en '{nombre_hoja}' (header en fila {header_row}):")
             for idx, col in enumerate(df.columns[:10], 1):  # Mostrar solo primeras 10
@@ -4449,17 +5061,10 @@ class FileGenerator:
                         print(f"   {col}: '{valor}'")
             
             # Convertir a lista de diccionarios
-            datos = []
-            for _, row in df.iterrows():
-                registro = {}
-                for col, val in row.items():
-                    if pd.isna(val):
-                        registro[col] = ""
-                    else:
-                        registro[col] = str(val).strip()
-                datos.append(registro)
+            datos = DataUtils.registros_desde_dataframe(df)
             
-            return datos
+            libro.resultados[('conductores',)] = datos
+            return [dict(registro) for registro in datos]
             
         except Exception as e:
             raise Exception(f"Error leyendo hoja de conductores: {str(e)}")
@@ -4493,95 +5098,12 @@ class FileGenerator:
         Returns:
             Valor del campo o cadena vacía si no se encuentra
         """
-        variantes = {
-            'codigo_fid_git': [
-                'Código FID\nGIT', 'Código FID GIT', 'Codigo FID GIT', 
-                'CODIGO_FID_GIT', 'código fid git', 'codigo fid git', 
-                'FID_GIT', 'FID GIT', 'Código FID_rep'
-            ],
-            'unidad_constructiva': [
-                'Unidad Constructiva', 'UNIDAD_CONSTRUCTIVA',
-                'unidad constructiva', 'UC', 'UNIDAD CONSTRUCTIVA'
-            ],
-            'identificador': [
-                'Identificador_1', 'Identificador_2', 'Identificador', 
-                'IDENTIFICADOR', 'identificador', 'ID', 'Id', 'ENLACE'
-            ],
-            'fecha_instalacion': [
-                'Fecha Instalacion\nDD/MM/YYYY', 'Fecha Instalacion DD/MM/YYYY', 
-                'Fecha Instalación', 'FECHA_INSTALACION', 'Fecha Instalacion', 
-                'fecha instalacion'
-            ],
-            'coordenada_x1': [
-                'Coordenada_X1\nLONGITUD', 'Coordenada_X1 LONGITUD', 
-                'Coordenada_X1', 'COORDENADA_X1', 'coordenada x1', 
-                'Coordenada X1', 'LONGITUD'
-            ],
-            'coordenada_y1': [
-                'Coordenada_Y1\nLATITUD', 'Coordenada_Y1 LATITUD',
-                'Coordenada_Y1', 'COORDENADA_Y1', 'coordenada y1',
-                'Coordenada Y1', 'LATITUD'
-            ],
-            'coordenada_x2': [
-                'Coordenada_X2\nLONGITUD2', 'Coordenada_X2 LONGITUD2',
-                'Coordenada_X2', 'COORDENADA_X2', 'coordenada x2',
-                'Coordenada X2', 'LONGITUD2'
-            ],
-            'coordenada_y2': [
-                'Coordenada_Y2\nLATITUD3', 'Coordenada_Y2 LATITUD3',
-                'Coordenada_Y2', 'COORDENADA_Y2', 'coordenada y2',
-                'Coordenada Y2', 'LATITUD3'
-            ],
-            'nivel_tension': [
-                'Nivel de Tension', 'Nivel de Tensión', 'NIVEL_TENSION',
-                'nivel tension', 'Nivel Tension'
-            ],
-            'municipio': [
-                'Municipio', 'MUNICIPIO', 'municipio'
-            ],
-            'fases': [
-                'Fases', 'FASES', 'fases'
-            ],
-            'numero_conductores': [
-                'Número de conductores', 'Numero de conductores',
-                'NUMERO_CONDUCTORES', 'numero conductores'
-            ],
-            'clase': [
-                'CLASE', 'Clase', 'clase'
-            ],
-            'poblacion': [
-                'POBLACION', 'Poblacion', 'poblacion', 'Población'
-            ],
-            'tipo': [
-                'TIPO', 'Tipo', 'tipo'
-            ],
-            'material': [
-                'MATERIAL', 'Material', 'material'
-            ],
-            'calibre': [
-                'CALIBRE', 'Calibre', 'calibre'
-            ]
-        }
-        
-        # Buscar el campo en el registro
-        nombres_posibles = variantes.get(campo_tipo, [])
-        
-        for nombre in nombres_posibles:
-            if nombre in registro:
-                valor = registro[nombre]
-                if valor and str(valor).strip() and str(valor).strip().lower() not in ('nan', 'none', 'null', ''):
-                    return str(valor).strip()
-        
-        # Búsqueda flexible (normalizada) - quitar saltos de línea y espacios
-        for key, value in registro.items():
-            if isinstance(key, str):
-                # Normalizar: quitar saltos de línea, espacios extras, guiones bajos
-                key_norm = key.lower().replace('\n', '').replace(' ', '').replace('_', '').strip()
-                for nombre in nombres_posibles:
-                    nombre_norm = nombre.lower().replace('\n', '').replace(' ', '').replace('_', '').strip()
-                    if key_norm == nombre_norm:
-                        if value and str(value).strip() and str(value).strip().lower() not in ('nan', 'none', 'null', ''):
-                            return str(value).strip()
+        # Variantes exactas (encabezados.VARIANTES_CONDUCTOR) y luego coincidencias
+        # flexibles sin saltos de línea, espacios ni '_', resueltas una vez por hoja
+        for nombre in IndiceEncabezados.para(registro).columnas_de(campo_tipo, 'conductor'):
+            valor = registro[nombre]
+            if valor and str(valor).strip() and str(valor).strip().lower() not in ('nan', 'none', 'null', ''):
+                return str(valor).strip()
         
         return ''
 
@@ -4638,27 +5160,43 @@ class FileGenerator:
         datos_enriquecidos = []
         registros_enriquecidos = 0
         
+        campos_conductor = [
+            (self._extraer_campo_conductor(registro, 'codigo_fid_git'),
+             self._extraer_campo_conductor(registro, 'unidad_constructiva'))
+            for registro in datos
+        ]
+        # Códigos operativos de las reposiciones resueltos en bloque (sin caché: la reposición cambia el FID)
+        fids_por_codigo = OracleHelper.obtener_fids_desde_codigos_operativos(
+            (fid_git for fid_git, unidad_constructiva in campos_conductor
+             if fid_git and unidad_constructiva and fid_git.upper().startswith('Z')),
+            usar_cache=False
+        )
+        # FID de cada reposición (el código operativo convertido si se resolvió) y sus datos en Oracle, en bloque
+        fids_reales = [
+            ((fids_por_codigo.get(fid_git.strip(), '') if fid_git.upper().startswith('Z') else '') or fid_git)
+            if fid_git and unidad_constructiva else ''
+            for fid_git, unidad_constructiva in campos_conductor
+        ]
+        conductores_oracle = self._consultar_conductores_oracle(fid_real for fid_real in fids_reales if fid_real)
+        
         for i, registro in enumerate(datos):
-            fid_git = self._extraer_campo_conductor(registro, 'codigo_fid_git')
-            unidad_constructiva = self._extraer_campo_conductor(registro, 'unidad_constructiva')
+            fid_git, unidad_constructiva = campos_conductor[i]
             
             # Solo enriquecer si es REPOSICIÓN (tiene ambos campos)
             if fid_git and unidad_constructiva:
                 print(f"🔍 REPOSICIÓN detectada en registro {i+1}: FID='{fid_git}', UC='{unidad_constructiva}'")
                 
-                # Convertir código operativo a FID si es necesario
-                fid_real = fid_git
+                # Código operativo convertido a FID si era necesario
+                fid_real = fids_reales[i]
                 if fid_git.upper().startswith('Z'):
-                    fid_convertido = OracleHelper.obtener_fid_desde_codigo_operativo(fid_git)
-                    if fid_convertido:
-                        fid_real = str(fid_convertido)
+                    if fid_git.strip() in fids_por_codigo:
                         print(f"  ✅ Código operativo '{fid_git}' → FID '{fid_real}'")
                     else:
                         print(f"  ⚠️ No se pudo convertir código operativo '{fid_git}' a FID")
                 
-                # Consultar coordenadas del conductor en Oracle
+                # Coordenadas del conductor en Oracle (consultadas en bloque)
                 try:
-                    datos_oracle = self._consultar_conductor_oracle(fid_real)
+                    datos_oracle = conductores_oracle.get(str(fid_real).strip())
                     
                     if datos_oracle:
                         # Comparar y reemplazar coordenadas (nombres de BD Oracle)
@@ -4704,138 +5242,298 @@ class FileGenerator:
         """
         Consulta datos de un conductor en Oracle por su código.
         
+        Args:
+            codigo: Código del conductor (ej: 'L129251', 'AMVLS75784', 'GLVL38505')
+            
+        Returns:
+            Dict con datos del conductor o None si no existe
+        """
+        return self._consultar_conductores_oracle([codigo]).get(str(codigo).strip())
+    
+    def _consultar_conductores_oracle(self, codigos: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Consulta en bloque los datos de conductores en Oracle por su código.
+        
         Query basada en la proporcionada:
         SELECT coordenadas y otros campos desde econ_pri_at, ccomun, cpropietario
+        con IN de hasta MAX_BINDS_IN códigos; la caché local (entidad
+        'conductor_codigo') se lee y se escribe una vez por llamada.
         
         Args:
-            codigo: Código del conductor (ej: 'L129251', 'AMVLS75784', 'GLVL38505')
+            codigos: Códigos de los conductores (pueden repetirse o venir vacíos)
             
         Returns:
-            Dict con datos del conductor o None si no existe
+            Dict {codigo (sin espacios): datos del conductor o None si no existe}.
+            Los códigos no consultados por un error de conexión no aparecen.
         """
+        codigos_limpios = list(dict.fromkeys(
+            codigo for codigo in (str(c).strip() for c in codigos if c is not None) if codigo
+        ))
+        if not codigos_limpios:
+            return {}
+        
+        # Caché local (estructuras/cache_oracle.py): a Oracle solo van los códigos que faltan o vencieron
+        resultado: Dict[str, Optional[Dict]] = CacheOracle.obtener_varios('conductor_codigo', codigos_limpios)
+        pendientes = CacheOracle.pendientes(codigos_limpios, resultado)
+        if not pendientes:
+            return resultado
+        
+        consultados: Dict[str, Optional[Dict]] = {}
         try:
             # Query para obtener datos completos del conductor
             # Basada en: econ_pri_at JOIN ccomun JOIN cpropietario
             # IMPORTANTE: Buscar por cp.codigo (código operativo como 'L129251')
             # Usa USING (g3e_fid) para simplificar los JOINs
-            query = """
-                SELECT 
-                    c.coor_gps_lon,
-                    c.coor_gps_lat,
-                    c.estado,
-                    c.ubicacion,
-                    c.codigo_material,
-                    c.fecha_instalacion,
-                    c.fecha_operacion,
-                    c.proyecto,
-                    c.empresa_origen,
-                    c.observaciones,
-                    c.tipo_proyecto,
-                    c.id_mercado,
-                    c.clasificacion_mercado,
-                    c.uc,
-                    c.estado_salud,
-                    c.ot_maximo,
-                    c.codigo_marcacion,
-                    c.salinidad,
-                    cp.uso,
-                    pr.propietario_1,
-                    pr.porcentaje_prop_1,
-                    cp.g3e_fid,
-                    cp.codigo
-                FROM econ_pri_at cp
-                JOIN ccomun c USING (g3e_fid)
-                LEFT JOIN cpropietario pr USING (g3e_fid)
-                WHERE cp.codigo = :codigo
-                AND ROWNUM = 1
-            """
-            
-            with OracleHelper.get_connection() as conn:
+            with OracleHelper.conexion() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute(query, {'codigo': codigo})
-                    row = cursor.fetchone()
-                    
-                    if row:
-                        # Extraer columnas
+                    for bloque in OracleHelper._bloques_binds(pendientes):
+                        binds = {f"c{n}": codigo for n, codigo in enumerate(bloque)}
+                        query = f"""
+                        SELECT 
+                            c.coor_gps_lon,
+                            c.coor_gps_lat,
+                            c.estado,
+                            c.ubicacion,
+                            c.codigo_material,
+                            c.fecha_instalacion,
+                            c.fecha_operacion,
+                            c.proyecto,
+                            c.empresa_origen,
+                            c.observaciones,
+                            c.tipo_proyecto,
+                            c.id_mercado,
+                            c.clasificacion_mercado,
+                            c.uc,
+                            c.estado_salud,
+                            c.ot_maximo,
+                            c.codigo_marcacion,
+                            c.salinidad,
+                            cp.uso,
+                            pr.propietario_1,
+                            pr.porcentaje_prop_1,
+                            cp.g3e_fid,
+                            cp.codigo
+                        FROM econ_pri_at cp
+                        JOIN ccomun c USING (g3e_fid)
+                        LEFT JOIN cpropietario pr USING (g3e_fid)
+                        WHERE cp.codigo IN ({', '.join(':' + nombre for nombre in binds)})
+                        """
+                        cursor.execute(query, binds)
                         columns = [col[0] for col in cursor.description]
-                        datos = dict(zip(columns, row))
-                        
-                        # Mapear todos los 21 campos de Oracle
-                        result = {}
-                        
-                        # Coordenadas (críticas para reposición)
-                        if datos.get('COOR_GPS_LAT'):
-                            result['coor_gps_lat'] = str(datos['COOR_GPS_LAT'])
-                        if datos.get('COOR_GPS_LON'):
-                            result['coor_gps_lon'] = str(datos['COOR_GPS_LON'])
-                        
-                        # Campos de estado y ubicación
-                        if datos.get('ESTADO'):
-                            result['estado'] = str(datos['ESTADO'])
-                        if datos.get('UBICACION'):
-                            result['ubicacion'] = str(datos['UBICACION'])
-                        if datos.get('CODIGO_MATERIAL'):
-                            result['codigo_material'] = str(datos['CODIGO_MATERIAL'])
-                        
-                        # Fechas
-                        if datos.get('FECHA_INSTALACION'):
-                            result['fecha_instalacion'] = str(datos['FECHA_INSTALACION'])
-                        if datos.get('FECHA_OPERACION'):
-                            result['fecha_operacion'] = str(datos['FECHA_OPERACION'])
-                        
-                        # Proyecto y empresa
-                        if datos.get('PROYECTO'):
-                            result['proyecto'] = str(datos['PROYECTO'])
-                        if datos.get('EMPRESA_ORIGEN'):
-                            result['empresa_origen'] = str(datos['EMPRESA_ORIGEN'])
-                        if datos.get('OBSERVACIONES'):
-                            result['observaciones'] = str(datos['OBSERVACIONES'])
-                        if datos.get('TIPO_PROYECTO'):
-                            result['tipo_proyecto'] = str(datos['TIPO_PROYECTO'])
-                        
-                        # Mercado
-                        if datos.get('ID_MERCADO'):
-                            result['id_mercado'] = str(datos['ID_MERCADO'])
-                        if datos.get('CLASIFICACION_MERCADO'):
-                            result['clasificacion_mercado'] = str(datos['CLASIFICACION_MERCADO'])
-                        
-                        # UC y estado
-                        if datos.get('UC'):
-                            result['uc'] = str(datos['UC'])
-                        if datos.get('ESTADO_SALUD'):
-                            result['estado_salud'] = str(datos['ESTADO_SALUD'])
-                        if datos.get('OT_MAXIMO'):
-                            result['ot_maximo'] = str(datos['OT_MAXIMO'])
-                        
-                        # Otros campos técnicos
-                        if datos.get('CODIGO_MARCACION'):
-                            result['codigo_marcacion'] = str(datos['CODIGO_MARCACION'])
-                        if datos.get('SALINIDAD'):
-                            result['salinidad'] = str(datos['SALINIDAD'])
-                        if datos.get('USO'):
-                            result['uso'] = str(datos['USO'])
-                        
-                        # Propietario
-                        if datos.get('PROPIETARIO_1'):
-                            result['propietario_1'] = str(datos['PROPIETARIO_1'])
-                        if datos.get('PORCENTAJE_PROP_1'):
-                            result['porcentaje_prop_1'] = str(datos['PORCENTAJE_PROP_1'])
-                        
-                        return result
-                    else:
-                        return None
+                        encontrados: Dict[str, Dict] = {}
+                        for row in cursor.fetchall():
+                            datos = dict(zip(columns, row))
+                            codigo = str(datos.get('CODIGO')) if datos.get('CODIGO') is not None else ''
+                            # Igual que ROWNUM = 1 en la consulta individual: la primera fila gana
+                            if codigo and codigo not in encontrados:
+                                encontrados[codigo] = self._datos_conductor_oracle(datos)
+                        for codigo in bloque:
+                            consultados[codigo] = encontrados.get(codigo)
                         
         except Exception as e:
-            print(f"❌ Error consultando conductor en Oracle: {str(e)}")
-            return None
+            print(f"❌ Error consultando conductores en Oracle: {str(e)}")
+        
+        # Solo los bloques que Oracle respondió (None = conductor inexistente, caché negativa)
+        CacheOracle.guardar_varios('conductor_codigo', consultados)
+        resultado.update(consultados)
+        return resultado
+    
+    @staticmethod
+    def _datos_conductor_oracle(datos: Dict) -> Dict[str, str]:
+        """Fila de la consulta de conductores (columnas de Oracle) -> campos del conductor"""
+        # Mapear todos los 21 campos de Oracle
+        result = {}
+        
+        # Coordenadas (críticas para reposición)
+        if datos.get('COOR_GPS_LAT'):
+            result['coor_gps_lat'] = str(datos['COOR_GPS_LAT'])
+        if datos.get('COOR_GPS_LON'):
+            result['coor_gps_lon'] = str(datos['COOR_GPS_LON'])
+        
+        # Campos de estado y ubicación
+        if datos.get('ESTADO'):
+            result['estado'] = str(datos['ESTADO'])
+        if datos.get('UBICACION'):
+            result['ubicacion'] = str(datos['UBICACION'])
+        if datos.get('CODIGO_MATERIAL'):
+            result['codigo_material'] = str(datos['CODIGO_MATERIAL'])
+        
+        # Fechas
+        if datos.get('FECHA_INSTALACION'):
+            result['fecha_instalacion'] = str(datos['FECHA_INSTALACION'])
+        if datos.get('FECHA_OPERACION'):
+            result['fecha_operacion'] = str(datos['FECHA_OPERACION'])
+        
+        # Proyecto y empresa
+        if datos.get('PROYECTO'):
+            result['proyecto'] = str(datos['PROYECTO'])
+        if datos.get('EMPRESA_ORIGEN'):
+            result['empresa_origen'] = str(datos['EMPRESA_ORIGEN'])
+        if datos.get('OBSERVACIONES'):
+            result['observaciones'] = str(datos['OBSERVACIONES'])
+        if datos.get('TIPO_PROYECTO'):
+            result['tipo_proyecto'] = str(datos['TIPO_PROYECTO'])
+        
+        # Mercado
+        if datos.get('ID_MERCADO'):
+            result['id_mercado'] = str(datos['ID_MERCADO'])
+        if datos.get('CLASIFICACION_MERCADO'):
+            result['clasificacion_mercado'] = str(datos['CLASIFICACION_MERCADO'])
+        
+        # UC y estado
+        if datos.get('UC'):
+            result['uc'] = str(datos['UC'])
+        if datos.get('ESTADO_SALUD'):
+            result['estado_salud'] = str(datos['ESTADO_SALUD'])
+        if datos.get('OT_MAXIMO'):
+            result['ot_maximo'] = str(datos['OT_MAXIMO'])
+        
+        # Otros campos técnicos
+        if datos.get('CODIGO_MARCACION'):
+            result['codigo_marcacion'] = str(datos['CODIGO_MARCACION'])
+        if datos.get('SALINIDAD'):
+            result['salinidad'] = str(datos['SALINIDAD'])
+        if datos.get('USO'):
+            result['uso'] = str(datos['USO'])
+        
+        # Propietario
+        if datos.get('PROPIETARIO_1'):
+            result['propietario_1'] = str(datos['PROPIETARIO_1'])
+        if datos.get('PORCENTAJE_PROP_1'):
+            result['porcentaje_prop_1'] = str(datos['PORCENTAJE_PROP_1'])
+        
+        return result
+
+def _compilar_reglas_por_uc() -> Dict:
+    """
+    Compila una sola vez, al importar, las reglas de REGLAS_CLASIFICACION y
+    MAPEO_UC_MATERIAL que dependen únicamente de la UC, el NIVEL_TENSION o el
+    TIPO_PROYECTO: patrones precompilados y tablas de consulta en el mismo
+    orden de prioridad.
+    """
+    tipo_por_uc = REGLAS_CLASIFICACION['CLASIFICACION_TIPO_POR_UC']
+    conversion = REGLAS_CLASIFICACION['CONVERSION_TIPO_PROYECTO']
+    mapeo_nivel = conversion['MAPEO_NIVEL_TENSION']
+    
+    # Mapeos directos: solo sirven los códigos presentes en el catálogo
+    mapeos_directos = {
+        uc: codigo
+        for uc, codigo in MAPEO_UC_MATERIAL.get('MAPEOS_DIRECTOS', {}).items()
+        if codigo in CATALOGO_MATERIALES
+    }
+    
+    reglas_patron = []
+    for regla in MAPEO_UC_MATERIAL.get('REGLAS_POR_PATRON', []):
+        patron = regla.get('patron', '')
+        if patron:
+            reglas_patron.append((re.compile(patron), regla))
+    
+    return {
+        'TIPO_POR_UC': [(re.compile(regla['PATRON']), regla['TIPO']) for regla in tipo_por_uc['REGLAS_PRIORITARIAS']],
+        'TIPO_POR_UC_DEFECTO': tipo_por_uc['VALOR_DEFECTO'],
+        'NIVEL_TENSION': dict(mapeo_nivel),
+        'NIVEL_TENSION_PREFIJOS': [(patron, tipo) for patron, tipo in mapeo_nivel.items() if patron.endswith('L')],
+        'TIPO_PROYECTO_DEFECTO': conversion['VALOR_DEFECTO'],
+        'ROMANO': re.compile(r"[IVXLCDM]+"),
+        'MATERIAL_DIRECTO': mapeos_directos,
+        'MATERIAL_PATRONES': reglas_patron,
+        'MATERIAL_DEFECTO': MAPEO_UC_MATERIAL.get('MAPEO_POR_DEFECTO', {}),
+    }
+
+
+REGLAS_UC_COMPILADAS = _compilar_reglas_por_uc()
+
+# Marca de campo ausente al pasar registros (dicts) a DataFrame y de vuelta
+_CAMPO_AUSENTE = object()
+
 
 class ClasificadorEstructuras:
     """Aplica las reglas de clasificación de estructuras según las reglas de negocio"""
     
+    # Memo acotado de las reglas que solo dependen de la UC / NIVEL_TENSION.
+    # Un circuito trae pocas UC distintas repetidas en miles de filas.
+    MAX_MEMO_UC = 4096
+    _memo_uc: Dict[tuple, str] = {}
+    
+    VERSION_REGLAS = '2.5'
+    
+    # Campos que leen las reglas de clasificar_estructura. Si ninguno cambió desde
+    # la última clasificación del registro, el resultado sería el mismo (CIRCUITO,
+    # por ejemplo, no lo lee ninguna regla).
+    #
+    # Devolver sin reclasificar un registro cuya firma coincide supone además que
+    # las reglas son idempotentes sobre su propia salida: clasificar un registro ya
+    # clasificado no cambia ningún campo (TIPO_PROYECTO 'T2' sigue 'T2', la fecha ya
+    # formateada sigue igual, etc.). Una regla que no lo sea obliga a quitar esa
+    # reutilización; un cambio de reglas que sí lo sea solo requiere subir VERSION_REGLAS,
+    # que forma parte de la firma.
+    CAMPOS_ENTRADA_CLASIFICACION = (
+        'PROPIETARIO', 'UC', 'NIVEL_TENSION', 'TIPO_PROYECTO', 'FECHA_INSTALACION',
+        'CODIGO_MATERIAL', '_CODIGO_MATERIAL_FROM_EXCEL', 'ESTADO_SALUD', 'OBSERVACIONES'
+    )
+    
+    # Modos de auditoría: 'codigos' guarda en cada registro los códigos de las reglas
+    # aplicadas (el texto se genera al consultarla); 'ninguna' no guarda nada
+    MODOS_AUDITORIA = ('codigos', 'ninguna')
+    
+    # Campos de auditoría que se regeneran en cada clasificación
+    CAMPOS_AUDITORIA = ('OBSERVACION_CLASIFICACION_SISTEMA', 'FECHA_CLASIFICACION', 'VERSION_REGLAS', '_AUDITORIA_CLASIFICACION')
+    
+    # Campos que lee o escribe clasificar_lote_df, en el orden en que se asignan
+    CAMPOS_CLASIFICACION_DF = tuple(dict.fromkeys(CAMPOS_ENTRADA_CLASIFICACION + (
+        'GRUPO', 'CLASE', 'USO', 'PORCENTAJE_PROPIEDAD', 'PROPIETARIO', 'TIPO', 'TIPO_PROYECTO',
+        'FECHA_INSTALACION', 'FECHA_OPERACION', 'CODIGO_MATERIAL', 'ESTADO_SALUD', 'OBSERVACIONES',
+    ) + CAMPOS_AUDITORIA))
+    
     def __init__(self):
-        pass
+        # Registros devueltos sin reclasificar por no haber cambiado sus campos de entrada
+        self.registros_sin_cambios = 0
+        # Firmas (firma_clasificacion) de los registros del último lote de clasificar_registros /
+        # clasificar_lote_df, en el mismo orden. No van dentro del registro: quien guarda los
+        # registros las guarda aparte (ProcesoEstructura.firmas_norma) y las devuelve como firmas_previas
+        self.firmas_lote: List[str] = []
+        
+        modo = getattr(settings, 'CLASIFICACION_AUDITORIA', 'codigos')
+        self.modo_auditoria = modo if modo in self.MODOS_AUDITORIA else 'codigos'
+        # Una sola fecha por lote de clasificación (no una por registro)
+        self.fecha_clasificacion = datetime.now().isoformat()
+    
+    def resumen_auditoria(self) -> Dict:
+        """Metadatos del lote clasificado por esta instancia, para guardar en el proceso"""
+        return {
+            'modo': self.modo_auditoria,
+            'version_reglas': self.VERSION_REGLAS,
+            'fecha_clasificacion': self.fecha_clasificacion,
+        }
+    
+    @classmethod
+    def firma_clasificacion(cls, registro: Dict) -> str:
+        """Huella de los campos de entrada de la clasificación (y de la versión de reglas)"""
+        return cls._firma_de_valores(tuple(registro.get(campo) for campo in cls.CAMPOS_ENTRADA_CLASIFICACION))
+    
+    @classmethod
+    def _firma_de_valores(cls, valores: Tuple) -> str:
+        return hashlib.sha1(repr((cls.VERSION_REGLAS, valores)).encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def _memorizar_por_uc(cls, regla: str, valor, calcular) -> str:
+        """Devuelve calcular(valor) memorizado por (regla, valor)"""
+        try:
+            clave = (regla, type(valor), valor)
+            return cls._memo_uc[clave]
+        except KeyError:
+            pass
+        except TypeError:
+            # Valor no hasheable: calcular sin memorizar
+            return calcular(valor)
+        
+        resultado = calcular(valor)
+        if len(cls._memo_uc) >= cls.MAX_MEMO_UC:
+            cls._memo_uc.clear()
+        cls._memo_uc[clave] = resultado
+        return resultado
     
-    def clasificar_estructura(self, registro: Dict) -> Dict:
+    def clasificar_estructura(self, registro: Dict, firma_previa: Optional[str] = None) -> Dict:
         """
         Aplica las reglas de clasificación a un registro
         
@@ -4848,11 +5546,19 @@ class ClasificadorEstructuras:
            - Si UC empieza con N2, N3, N4 -> TIPO = "PRIMARIO"
            - Valor por defecto: "SECUNDARIO"
         5. TIPO_PROYECTO: convertir números romanos (I, II, III, IV) a formato T+número (T1, T2, T3, T4)
+        
+        firma_previa es la firma_clasificacion del registro clasificado la vez
+        anterior; si el registro vuelve sin cambios en sus campos de entrada se
+        devuelve tal cual en lugar de reclasificarlo (ver CAMPOS_ENTRADA_CLASIFICACION).
         """
+        if firma_previa and firma_previa == self.firma_clasificacion(registro):
+            self.registros_sin_cambios += 1
+            return registro.copy()
+        
         registro_clasificado = registro.copy()
         
-        # Inicializar lista de observaciones
-        observaciones_clasificacion = []
+        # Códigos de las reglas aplicadas para la auditoría (ver renderizar_auditoria)
+        codigos_auditoria = []
         
         # Regla 1: GRUPO siempre debe ser "ESTRUCTURAS EYT" (para todas las estructuras)
         registro_clasificado['GRUPO'] = 'ESTRUCTURAS EYT'
@@ -4886,12 +5592,14 @@ class ClasificadorEstructuras:
         tipo_proyecto_generado = self._generar_tipo_proyecto_desde_nivel_tension(valor_para_mapeo)
         if tipo_proyecto_generado:
             registro_clasificado['TIPO_PROYECTO'] = tipo_proyecto_generado
-            observaciones_clasificacion.append(f"TIPO_PROYECTO generado como '{tipo_proyecto_generado}' basado en {'NIVEL_TENSION' if nivel_tension else 'UC'}: {valor_para_mapeo}")
+            codigos_auditoria.append('TP_NT' if nivel_tension else 'TP_UC')
         else:
             # Fallback: Convertir TIPO_PROYECTO de números romanos a formato T+número si existe
             tipo_proyecto_original = registro.get('TIPO_PROYECTO', '').strip()
             tipo_proyecto_convertido = self._convertir_tipo_proyecto(tipo_proyecto_original)
             registro_clasificado['TIPO_PROYECTO'] = tipo_proyecto_convertido
+            if tipo_proyecto_original != tipo_proyecto_convertido:
+                codigos_auditoria.append(f"TP_CONV={tipo_proyecto_original}")
         
         # Regla 6: FECHA_OPERACION debe ser igual a FECHA_INSTALACION (solo fecha, sin hora)
         fecha_instalacion = registro.get('FECHA_INSTALACION', '')
@@ -4900,6 +5608,7 @@ class ClasificadorEstructuras:
             fecha_formateada = self._formatear_fecha(fecha_instalacion)
             registro_clasificado['FECHA_INSTALACION'] = fecha_formateada
             registro_clasificado['FECHA_OPERACION'] = fecha_formateada
+            codigos_auditoria.append('FO')
         
         # Regla 7: CODIGO_MATERIAL
         # Priorizar el valor que llegue desde el Excel (si existe y no está vacío)
@@ -4919,25 +5628,11 @@ class ClasificadorEstructuras:
         if estado_salud_convertido:
             registro_clasificado['ESTADO_SALUD'] = estado_salud_convertido
         
-        # Agregar observaciones de clasificación (solo si no hay observaciones del Excel original)
-        observaciones_clasificacion.append(f"TIPO clasificado como {tipo_clasificado} basado en UC: {uc}")
-        observaciones_clasificacion.append("GRUPO forzado a 'ESTRUCTURAS EYT'")
-        observaciones_clasificacion.append("CLASE forzada a 'POSTE'")
-        observaciones_clasificacion.append("USO forzado a 'DISTRIBUCION ENERGIA'")
-        observaciones_clasificacion.append("PORCENTAJE_PROPIEDAD forzado a '100'")
-        # Registrar observación solo si se asignó por UC (no si vino de Excel)
-        if not cm_excel:
-            codigo_material = registro_clasificado.get('CODIGO_MATERIAL', '')
-            if codigo_material:
-                observaciones_clasificacion.append(f"CODIGO_MATERIAL asignado como '{codigo_material}' basado en UC: {uc}")
+        # Registrar código solo si se asignó por UC (no si vino de Excel)
+        if not cm_excel and registro_clasificado.get('CODIGO_MATERIAL', ''):
+            codigos_auditoria.append('CM_UC')
         if estado_salud_convertido and estado_salud_convertido != registro.get('ESTADO_SALUD', ''):
-            observaciones_clasificacion.append(f"ESTADO_SALUD convertido de '{registro.get('ESTADO_SALUD', '')}' a '{estado_salud_convertido}'")
-        if tipo_proyecto_generado:
-            observaciones_clasificacion.append(f"TIPO_PROYECTO generado como '{tipo_proyecto_generado}' basado en {'NIVEL_TENSION' if nivel_tension else 'UC'}: {valor_para_mapeo}")
-        elif tipo_proyecto_original != tipo_proyecto_convertido:
-            observaciones_clasificacion.append(f"TIPO_PROYECTO convertido de '{tipo_proyecto_original}' a '{tipo_proyecto_convertido}'")
-        if fecha_instalacion:
-            observaciones_clasificacion.append("FECHA_OPERACION igualada a FECHA_INSTALACION")
+            codigos_auditoria.append(f"ES={registro.get('ESTADO_SALUD', '')}")
         
         # Solo agregar observaciones de clasificación si no hay observaciones del Excel original
         if not registro.get('OBSERVACIONES', '').strip():
@@ -4945,15 +5640,59 @@ class ClasificadorEstructuras:
             registro_clasificado['OBSERVACIONES'] = ''
         # Si ya hay observaciones del Excel original, mantenerlas sin agregar observaciones de clasificación
         
-        # Guardar observaciones de clasificación en un campo separado para debugging/auditoría
-        registro_clasificado['OBSERVACION_CLASIFICACION_SISTEMA'] = "; ".join(observaciones_clasificacion)
-        
-        # Agregar metadatos de clasificación
-        registro_clasificado['FECHA_CLASIFICACION'] = datetime.now().isoformat()
-        registro_clasificado['VERSION_REGLAS'] = '2.5'
+        # Auditoría: solo los códigos; la fecha y la versión de reglas van una vez
+        # por lote (resumen_auditoria) en lugar de repetirse en cada registro
+        for campo in self.CAMPOS_AUDITORIA:
+            registro_clasificado.pop(campo, None)
+        if self.modo_auditoria == 'codigos':
+            registro_clasificado['_AUDITORIA_CLASIFICACION'] = codigos_auditoria
         
         return registro_clasificado
     
+    @staticmethod
+    def renderizar_auditoria(registro: Dict) -> str:
+        """
+        Texto de la auditoría de clasificación de un registro a partir de sus
+        códigos (_AUDITORIA_CLASIFICACION) y de los valores ya clasificados.
+        Los registros de versiones anteriores traen el texto guardado.
+        """
+        codigos = registro.get('_AUDITORIA_CLASIFICACION')
+        if codigos is None:
+            return registro.get('OBSERVACION_CLASIFICACION_SISTEMA', '')
+        
+        parametros = {}
+        for codigo in codigos:
+            clave, _, valor = codigo.partition('=')
+            parametros[clave] = valor
+        
+        uc = str(registro.get('UC', '')).strip()
+        tipo_proyecto = registro.get('TIPO_PROYECTO', '')
+        linea_tipo_proyecto = None
+        if 'TP_NT' in parametros:
+            linea_tipo_proyecto = f"TIPO_PROYECTO generado como '{tipo_proyecto}' basado en NIVEL_TENSION: {str(registro.get('NIVEL_TENSION', '')).strip()}"
+        elif 'TP_UC' in parametros:
+            linea_tipo_proyecto = f"TIPO_PROYECTO generado como '{tipo_proyecto}' basado en UC: {uc}"
+        
+        lineas = []
+        if linea_tipo_proyecto:
+            lineas.append(linea_tipo_proyecto)
+        lineas.append(f"TIPO clasificado como {registro.get('TIPO', '')} basado en UC: {uc}")
+        lineas.append("GRUPO forzado a 'ESTRUCTURAS EYT'")
+        lineas.append("CLASE forzada a 'POSTE'")
+        lineas.append("USO forzado a 'DISTRIBUCION ENERGIA'")
+        lineas.append("PORCENTAJE_PROPIEDAD forzado a '100'")
+        if 'CM_UC' in parametros:
+            lineas.append(f"CODIGO_MATERIAL asignado como '{registro.get('CODIGO_MATERIAL', '')}' basado en UC: {uc}")
+        if 'ES' in parametros:
+            lineas.append(f"ESTADO_SALUD convertido de '{parametros['ES']}' a '{registro.get('ESTADO_SALUD', '')}'")
+        if linea_tipo_proyecto:
+            lineas.append(linea_tipo_proyecto)
+        elif 'TP_CONV' in parametros:
+            lineas.append(f"TIPO_PROYECTO convertido de '{parametros['TP_CONV']}' a '{tipo_proyecto}'")
+        if 'FO' in parametros:
+            lineas.append("FECHA_OPERACION igualada a FECHA_INSTALACION")
+        return "; ".join(lineas)
+    
     def _convertir_tipo_proyecto(self, tipo_proyecto: str) -> str:
         """
         Convierte números romanos a formato T+número para TIPO_PROYECTO
@@ -4963,11 +5702,13 @@ class ClasificadorEstructuras:
         if not tipo_proyecto:
             return tipo_proyecto
         
+        return self._memorizar_por_uc('romano', tipo_proyecto, self._convertir_tipo_proyecto_sin_memo)
+    
+    def _convertir_tipo_proyecto_sin_memo(self, tipo_proyecto: str) -> str:
         # Normalizar y extraer únicamente la parte romana por si vienen caracteres como '|II|'
         tipo_limpio = str(tipo_proyecto).strip().upper()
         try:
-            import re as _re
-            coincidencias = _re.findall(r"[IVXLCDM]+", tipo_limpio)
+            coincidencias = REGLAS_UC_COMPILADAS['ROMANO'].findall(tipo_limpio)
             romano_extraido = max(coincidencias, key=len) if coincidencias else tipo_limpio
         except Exception:
             romano_extraido = tipo_limpio
@@ -5008,21 +5749,25 @@ class ClasificadorEstructuras:
         N3L75 -> T1, N3L79 -> T3, etc.
         """
         if not nivel_tension:
-            return REGLAS_CLASIFICACION['CONVERSION_TIPO_PROYECTO']['VALOR_DEFECTO']
+            return REGLAS_UC_COMPILADAS['TIPO_PROYECTO_DEFECTO']
         
+        return self._memorizar_por_uc('tipo_proyecto', nivel_tension, self._tipo_proyecto_desde_nivel_tension_sin_memo)
+    
+    @staticmethod
+    def _tipo_proyecto_desde_nivel_tension_sin_memo(nivel_tension: str) -> str:
         nivel_limpio = nivel_tension.strip().upper()
-        mapeo_nivel = REGLAS_CLASIFICACION['CONVERSION_TIPO_PROYECTO']['MAPEO_NIVEL_TENSION']
+        mapeo_nivel = REGLAS_UC_COMPILADAS['NIVEL_TENSION']
         
         # Buscar coincidencia exacta primero
         if nivel_limpio in mapeo_nivel:
             return mapeo_nivel[nivel_limpio]
         
         # Buscar coincidencia por patrón (ej: N1L, N2L, N3L, N4L)
-        for patron, tipo_proyecto in mapeo_nivel.items():
-            if patron.endswith('L') and nivel_limpio.startswith(patron):
+        for patron, tipo_proyecto in REGLAS_UC_COMPILADAS['NIVEL_TENSION_PREFIJOS']:
+            if nivel_limpio.startswith(patron):
                 return tipo_proyecto
         
-        return REGLAS_CLASIFICACION['CONVERSION_TIPO_PROYECTO']['VALOR_DEFECTO']  # No se encontró mapeo
+        return REGLAS_UC_COMPILADAS['TIPO_PROYECTO_DEFECTO']  # No se encontró mapeo
     
     def _clasificar_propietario(self, nombre_propietario: str) -> str:
         """
@@ -5063,32 +5808,7 @@ class ClasificadorEstructuras:
         Returns:
             Dict con información sobre propietarios encontrados
         """
-        propietarios_encontrados = set()
-        registros_con_propietario = 0
-        registros_sin_propietario = 0
-        
-        for registro in registros:
-            propietario = registro.get('PROPIETARIO', '')
-            # Convertir a string y limpiar espacios, manejar valores no string
-            if propietario is not None:
-                propietario = str(propietario).strip()
-            else:
-                propietario = ''
-                
-            if propietario:
-                propietarios_encontrados.add(propietario)
-                registros_con_propietario += 1
-            else:
-                registros_sin_propietario += 1
-        
-        return {
-            'tiene_propietarios': len(propietarios_encontrados) > 0,
-            'propietarios_unicos': list(propietarios_encontrados),
-            'registros_con_propietario': registros_con_propietario,
-            'registros_sin_propietario': registros_sin_propietario,
-            'total_registros': len(registros),
-            'propietario_unico': list(propietarios_encontrados)[0] if len(propietarios_encontrados) == 1 else None
-        }
+        return ResumenRegistros.calcular(datos_norma=registros).propietarios_info()
     
     def aplicar_propietario_a_todos(self, registros: List[Dict], propietario: str) -> List[Dict]:
         """
@@ -5128,24 +5848,23 @@ class ClasificadorEstructuras:
         if propietario not in propietarios_validos:
             raise ValueError(f"Propietario '{propietario}' no es válido. Debe ser uno de: {propietarios_validos}")
         
-        # Aplicar propietario a todos los registros de datos_norma
-        if proceso.datos_norma:
-            datos_actualizados = []
-            for registro in proceso.datos_norma:
-                registro_actualizado = registro.copy()
-                registro_actualizado['PROPIETARIO'] = propietario
-                registro_actualizado['PORCENTAJE_PROPIEDAD'] = '100'
-                datos_actualizados.append(registro_actualizado)
-            
-            proceso.datos_norma = datos_actualizados
-            print(f"Propietario '{propietario}' aplicado a {len(datos_actualizados)} registros")
+        # Aplicar propietario a todos los registros de datos_norma (actualización por campo en los bloques)
+        if proceso.tiene_registros('norma'):
+            actualizados = proceso.asignar_campos_registros('norma', {
+                'PROPIETARIO': propietario,
+                'PORCENTAJE_PROPIEDAD': '100',
+            })
+            resumen = obtener_resumen_registros(proceso)
+            resumen.asignar_propietario(propietario)
+            proceso.resumen_registros = resumen.a_dict()
+            print(f"Propietario '{propietario}' aplicado a {actualizados} registros")
         else:
             print("No hay datos_norma para actualizar")
         
         # Marcar que el propietario ya fue definido y guardar el valor
         proceso.propietario_definido = propietario  # Guardar el propietario seleccionado
         proceso.requiere_definir_propietario = False  # Ya no se requiere definir propietario
-        proceso.save()
+        proceso.guardar_campos('propietario_definido', 'requiere_definir_propietario', 'resumen_registros')
         print(f"Proceso actualizado: propietario_definido='{proceso.propietario_definido}', requiere_definir_propietario={proceso.requiere_definir_propietario}")
     
     def verificar_y_marcar_campos_requeridos(self, proceso) -> Dict:
@@ -5167,20 +5886,15 @@ class ClasificadorEstructuras:
             campos_requeridos['propietario'] = True
             proceso.requiere_definir_propietario = True
         
-        # Verificar ESTADO_SALUD
-        estado_salud_vacio = False
-        if proceso.datos_excel:
-            for registro in proceso.datos_excel:
-                if not registro.get('ESTADO_SALUD') or registro.get('ESTADO_SALUD').strip() == '':
-                    estado_salud_vacio = True
-                    break
+        # Verificar ESTADO_SALUD (conteo precalculado del resumen de registros)
+        estado_salud_vacio = obtener_resumen_registros(proceso).tiene_estado_salud_vacio
         
         if estado_salud_vacio and not (proceso.estado_salud_definido and proceso.estado_salud_definido != 'None'):
             campos_requeridos['estado_salud'] = True
             campos_requeridos['detalles']['estado_salud'] = 'ESTADO_SALUD está vacío en los datos del Excel'
         
         # Guardar cambios si es necesario
-        proceso.save()
+        proceso.guardar_campos('requiere_definir_propietario')
         
         return campos_requeridos
     
@@ -5194,109 +5908,330 @@ class ClasificadorEstructuras:
         - Valor por defecto: SECUNDARIO
         """
         if not uc:
-            return REGLAS_CLASIFICACION['CLASIFICACION_TIPO_POR_UC']['VALOR_DEFECTO']
+            return REGLAS_UC_COMPILADAS['TIPO_POR_UC_DEFECTO']
         
-        # Buscar patrones en las reglas
-        for regla in REGLAS_CLASIFICACION['CLASIFICACION_TIPO_POR_UC']['REGLAS_PRIORITARIAS']:
-            patron = regla['PATRON']
-            if re.match(patron, uc):
-                return regla['TIPO']
+        return self._memorizar_por_uc('tipo', uc, self._tipo_por_uc_sin_memo)
+    
+    @staticmethod
+    def _tipo_por_uc_sin_memo(uc: str) -> str:
+        # Buscar patrones en las reglas (precompilados, en orden de prioridad)
+        for patron, tipo in REGLAS_UC_COMPILADAS['TIPO_POR_UC']:
+            if patron.match(uc):
+                return tipo
         
         # Si no coincide con ningún patrón, usar valor por defecto
-        return REGLAS_CLASIFICACION['CLASIFICACION_TIPO_POR_UC']['VALOR_DEFECTO']
+        return REGLAS_UC_COMPILADAS['TIPO_POR_UC_DEFECTO']
     
-    def clasificar_lote(self, registros: List[Dict]) -> List[Dict]:
+    def clasificar_lote(self, registros: List[Dict]) -> Tuple[List[Dict], Dict]:
         """Aplica clasificación a un lote de registros"""
-        registros_clasificados = []
-        estadisticas = {
-            'total_procesados': len(registros),
-            'clasificados_como_poste': 0,
-            'estructuras_eyt': 0
-        }
+        return self.clasificar_registros(registros)
+    
+    def clasificar_registros(self, registros: Iterable[Dict], firmas_previas: Optional[List[str]] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Clasifica una lista de registros (dicts) por columnas, como clasificar_lote_df.
+        
+        El resultado es el mismo que aplicar clasificar_estructura a cada registro
+        (con su firma de firmas_previas, si se dan): las claves que un registro no
+        trae y que las reglas no escriben siguen ausentes en el registro clasificado.
+        Las firmas del resultado quedan en firmas_lote.
+        """
+        registros = list(registros)
         
+        # Solo se arman columnas de los campos que las reglas leen o escriben; el
+        # resto del registro se conserva tal cual en la copia. Las claves ausentes
+        # van como _CAMPO_AUSENTE para no confundirlas con un None del registro
+        presentes = set()
         for registro in registros:
-            registro_clasificado = self.clasificar_estructura(registro)
+            presentes.update(registro)
+        df = pd.DataFrame({
+            campo: self._arreglo_objetos([registro.get(campo, _CAMPO_AUSENTE) for registro in registros])
+            for campo in self.CAMPOS_CLASIFICACION_DF if campo in presentes
+        }, index=pd.RangeIndex(len(registros)), dtype=object)
+        
+        clasificado, estadisticas = self.clasificar_lote_df(df, valor_ausente=_CAMPO_AUSENTE, firmas_previas=firmas_previas)
+        
+        nombres = list(clasificado.columns)
+        valores = [clasificado[campo].tolist() for campo in nombres]
+        registros_clasificados = []
+        for posicion, registro in enumerate(registros):
+            registro_clasificado = registro.copy()
+            for campo in self.CAMPOS_AUDITORIA:
+                registro_clasificado.pop(campo, None)
+            registro_clasificado.update(zip(nombres, (columna[posicion] for columna in valores)))
             registros_clasificados.append(registro_clasificado)
-            
-            # Estadísticas
-            if registro_clasificado.get('TIPO_CLASIFICADO') == 'POSTE':
-                estadisticas['clasificados_como_poste'] += 1
-            if registro_clasificado.get('CATEGORIA_ESTRUCTURA') == 'ESTRUCTURAS EYT':
-                estadisticas['estructuras_eyt'] += 1
         
+        # Quitar las celdas ausentes (la mayoría de columnas no tiene ninguna)
+        for campo, columna in zip(nombres, valores):
+            for posicion, valor in enumerate(columna):
+                if valor is _CAMPO_AUSENTE:
+                    del registros_clasificados[posicion][campo]
         return registros_clasificados, estadisticas
     
-    def obtener_estadisticas(self, registros: List[Dict]) -> Dict:
-        """Genera estadísticas de clasificación para la UI"""
-        estadisticas = {
-            'total_registros': len(registros),
-            'por_tipo_estructura': {},
-            'clasificaciones_aplicadas': []
+    def clasificar_lote_df(self, df: pd.DataFrame, valor_ausente=np.nan,
+                           firmas_previas: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Aplica por columnas las reglas de clasificar_estructura a un DataFrame con
+        un registro por fila y devuelve (DataFrame clasificado, estadísticas).
+        
+        Las reglas que dependen de un solo campo (propietario, TIPO por UC,
+        TIPO_PROYECTO, fecha, material, estado de salud) se evalúan una vez por
+        valor distinto de la columna. Las celdas con `valor_ausente` (NaN/None por
+        defecto) cuentan como campo ausente, y las columnas que una regla escribe
+        solo en algunas filas quedan con `valor_ausente` en las demás.
+        
+        Las filas cuya firma en firmas_previas coincide con sus campos de entrada
+        se devuelven sin cambios, igual que en clasificar_estructura. Las firmas
+        del resultado quedan en firmas_lote.
+        """
+        columnas = {campo: df[campo].to_numpy(dtype=object) for campo in df.columns}
+        salida, estadisticas = self._clasificar_columnas(columnas, len(df), valor_ausente, firmas_previas)
+        
+        # Las columnas que las reglas no tocan se conservan con su tipo original; las
+        # demás quedan como objetos (sin inferir tipo: un None sigue siendo None)
+        resultado = df.drop(columns=[campo for campo in df.columns if campo not in salida])
+        for campo, valores in salida.items():
+            if valores is not columnas.get(campo):
+                resultado[campo] = pd.Series(valores, index=df.index, dtype=object)
+        return resultado, estadisticas
+    
+    def _clasificar_columnas(self, columnas: Dict[str, np.ndarray], cantidad: int, valor_ausente,
+                             firmas_previas: Optional[List[str]] = None) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Clasificación por columnas (arreglos de objetos) común a clasificar_lote_df y clasificar_registros"""
+        # Filas ya clasificadas cuyos campos de entrada no cambiaron
+        sin_cambios = np.zeros(cantidad, dtype=bool)
+        if firmas_previas:
+            firmas_actuales = self._firmas_columnas(columnas, cantidad, valor_ausente)
+            for posicion, (previa, actual) in enumerate(zip(firmas_previas, firmas_actuales)):
+                sin_cambios[posicion] = bool(previa) and previa == actual
+        
+        conteos = {'codigo_material_por_uc': 0, 'estado_salud_convertido': 0}
+        if sin_cambios.all():
+            salida = dict(columnas)
+        elif not sin_cambios.any():
+            salida, conteos = self._aplicar_reglas_columnas(columnas, cantidad, valor_ausente)
+        else:
+            pendientes = ~sin_cambios
+            clasificadas, conteos = self._aplicar_reglas_columnas(
+                {campo: valores[pendientes] for campo, valores in columnas.items()},
+                int(pendientes.sum()), valor_ausente
+            )
+            salida = {}
+            for campo in list(columnas) + [campo for campo in clasificadas if campo not in columnas]:
+                if campo in columnas:
+                    valores = columnas[campo].copy()
+                else:
+                    valores = np.full(cantidad, valor_ausente, dtype=object)
+                valores[pendientes] = clasificadas[campo] if campo in clasificadas else valor_ausente
+                salida[campo] = valores
+        
+        self.registros_sin_cambios += int(sin_cambios.sum())
+        # Las filas sin cambios conservan su firma; las clasificadas, la de su resultado
+        self.firmas_lote = self._firmas_columnas(salida, cantidad, valor_ausente)
+        return salida, self._estadisticas_columnas(salida, cantidad, sin_cambios, conteos, valor_ausente)
+    
+    def _aplicar_reglas_columnas(self, columnas: Dict[str, np.ndarray], cantidad: int, valor_ausente) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """Reglas 1 a 8 de clasificar_estructura sobre todas las filas de las columnas"""
+        # La auditoría anterior se descarta y se vuelve a generar al final
+        resultado = {campo: valores for campo, valores in columnas.items() if campo not in self.CAMPOS_AUDITORIA}
+        
+        def valores(campo, defecto=''):
+            if campo not in columnas:
+                return [defecto] * cantidad
+            return self._reemplazar_ausentes(columnas[campo].tolist(), valor_ausente, defecto)
+        
+        def columna_actual(campo):
+            if campo in resultado:
+                return resultado[campo].copy()
+            return np.full(cantidad, valor_ausente, dtype=object)
+        
+        def con_valor(arreglo):
+            # Veracidad de cada valor (igual que `if valor:`)
+            return np.asarray(arreglo, dtype=object).astype(bool)
+        
+        por_valor = self._aplicar_por_valor
+        
+        # Reglas 1 a 3b: valores fijos
+        resultado['GRUPO'] = np.full(cantidad, 'ESTRUCTURAS EYT', dtype=object)
+        resultado['CLASE'] = np.full(cantidad, 'POSTE', dtype=object)
+        resultado['USO'] = np.full(cantidad, 'DISTRIBUCION ENERGIA', dtype=object)
+        resultado['PORCENTAJE_PROPIEDAD'] = np.full(cantidad, '100', dtype=object)
+        
+        # PROPIETARIO: categoría predefinida a partir del nombre del Excel
+        resultado['PROPIETARIO'] = por_valor(valores('PROPIETARIO'), self._clasificar_propietario)
+        
+        # Regla 4: TIPO por Unidad Constructiva
+        uc_excel = valores('UC')
+        resultado['TIPO'] = por_valor(uc_excel, lambda uc: self._clasificar_tipo_por_uc(uc.strip().upper()))
+        
+        # Regla 5: TIPO_PROYECTO desde NIVEL_TENSION, o desde la UC si no hay nivel
+        uc = por_valor(uc_excel, lambda valor: valor.strip())
+        nivel_tension = por_valor(valores('NIVEL_TENSION'), lambda valor: valor.strip())
+        desde_nivel = con_valor(nivel_tension)
+        valor_para_mapeo = np.where(desde_nivel, nivel_tension, uc)
+        tipo_proyecto_generado = por_valor(valor_para_mapeo, self._generar_tipo_proyecto_desde_nivel_tension)
+        generado = con_valor(tipo_proyecto_generado)
+        tipo_proyecto = tipo_proyecto_generado.copy()
+        tipo_proyecto_original = None
+        if not generado.all():
+            tipo_proyecto_original = por_valor(valores('TIPO_PROYECTO'), lambda valor: valor.strip())
+            tipo_proyecto[~generado] = por_valor(tipo_proyecto_original[~generado], self._convertir_tipo_proyecto)
+        resultado['TIPO_PROYECTO'] = tipo_proyecto
+        
+        # Regla 6: FECHA_OPERACION igual a FECHA_INSTALACION (solo fecha)
+        fechas = self._arreglo_objetos(valores('FECHA_INSTALACION'))
+        con_fecha = con_valor(fechas)
+        if con_fecha.any():
+            fechas_formateadas = por_valor(fechas[con_fecha], self._formatear_fecha)
+            fecha_instalacion = columna_actual('FECHA_INSTALACION')
+            fecha_operacion = columna_actual('FECHA_OPERACION')
+            fecha_instalacion[con_fecha] = fechas_formateadas
+            fecha_operacion[con_fecha] = fechas_formateadas
+            resultado['FECHA_INSTALACION'] = fecha_instalacion
+            resultado['FECHA_OPERACION'] = fecha_operacion
+        
+        # Regla 7: CODIGO_MATERIAL del Excel; si no viene, asignado por UC (salvo columna del Excel vacía)
+        cm_entrada = valores('CODIGO_MATERIAL')
+        cm_excel = por_valor(cm_entrada, DataUtils.normalizar_codigo_material)
+        con_cm_excel = con_valor(cm_excel)
+        desde_excel = con_valor(valores('_CODIGO_MATERIAL_FROM_EXCEL', False))
+        codigo_material = columna_actual('CODIGO_MATERIAL')
+        codigo_material[con_cm_excel] = cm_excel[con_cm_excel]
+        asignados_por_uc = np.zeros(cantidad, dtype=bool)
+        por_uc = ~con_cm_excel & ~desde_excel
+        if por_uc.any():
+            asignados = por_valor(uc[por_uc], self._asignar_codigo_material)
+            asignados_validos = con_valor(asignados)
+            posiciones = np.flatnonzero(por_uc)[asignados_validos]
+            codigo_material[posiciones] = por_valor(asignados[asignados_validos], DataUtils.normalizar_codigo_material)
+            asignados_por_uc[posiciones] = True
+        if con_cm_excel.any() or asignados_por_uc.any() or 'CODIGO_MATERIAL' in resultado:
+            resultado['CODIGO_MATERIAL'] = codigo_material
+        
+        # Regla 8: ESTADO_SALUD de números a descriptivos
+        estado_salud_excel = self._arreglo_objetos(valores('ESTADO_SALUD'))
+        estado_salud_convertido = por_valor(estado_salud_excel, self._convertir_estado_salud)
+        convertido = con_valor(estado_salud_convertido)
+        if convertido.any():
+            estado_salud = columna_actual('ESTADO_SALUD')
+            estado_salud[convertido] = estado_salud_convertido[convertido]
+            resultado['ESTADO_SALUD'] = estado_salud
+        
+        # OBSERVACIONES vacías se dejan en '' (no se agregan observaciones de clasificación)
+        sin_observaciones = por_valor(valores('OBSERVACIONES'), lambda valor: not valor.strip()).astype(bool)
+        if sin_observaciones.any():
+            observaciones = columna_actual('OBSERVACIONES')
+            observaciones[sin_observaciones] = ''
+            resultado['OBSERVACIONES'] = observaciones
+        
+        # Auditoría: códigos de reglas por fila, en el mismo orden que clasificar_estructura.
+        # CM_UC también cuando queda el valor original sin normalizar (como clasificar_estructura)
+        material_por_uc = ~con_cm_excel & (asignados_por_uc | con_valor(cm_entrada))
+        estado_salud_cambiado = convertido & (estado_salud_convertido != estado_salud_excel)
+        if self.modo_auditoria == 'codigos':
+            auditoria = np.empty(cantidad, dtype=object)
+            for posicion in range(cantidad):
+                codigos = []
+                if generado[posicion]:
+                    codigos.append('TP_NT' if desde_nivel[posicion] else 'TP_UC')
+                elif tipo_proyecto_original[posicion] != tipo_proyecto[posicion]:
+                    codigos.append(f"TP_CONV={tipo_proyecto_original[posicion]}")
+                if con_fecha[posicion]:
+                    codigos.append('FO')
+                if material_por_uc[posicion]:
+                    codigos.append('CM_UC')
+                if estado_salud_cambiado[posicion]:
+                    codigos.append(f"ES={estado_salud_excel[posicion]}")
+                auditoria[posicion] = codigos
+            resultado['_AUDITORIA_CLASIFICACION'] = auditoria
+        
+        conteos = {
+            'codigo_material_por_uc': int(material_por_uc.sum()),
+            'estado_salud_convertido': int(estado_salud_cambiado.sum()),
         }
+        return resultado, conteos
+    
+    @staticmethod
+    def _arreglo_objetos(valores: List) -> np.ndarray:
+        """Arreglo de objetos de una dimensión (sin que numpy interprete listas o tuplas como filas)"""
+        arreglo = np.empty(len(valores), dtype=object)
+        arreglo[:] = valores
+        return arreglo
+    
+    @classmethod
+    def _aplicar_por_valor(cls, valores, funcion) -> np.ndarray:
+        """Aplica `funcion` una sola vez por valor distinto (por tipo y valor) de la columna"""
+        claves = list(zip(map(type, valores), valores))
+        try:
+            distintos = dict.fromkeys(claves)
+        except TypeError:
+            # Valores no hasheables: calcular fila por fila
+            return cls._arreglo_objetos([funcion(valor) for valor in valores])
+        for clave in distintos:
+            distintos[clave] = funcion(clave[1])
+        return cls._arreglo_objetos([distintos[clave] for clave in claves])
+    
+    @staticmethod
+    def _reemplazar_ausentes(valores: List, valor_ausente, reemplazo) -> List:
+        """Valores de una columna con las celdas ausentes (marca propia, o NaN/None) reemplazadas"""
+        if valor_ausente is _CAMPO_AUSENTE:
+            return [reemplazo if valor is _CAMPO_AUSENTE else valor for valor in valores]
+        nulos = pd.isna(pd.Series(valores, dtype=object)).tolist()
+        return [reemplazo if nulo else valor for valor, nulo in zip(valores, nulos)]
+    
+    def _firmas_columnas(self, columnas: Dict[str, np.ndarray], cantidad: int, valor_ausente) -> List[str]:
+        """firma_clasificacion de cada fila (campo ausente equivale a None, como registro.get)"""
+        valores_entrada = []
+        for campo in self.CAMPOS_ENTRADA_CLASIFICACION:
+            if campo in columnas:
+                valores_entrada.append(self._reemplazar_ausentes(columnas[campo].tolist(), valor_ausente, None))
+            else:
+                valores_entrada.append([None] * cantidad)
         
-        # Contar por tipo de estructura actual
-        tipos_contador = {}
-        grupos_contador = {}
-        clasificaciones_tipo = {}
-        
-        for registro in registros:
-            # Contar tipos actuales
-            tipo_actual = registro.get('TIPO', 'SIN_TIPO')
-            tipos_contador[tipo_actual] = tipos_contador.get(tipo_actual, 0) + 1
-            
-            # Contar grupos actuales
-            grupo_actual = registro.get('GRUPO', 'SIN_GRUPO')
-            grupos_contador[grupo_actual] = grupos_contador.get(grupo_actual, 0) + 1
-            
-            # Verificar si hubo cambio de TIPO por regla de clasificación
-            if registro.get('OBSERVACION_CLASIFICACION'):
-                clasificaciones_tipo['GRUPO_to_POSTE'] = clasificaciones_tipo.get('GRUPO_to_POSTE', 0) + 1
-        
-        estadisticas['por_tipo_estructura'] = tipos_contador
-        estadisticas['por_grupo_estructura'] = grupos_contador
-        
-        # Convertir clasificaciones a formato para UI
-        for key, cantidad in clasificaciones_tipo.items():
-            if key == 'GRUPO_to_POSTE':
-                estadisticas['clasificaciones_aplicadas'].append({
-                    'tipo_original': 'Estructura con GRUPO',
-                    'tipo_nuevo': 'POSTE',
-                    'cantidad': cantidad
-                })
-        
-        # Agregar estadística fija para GRUPO -> ESTRUCTURAS EYT
-        if grupos_contador.get('ESTRUCTURAS EYT', 0) > 0:
-            estadisticas['clasificaciones_aplicadas'].append({
-                'tipo_original': 'Todas las estructuras',
-                'tipo_nuevo': 'ESTRUCTURAS EYT',
-                'cantidad': grupos_contador.get('ESTRUCTURAS EYT', 0)
-            })
+        firmas = []
+        cache = {}
+        for valores in zip(*valores_entrada):
+            try:
+                firma = cache.get(valores)
+                if firma is None:
+                    firma = cache[valores] = self._firma_de_valores(valores)
+            except TypeError:
+                firma = self._firma_de_valores(valores)
+            firmas.append(firma)
+        return firmas
+    
+    @staticmethod
+    def _estadisticas_columnas(columnas: Dict[str, np.ndarray], cantidad: int, sin_cambios: np.ndarray,
+                               conteos: Dict, valor_ausente) -> Dict:
+        """Estadísticas del lote clasificado, en una sola pasada por columna"""
+        def conteo(campo):
+            if campo not in columnas:
+                return {}
+            contador = Counter(columnas[campo].tolist())
+            return {str(valor): cantidad_valor for valor, cantidad_valor in contador.items()
+                    if valor is not valor_ausente and valor is not _CAMPO_AUSENTE and not pd.isna(valor)}
+        
+        def cantidad_igual(campo, valor):
+            return columnas[campo].tolist().count(valor) if campo in columnas else 0
         
-        return estadisticas
+        return {
+            'total_procesados': cantidad,
+            'sin_cambios': int(sin_cambios.sum()),
+            'clasificados_como_poste': cantidad_igual('CLASE', 'POSTE'),
+            'estructuras_eyt': cantidad_igual('GRUPO', 'ESTRUCTURAS EYT'),
+            'por_tipo': conteo('TIPO'),
+            'por_tipo_proyecto': conteo('TIPO_PROYECTO'),
+            'por_propietario': conteo('PROPIETARIO'),
+            'codigo_material_por_uc': conteos['codigo_material_por_uc'],
+            'estado_salud_convertido': conteos['estado_salud_convertido'],
+        }
+    
+    def obtener_estadisticas(self, registros: List[Dict]) -> Dict:
+        """Genera estadísticas de clasificación para la UI"""
+        return ResumenRegistros.calcular(datos_norma=registros).estadisticas()
     
     def obtener_resumen_clasificacion(self, registros: List[Dict]) -> Dict:
         """Genera un resumen de la clasificación aplicada"""
-        resumen = {
-            'total_registros': len(registros),
-            'tipos_encontrados': {},
-            'grupos_encontrados': {},
-            'clasificaciones_aplicadas': {}
-        }
-        
-        for registro in registros:
-            # Contar tipos originales
-            tipo_original = registro.get('TIPO', 'SIN_TIPO')
-            resumen['tipos_encontrados'][tipo_original] = resumen['tipos_encontrados'].get(tipo_original, 0) + 1
-            
-            # Contar grupos
-            grupo = registro.get('GRUPO', 'SIN_GRUPO')
-            resumen['grupos_encontrados'][grupo] = resumen['grupos_encontrados'].get(grupo, 0) + 1
-            
-            # Contar clasificaciones aplicadas
-            clasificacion = registro.get('TIPO_CLASIFICADO', 'SIN_CLASIFICACION')
-            resumen['clasificaciones_aplicadas'][clasificacion] = resumen['clasificaciones_aplicadas'].get(clasificacion, 0) + 1
-        
-        return resumen
+        return ResumenRegistros.calcular(datos_norma=registros).resumen_clasificacion()
     
     def _asignar_codigo_material(self, uc: str) -> str:
         """
@@ -5322,21 +6257,17 @@ class ClasificadorEstructuras:
         if not uc_limpio:
             return ''
         
-        # 1. Buscar en mapeos directos específicos
-        mapeos_directos = MAPEO_UC_MATERIAL.get('MAPEOS_DIRECTOS', {})
-        if uc_limpio in mapeos_directos:
-            codigo_directo = mapeos_directos[uc_limpio]
-            if codigo_directo in CATALOGO_MATERIALES:
-                return codigo_directo
+        return self._memorizar_por_uc('material', uc_limpio, self._codigo_material_sin_memo)
+    
+    def _codigo_material_sin_memo(self, uc_limpio: str) -> str:
+        # 1. Buscar en mapeos directos específicos (ya filtrados contra el catálogo)
+        codigo_directo = REGLAS_UC_COMPILADAS['MATERIAL_DIRECTO'].get(uc_limpio)
+        if codigo_directo:
+            return codigo_directo
         
         # 2. Buscar por patrones regex
-        reglas_patron = MAPEO_UC_MATERIAL.get('REGLAS_POR_PATRON', [])
-        for regla in reglas_patron:
-            patron = regla.get('patron', '')
-            if not patron:
-                continue
-                
-            match = re.match(patron, uc_limpio)
+        for patron, regla in REGLAS_UC_COMPILADAS['MATERIAL_PATRONES']:
+            match = patron.match(uc_limpio)
             if match:
                 # Para patron N[nivel]L[carga]
                 if 'mapeo' in regla:
@@ -5360,7 +6291,7 @@ class ClasificadorEstructuras:
         
         # 3. Mapeo por defecto basado en clasificación de tipo
         tipo_estructura = self._clasificar_tipo_por_uc(uc_limpio)
-        mapeo_defecto = MAPEO_UC_MATERIAL.get('MAPEO_POR_DEFECTO', {})
+        mapeo_defecto = REGLAS_UC_COMPILADAS['MATERIAL_DEFECTO']
         
         if tipo_estructura in mapeo_defecto:
             codigo_defecto = mapeo_defecto[tipo_estructura]
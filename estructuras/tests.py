@@ -1,3 +1,860 @@
-from django.test import TestCase
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .cache_oracle import CacheOracle
+from .clasificador import ClasificadorAutomatico
+from .esquema_oracle import EsquemaOracle
+from .libro_excel import LectorExcelStreaming, LibroExcel
+from .models import BloqueRegistros, ProcesoEstructura
+from .services import (
+    ClasificadorEstructuras, DataTransformer, DataUtils, ExcelProcessor, FileGenerator, OracleHelper,
+    _almacenar_bloques_transformados, _almacenar_datos_transformados,
+)
+
+
+def _escrituras_bloques(funcion):
+    """Sentencias (no SELECT) sobre BloqueRegistros que ejecuta funcion()"""
+    with CaptureQueriesContext(connection) as consultas:
+        funcion()
+    tabla = BloqueRegistros._meta.db_table
+    return [c['sql'] for c in consultas.captured_queries
+            if tabla in c['sql'] and not c['sql'].lstrip().upper().startswith('SELECT')]
+
+
+@override_settings(REGISTROS_POR_BLOQUE=2)
+class BloqueRegistrosTests(TestCase):
+    """Almacenamiento de datos_excel / datos_norma por bloques (ProcesoEstructura)"""
+
+    def setUp(self):
+        self.proceso = ProcesoEstructura(archivo_excel='uploads/excel/prueba.xlsx')
+        self.proceso.datos_norma = [{'UC': f'N1C{i}', 'CIRCUITO': 'A'} for i in range(5)]
+        self.proceso.save()
+
+    def recargar(self):
+        return ProcesoEstructura.objects.get(pk=self.proceso.pk)
+
+    def test_guarda_por_bloques(self):
+        self.assertEqual(BloqueRegistros.objects.filter(proceso=self.proceso, tipo='norma').count(), 3)
+        self.assertEqual([r['UC'] for r in self.recargar().datos_norma], [f'N1C{i}' for i in range(5)])
+
+    def test_cambio_en_el_lugar_se_guarda(self):
+        proceso = self.recargar()
+        proceso.datos_norma[3]['CIRCUITO'] = 'B'
+        proceso.save()
+        self.assertEqual(self.recargar().datos_norma[3]['CIRCUITO'], 'B')
+
+    def test_reasignar_la_misma_lista_editada_se_guarda(self):
+        proceso = self.recargar()
+        registros = proceso.datos_norma
+        registros[0]['CIRCUITO'] = 'C'
+        proceso.datos_norma = registros
+        proceso.save()
+        self.assertEqual(self.recargar().datos_norma[0]['CIRCUITO'], 'C')
+
+    def test_solo_se_reescriben_los_bloques_que_cambiaron(self):
+        proceso = self.recargar()
+        proceso.datos_norma[4]['CIRCUITO'] = 'B'
+        escrituras = _escrituras_bloques(proceso.save)
+        self.assertEqual(len(escrituras), 1)
+        self.assertTrue(escrituras[0].lstrip().upper().startswith('UPDATE'))
+
+        # Sin cambios no se escribe ningún bloque
+        self.assertEqual(_escrituras_bloques(proceso.save), [])
+
+    def test_lista_mas_corta_borra_bloques_sobrantes(self):
+        proceso = self.recargar()
+        proceso.datos_norma = proceso.datos_norma[:2]
+        proceso.save()
+        self.assertEqual(BloqueRegistros.objects.filter(proceso=proceso, tipo='norma').count(), 1)
+        self.assertEqual(len(self.recargar().datos_norma), 2)
+
+    def test_actualizar_registros_no_vuelve_a_escribir_en_save(self):
+        proceso = self.recargar()
+        proceso.datos_norma  # cargado en memoria
+        proceso.actualizar_registros('norma', {1: {'CIRCUITO': 'Z'}})
+        self.assertEqual(proceso.datos_norma[1]['CIRCUITO'], 'Z')
+        self.assertEqual(_escrituras_bloques(proceso.save), [])
+        self.assertEqual(self.recargar().datos_norma[1]['CIRCUITO'], 'Z')
+
+    def test_completar_campos_actualiza_los_registros(self):
+        proceso = self.recargar()
+        clasificador = ClasificadorEstructuras()
+        proceso.datos_excel = [{'UC': r['UC']} for r in proceso.datos_norma]
+        proceso.datos_norma, _ = clasificador.clasificar_registros(proceso.datos_norma)
+        proceso.firmas_norma = clasificador.firmas_lote
+        proceso.save()
+
+        respuesta = self.client.post(
+            reverse('estructuras:completar_campos', args=[proceso.pk]),
+            data=json.dumps({'campos': {'CIRCUITO': ''}, 'propietario': 'PARTICULAR'}),
+            content_type='application/json',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        registros = self.recargar().datos_norma
+        self.assertEqual({r['PROPIETARIO'] for r in registros}, {'PARTICULAR'})
+        self.assertEqual({r['CIRCUITO'] for r in registros}, {''})
+        self.assertEqual([r['UC'] for r in registros], [f'N1C{i}' for i in range(5)])
+        self.assertEqual(len(self.recargar().firmas_norma), 5)
+
+    def test_firmas_norma_se_guardan_fuera_de_los_registros(self):
+        proceso = self.recargar()
+        proceso.firmas_norma = [f'firma{i}' for i in range(5)]
+        proceso.save()
+
+        proceso = self.recargar()
+        self.assertEqual(proceso.firmas_norma, [f'firma{i}' for i in range(5)])
+        self.assertTrue(all('firma' not in str(registro) for registro in proceso.datos_norma))
+
+        # Reasignar datos_norma descarta las firmas de los registros anteriores
+        proceso.datos_norma = proceso.datos_norma[:3]
+        proceso.save()
+        self.assertEqual(self.recargar().firmas_norma, ['', '', ''])
+
+
+class FirmaClasificacionTests(TestCase):
+    """Reutilización de registros ya clasificados (firmas fuera del registro)"""
+
+    def setUp(self):
+        self.registros = [
+            {'UC': 'N1C1', 'NIVEL_TENSION': '', 'TIPO_PROYECTO': 'II', 'FECHA_INSTALACION': '05/01/2023',
+             'PROPIETARIO': 'cens', 'ESTADO_SALUD': '1', 'OBSERVACIONES': ''},
+            {'UC': 'N2T3', 'NIVEL_TENSION': '13.2', 'CODIGO_MATERIAL': '', '_CODIGO_MATERIAL_FROM_EXCEL': True},
+        ]
+
+    def test_registros_sin_firma_en_el_registro(self):
+        clasificador = ClasificadorEstructuras()
+        clasificados, _ = clasificador.clasificar_registros(self.registros)
+        self.assertEqual(len(clasificador.firmas_lote), 2)
+        self.assertEqual(clasificador.firmas_lote, [clasificador.firma_clasificacion(r) for r in clasificados])
+        self.assertTrue(all(not campo.startswith('_FIRMA') for registro in clasificados for campo in registro))
+
+    def test_registros_con_la_misma_firma_no_se_reclasifican(self):
+        clasificador = ClasificadorEstructuras()
+        clasificados, _ = clasificador.clasificar_registros(self.registros)
+        firmas = clasificador.firmas_lote
+
+        modificados = [dict(registro) for registro in clasificados]
+        modificados[1]['UC'] = 'N1C2'
+        segundo = ClasificadorEstructuras()
+        reclasificados, estadisticas = segundo.clasificar_registros(modificados, firmas)
+        self.assertEqual(segundo.registros_sin_cambios, 1)
+        self.assertEqual(estadisticas['sin_cambios'], 1)
+        self.assertEqual(reclasificados[0], clasificados[0])
+        # Las reglas son idempotentes: reclasificar sin firmas da lo mismo
+        self.assertEqual(ClasificadorEstructuras().clasificar_registros(modificados)[0][0], clasificados[0])
+        self.assertEqual(reclasificados[1]['TIPO'], segundo.clasificar_estructura(modificados[1])['TIPO'])
+
+
+class FormatearFechaTests(SimpleTestCase):
+    """Salida de formatear_fecha fijada: los TXT generados no deben cambiar"""
+
+    def test_salida_de_formatear_fecha(self):
+        casos = [
+            (45000, '15/03/2023'),
+            (45000.0, '15/03/2023'),
+            (datetime(2023, 1, 5, 10, 30), '05/01/2023'),
+            ('05/01/2023', '05/01/2023'),
+            # Los textos en otros formatos no se convierten
+            ('05/01/2023 10:00', ''),
+            ('2023-01-05', ''),
+            ('1/5/2023 10:00', ''),
+            ('sin fecha', ''),
+            (None, ''),
+            ('', ''),
+        ]
+        for valor, esperado in casos:
+            with self.subTest(valor=valor):
+                self.assertEqual(DataUtils.formatear_fecha(valor), esperado)
+                self.assertEqual(DataUtils._convertir_fecha(valor), esperado)
+        valores = [valor for valor, _ in casos]
+        self.assertEqual(DataUtils.formatear_columna_fechas(valores, nulos=[v is None for v in valores]),
+                         [esperado for _, esperado in casos])
+
+
+def _sin_nan(registro):
+    return {campo: valor for campo, valor in registro.items()
+            if not (isinstance(valor, float) and math.isnan(valor))}
+
+
+class ClasificacionPorColumnasTests(SimpleTestCase):
+    """clasificar_registros / clasificar_lote_df contra clasificar_estructura (registro a registro)"""
+
+    REGISTROS = [
+        {'UC': 'N1L75', 'NIVEL_TENSION': '', 'TIPO_PROYECTO': 'II', 'CODIGO_MATERIAL': '', 'ESTADO_SALUD': '1',
+         'FECHA_INSTALACION': '2020-01-02', 'PROPIETARIO': 'CENS', 'OBSERVACIONES': ''},
+        {'UC': ' N3L105 ', 'NIVEL_TENSION': 'N2L', 'TIPO_PROYECTO': '', 'CODIGO_MATERIAL': '200015',
+         'ESTADO_SALUD': 'BUENO', 'FECHA_INSTALACION': '', 'PROPIETARIO': 'particular', 'OBSERVACIONES': ' hola'},
+        # CODIGO_MATERIAL vacío que vino del Excel: no se asigna por UC
+        {'UC': 'N1L75', 'CODIGO_MATERIAL': '', '_CODIGO_MATERIAL_FROM_EXCEL': True, 'PROPIETARIO': 'CENS'},
+        {'UC': 'N1L75', 'CODIGO_MATERIAL': '', '_CODIGO_MATERIAL_FROM_EXCEL': False, 'ESTADO_SALUD': 3},
+        # Campos ausentes y auditoría de una versión anterior
+        {'UC': 'zz', 'OBSERVACION_CLASIFICACION_SISTEMA': 'x', 'VERSION_REGLAS': '2.4'},
+        {'NIVEL_TENSION': 'N2L', 'CODIGO_MATERIAL': 200016.0, 'ESTADO_SALUD': 'x', 'CIRCUITO': 'A'},
+        {},
+    ]
+
+    def esperado(self, registros, firmas=None):
+        clasificador = ClasificadorEstructuras()
+        firmas = firmas or [None] * len(registros)
+        return [clasificador.clasificar_estructura(registro, firma) for registro, firma in zip(registros, firmas)]
+
+    def test_clasificar_registros_equivale(self):
+        clasificados, estadisticas = ClasificadorEstructuras().clasificar_registros(self.REGISTROS)
+        self.assertEqual(clasificados, self.esperado(self.REGISTROS))
+        self.assertEqual(estadisticas['total_procesados'], len(self.REGISTROS))
+
+    def test_clasificar_lote_df_con_celdas_nan_equivale(self):
+        # En el DataFrame los campos que un registro no trae quedan en NaN
+        df = pd.DataFrame(self.REGISTROS)
+        clasificado, _ = ClasificadorEstructuras().clasificar_lote_df(df)
+        filas = [_sin_nan(fila) for fila in clasificado.to_dict('records')]
+        self.assertEqual(filas, self.esperado(self.REGISTROS))
+
+    def test_firmas_parciales_equivalen(self):
+        clasificador = ClasificadorEstructuras()
+        clasificados, _ = clasificador.clasificar_registros(self.REGISTROS)
+        firmas = list(clasificador.firmas_lote)
+
+        # Unos cambian campos de entrada, otros solo campos que las reglas no leen, otros pierden la firma
+        modificados = [dict(registro) for registro in clasificados]
+        modificados[0]['UC'] = 'N2L79'
+        modificados[1]['CIRCUITO'] = 'B'
+        modificados[2]['_CODIGO_MATERIAL_FROM_EXCEL'] = False
+        firmas[3] = ''
+        firmas = firmas[:-1]
+
+        esperado = self.esperado(modificados, firmas + [None])
+        por_registros = ClasificadorEstructuras()
+        self.assertEqual(por_registros.clasificar_registros(modificados, firmas)[0], esperado)
+        self.assertEqual(por_registros.registros_sin_cambios, 3)
+
+        clasificado, _ = ClasificadorEstructuras().clasificar_lote_df(pd.DataFrame(modificados), firmas_previas=firmas)
+        self.assertEqual([_sin_nan(fila) for fila in clasificado.to_dict('records')], esperado)
+
+
+# Libro de prueba: una fila por regla del clasificador automático
+ENCABEZADOS_LIBRO = [
+    'Código FID_rep', 'Codigo UC_rep', 'Cantidad_rep', 'Tipo inventario',
+    'Norma', 'Apoyo', 'KGF', 'Altura', 'Poblacion', 'Fecha Instalacion', 'Unidad Constructiva', 'DESCRIPCION',
+]
+FILAS_LIBRO = [
+    # Expansión urbana / rural
+    [None, None, None, None, 'RA1', 'P', 510, 12, 'Urbana', datetime(2023, 1, 5), 'N1L510', 'poste'],
+    [None, None, None, None, 'RA1', 'P', 510, 12, ' rural ', '05/01/2023', 'N1L510', None],
+    # Reposición con mejora en KGF, en altura y sin mejora
+    [1234567, 'N1L510', 1, 'I', 'RA1', 'P', 750, 8, 'CRITICA', None, 'N1L750', None],
+    [1234568, 'N2L510', 1, None, 'RA1', 'P', 510, 12, 'Rural', None, 'N3L510', None],
+    [1234569, 'N4L1050', 2, None, 'RA1', 'P', 510, 12, 'URBANO', None, 'N1L510', None],
+    # KGF no numérico: reposición bajo
+    [1234570, 'N1L510', 1, None, None, None, 'alto', 12, 'Urbana', None, None, None],
+    # Solo salida (desmantelado) y solo espacios en los campos nuevos
+    [1234571, 'N1L510', 1, 'R', None, None, None, None, None, None, None, None],
+    [1234572, None, None, None, '   ', None, None, None, None, None, None, 'nan'],
+    # Fila vacía y fila con solo texto 'nan'
+    [None] * 12,
+    [None, None, None, None, 'nan', None, None, None, 'nan', None, None, None],
+]
+
+
+def _escribir_libro_prueba(directorio):
+    from openpyxl import Workbook
+
+    ruta = os.path.join(directorio, 'prueba.xlsx')
+    libro = Workbook()
+    hoja = libro.active
+    hoja.title = 'ESTRUCTURAS'
+    hoja.append(ENCABEZADOS_LIBRO)
+    for fila in FILAS_LIBRO:
+        hoja.append(fila)
+    libro.save(ruta)
+    return ruta
+
+
+def _resultado_comparable(resultado):
+    return (resultado.tipo, resultado.tipo_inversion, resultado.fid_anterior,
+            int(resultado.indice), _sin_nan(resultado.datos))
+
+
+def _registros_por_fila(df, es_campo_fecha=None, formatear_fecha=None):
+    """Conversión registro a registro con iterrows (la de ExcelProcessor antes de registros_desde_dataframe)"""
+    datos = []
+    for _, row in df.iterrows():
+        registro = {}
+        for col, val in row.items():
+            if pd.isna(val):
+                registro[col] = ""
+            elif es_campo_fecha and es_campo_fecha(col) and val:
+                registro[col] = formatear_fecha(val)
+            else:
+                registro[col] = str(val).strip()
+        datos.append(registro)
+    return datos
+
+
+@override_settings(EXCEL_CACHE_PARSEO=False)
+class LibroPruebaTests(SimpleTestCase):
+    """Caminos por columnas contra los recorridos fila a fila sobre un libro Excel de prueba"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directorio = tempfile.mkdtemp()
+        cls.ruta = _escribir_libro_prueba(cls.directorio)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directorio, ignore_errors=True)
+        super().tearDownClass()
+
+    def hoja(self):
+        return LibroExcel(self.ruta).hoja('ESTRUCTURAS')
+
+    def test_clasificar_dataset_equivale_a_clasificar_registro(self):
+        df = self.hoja()
+        clasificador = ClasificadorAutomatico()
+        resultados = clasificador.clasificar_dataset(df)
+
+        por_fila = {tipo: [] for tipo in resultados}
+        for indice, fila in df.iterrows():
+            resultado = clasificador.clasificar_registro(fila, indice)
+            por_fila[resultado.tipo].append(resultado)
+
+        for tipo, lista in resultados.items():
+            self.assertEqual([_resultado_comparable(r) for r in lista],
+                             [_resultado_comparable(r) for r in por_fila[tipo]], tipo)
+        self.assertEqual({tipo: len(lista) for tipo, lista in resultados.items()},
+                         {'EXPANSION': 2, 'REPOSICION_NUEVO': 2, 'REPOSICION_BAJO': 4, 'SIN_CLASIFICAR': 2})
+
+    def test_resultados_compactos_equivalen(self):
+        df = self.hoja()
+        clasificador = ClasificadorAutomatico()
+        resultados = clasificador.clasificar_dataset(df, con_datos=False)
+        self.assertTrue(all(r.datos == {} for lista in resultados.values() for r in lista))
+        compacto = ClasificadorAutomatico.resultados_compactos(resultados, 'ESTRUCTURAS')
+        self.assertEqual(compacto, ClasificadorAutomatico.resultados_compactos(clasificador.clasificar_dataset(df),
+                                                                               'ESTRUCTURAS'))
+
+        esperado = {tipo: {'indices': [], 'tipo_inversion': [], 'fid_anterior': []}
+                    for tipo in compacto['tipos']}
+        for indice, fila in df.iterrows():
+            resultado = clasificador.clasificar_registro(fila, indice)
+            esperado[resultado.tipo]['indices'].append(indice)
+            esperado[resultado.tipo]['tipo_inversion'].append(resultado.tipo_inversion)
+            esperado[resultado.tipo]['fid_anterior'].append(resultado.fid_anterior)
+
+        self.assertEqual(compacto['hoja'], 'ESTRUCTURAS')
+        self.assertEqual(compacto['tipos'], esperado)
+        self.assertEqual(len(compacto['tipos']['REPOSICION_NUEVO']['indices']), 2)
+        # El compacto se guarda en un JSONField
+        self.assertEqual(json.loads(json.dumps(compacto)), compacto)
+
+    def test_clasificar_dataset_sin_columnas_de_salida(self):
+        df = self.hoja()[['Norma', 'KGF', 'Poblacion']]
+        clasificador = ClasificadorAutomatico()
+        resultados = clasificador.clasificar_dataset(df)
+        esperado = [_resultado_comparable(clasificador.clasificar_registro(fila, indice))
+                    for indice, fila in df.iterrows()]
+        obtenido = sorted((_resultado_comparable(r) for lista in resultados.values() for r in lista),
+                          key=lambda r: r[3])
+        self.assertEqual(obtenido, esperado)
+
+    def test_registros_desde_dataframe_equivale_a_iterrows(self):
+        df = self.hoja()
+        procesador = ExcelProcessor(ProcesoEstructura())
+        self.assertEqual(
+            DataUtils.registros_desde_dataframe(df, es_campo_fecha=procesador._es_campo_fecha,
+                                                formatear_fecha=procesador._formatear_fecha_excel),
+            _registros_por_fila(df, procesador._es_campo_fecha, procesador._formatear_fecha_excel),
+        )
+        self.assertEqual(DataUtils.registros_desde_dataframe(df), _registros_por_fila(df))
+
+
+class CacheParseoTests(SimpleTestCase):
+    """Caché de parseo de LibroExcel: JSON fuera de MEDIA_ROOT y limpieza"""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.media = os.path.join(self.directorio, 'media')
+        self.cache = os.path.join(self.directorio, 'cache')
+        os.makedirs(os.path.join(self.media, 'uploads', 'excel'))
+        self.ruta = _escribir_libro_prueba(os.path.join(self.media, 'uploads', 'excel'))
+        ajustes = override_settings(MEDIA_ROOT=self.media, EXCEL_CACHE_PARSEO_DIR=self.cache)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.addCleanup(shutil.rmtree, self.directorio, True)
+
+    def test_la_cache_se_guarda_fuera_de_media_y_se_reutiliza(self):
+        original = LibroExcel(self.ruta).hoja('ESTRUCTURAS')
+        entrada = os.path.join(self.cache, LibroExcel(self.ruta).hash_contenido)
+        self.assertEqual(sorted(os.listdir(entrada)), ['hoja_0.json', 'indice.json'])
+        self.assertEqual(os.listdir(os.path.join(self.media, 'uploads', 'excel')), ['prueba.xlsx'])
+
+        desde_cache = LibroExcel(self.ruta)
+        self.assertIsNotNone(desde_cache._cargar_hoja_desde_cache('ESTRUCTURAS'))
+        pd.testing.assert_frame_equal(desde_cache.hoja('ESTRUCTURAS'), original)
+
+    def test_celdas_con_fechas_y_errores_sobreviven_a_la_cache(self):
+        from datetime import date, time, timedelta
+        from .libro_excel import deserializar_celdas, serializar_celdas
+
+        celdas = [['a', 1, 2.5, '', True, float('nan')],
+                  [datetime(2023, 1, 5, 8, 30), date(2023, 1, 5), time(7, 15), timedelta(days=1, seconds=3), None, '{"x": 1}']]
+        recuperadas = deserializar_celdas(serializar_celdas(celdas))
+        self.assertTrue(math.isnan(recuperadas[0][5]))
+        recuperadas[0][5] = celdas[0][5]
+        self.assertEqual(recuperadas, celdas)
+        self.assertEqual([type(v) for v in recuperadas[1]], [type(v) for v in celdas[1]])
+
+    def test_limpiar_cache(self):
+        LibroExcel(self.ruta).hoja('ESTRUCTURAS')
+        anterior = os.path.join(self.media, 'uploads', 'excel', 'abc.parseo')
+        os.makedirs(anterior)
+
+        # Usada recién: no vence; las carpetas *.parseo de MEDIA_ROOT se borran siempre
+        self.assertEqual(LibroExcel.limpiar_cache(dias=30), 1)
+        self.assertFalse(os.path.exists(anterior))
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+
+        self.assertEqual(LibroExcel.limpiar_cache(), 1)
+        self.assertEqual(os.listdir(self.cache), [])
+
+
+@override_settings(EXCEL_CACHE_PARSEO=False)
+class ProcesamientoPorBloquesTests(TestCase):
+    """Lectura streaming y almacenamiento bloque a bloque contra el camino con la hoja completa"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directorio = tempfile.mkdtemp()
+        cls.ruta = _escribir_libro_prueba(cls.directorio)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directorio, ignore_errors=True)
+        super().tearDownClass()
+
+    def registros_excel(self):
+        procesador = ExcelProcessor(ProcesoEstructura())
+        return DataUtils.registros_desde_dataframe(
+            LibroExcel(self.ruta).hoja('ESTRUCTURAS'),
+            es_campo_fecha=procesador._es_campo_fecha, formatear_fecha=procesador._formatear_fecha_excel
+        )
+
+    def test_lector_streaming_equivale_a_libro_excel(self):
+        procesador = ExcelProcessor(ProcesoEstructura())
+        registros = list(LectorExcelStreaming(self.ruta).iterar_registros(
+            'ESTRUCTURAS', 0, es_campo_fecha=procesador._es_campo_fecha,
+            formatear_fecha=procesador._formatear_fecha_excel
+        ))
+        self.assertEqual(registros, self.registros_excel())
+
+    def test_lector_streaming_con_pasada_previa_equivale_a_libro_excel(self):
+        # Hoja de más de MAX_FILAS_UNA_PASADA filas: el tipo de cada columna se decide para toda la hoja
+        procesador = ExcelProcessor(ProcesoEstructura())
+        with mock.patch.object(LectorExcelStreaming, 'MAX_FILAS_UNA_PASADA', 3):
+            registros = list(LectorExcelStreaming(self.ruta).iterar_registros(
+                'ESTRUCTURAS', 0, es_campo_fecha=procesador._es_campo_fecha,
+                formatear_fecha=procesador._formatear_fecha_excel
+            ))
+        self.assertEqual(registros, self.registros_excel())
+        self.assertEqual({r['Cantidad_rep'] for r in registros}, {'', '1.0', '2.0'})
+
+    @override_settings(REGISTROS_POR_BLOQUE=2)
+    def test_almacenar_por_bloques_equivale_a_la_lista_completa(self):
+        completo = ProcesoEstructura.objects.create(archivo_excel='uploads/excel/prueba.xlsx')
+        _almacenar_datos_transformados(completo, DataTransformer('EXPANSION').transformar_datos(self.registros_excel()))
+
+        por_bloques = ProcesoEstructura.objects.create(archivo_excel='uploads/excel/prueba.xlsx')
+        por_bloques.datos_norma = [{'UC': 'viejo'}] * 15  # registros de una carga anterior
+        por_bloques.save()
+        progreso = []
+        with mock.patch.object(DataTransformer, 'TAMANO_BLOQUE_CLASIFICACION', 4):
+            bloques = DataTransformer('EXPANSION').transformar_por_bloques(self.registros_excel(), progreso.append)
+            _almacenar_bloques_transformados(por_bloques, bloques)
+        self.assertEqual(progreso, [4, 8, 10])
+
+        completo = ProcesoEstructura.objects.get(pk=completo.pk)
+        por_bloques = ProcesoEstructura.objects.get(pk=por_bloques.pk)
+        for campo in ('datos_excel', 'datos_norma', 'firmas_norma', 'resumen_registros',
+                      'campos_faltantes', 'registros_totales', 'estado'):
+            self.assertEqual(getattr(por_bloques, campo), getattr(completo, campo), campo)
+        self.assertEqual(por_bloques.registros_totales, len(FILAS_LIBRO))
+        self.assertEqual(
+            list(por_bloques.bloques_registros.filter(tipo='norma').values_list('numero', 'inicio', 'cantidad')),
+            [(0, 0, 2), (1, 2, 2), (2, 4, 2), (3, 6, 2), (4, 8, 2)]
+        )
+
+        # Los bloques escritos por lotes coinciden con los de save(): nada que reescribir
+        por_bloques.datos_norma
+        self.assertEqual(_escrituras_bloques(por_bloques.save), [])
+
+    def test_completar_circuito_no_reclasifica_lo_almacenado(self):
+        proceso = ProcesoEstructura.objects.create(archivo_excel='uploads/excel/prueba.xlsx')
+        _almacenar_datos_transformados(proceso, DataTransformer('EXPANSION').transformar_datos(self.registros_excel()))
+
+        clasificadores = []
+        original = ClasificadorEstructuras.clasificar_registros
+
+        def clasificar_registros(clasificador, *args, **kwargs):
+            clasificadores.append(clasificador)
+            return original(clasificador, *args, **kwargs)
+
+        with mock.patch.object(ClasificadorEstructuras, 'clasificar_registros', autospec=True,
+                               side_effect=clasificar_registros):
+            respuesta = self.client.post(
+                reverse('estructuras:completar_campos', args=[proceso.pk]),
+                data=json.dumps({'campos': {'CIRCUITO': 'CIRC-1'}}),
+                content_type='application/json',
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(clasificadores), 1)
+        self.assertEqual(clasificadores[0].registros_sin_cambios, len(FILAS_LIBRO))
+
+        # Reutilizar la clasificación da lo mismo que reclasificar todo sin firmas
+        proceso = ProcesoEstructura.objects.get(pk=proceso.pk)
+        combinados = [{**excel, **norma} for excel, norma in zip(proceso.datos_excel, proceso.datos_norma)]
+        reclasificados, _ = ClasificadorEstructuras().clasificar_registros(combinados)
+        for almacenado, reclasificado in zip(proceso.datos_norma, reclasificados):
+            for campo in almacenado:
+                if campo not in ClasificadorEstructuras.CAMPOS_AUDITORIA:
+                    self.assertEqual(almacenado[campo], reclasificado[campo], campo)
+        self.assertEqual({r['CIRCUITO'] for r in proceso.datos_norma}, {'CIRC-1'})
+
+
+class _CursorFalso:
+    """Cursor de _OracleFalso: cada execute se registra y se responde con filas (dicts por columna)"""
+
+    def __init__(self, oracle):
+        self.oracle = oracle
+        self.filas = []
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, binds=None):
+        sql = ' '.join(sql.split())
+        binds = dict(binds or {})
+        self.oracle.consultas.append((sql, binds))
+        filas = self.oracle.responder(sql, binds)
+        self.description = [(columna,) for columna in filas[0]] if filas else []
+        self.filas = [tuple(fila.values()) for fila in filas]
+
+    def fetchall(self):
+        return self.filas
+
+    def fetchone(self):
+        return self.filas[0] if self.filas else None
+
+
+class _OracleFalso:
+    """Reemplazo de OracleHelper.conexion: responder(sql, binds) da las filas de cada consulta"""
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.consultas = []
+
+    @contextmanager
+    def conexion(self):
+        yield self
+
+    def cursor(self):
+        return _CursorFalso(self)
+
+    def consultas_con(self, texto):
+        return [(sql, binds) for sql, binds in self.consultas if texto in sql]
+
+
+def _consultas_cache(consultas):
+    return [consulta['sql'] for consulta in consultas if 'consultaoraclecache' in consulta['sql']]
+
+
+class ConsultasOracleEnBloqueTests(TestCase):
+    """Consultas Oracle en bloque (con caché local) contra las consultas por registro"""
+
+    NORMAS = {
+        '10': [{'NORMA': 'N1', 'GRUPO': 'G1', 'CIRCUITO': ' C1 ', 'CODIGO_TRAFO': None,
+                'MACRONORMA': 'M1', 'CANTIDAD': 2, 'TIPO_ADECUACION': 'T1'}],
+        # Dos filas para el mismo FID: gana la primera, como fetchone()
+        '11': [{'NORMA': 'N2', 'GRUPO': 'G2', 'CIRCUITO': 'C2', 'CODIGO_TRAFO': '1T',
+                'MACRONORMA': None, 'CANTIDAD': None, 'TIPO_ADECUACION': ''},
+               {'NORMA': 'OTRA', 'GRUPO': '', 'CIRCUITO': '', 'CODIGO_TRAFO': '',
+                'MACRONORMA': '', 'CANTIDAD': 1, 'TIPO_ADECUACION': ''}],
+    }
+
+    CONDUCTORES = {
+        'L1': {'COOR_GPS_LON': -72.5, 'COOR_GPS_LAT': 7.9, 'UC': 'N1L1'},
+        '555': {'COOR_GPS_LON': -72.6, 'COOR_GPS_LAT': 7.8, 'UC': 'N1L2'},
+    }
+
+    def responder(self, sql, binds):
+        if 'JOIN norma n' in sql:
+            return [
+                {'G3E_FID': int(fid), **fila} if 'SELECT c.g3e_fid' in sql else fila
+                for fid in binds.values() for fila in self.NORMAS.get(fid, [])
+            ]
+        if 'FROM econ_pri_at cp' in sql:
+            return [{**fila, 'CODIGO': codigo} for codigo in binds.values()
+                    for fila in [self.CONDUCTORES.get(codigo)] if fila]
+        if 'codigo_operativo IN' in sql:
+            return [{'CODIGO_OPERATIVO': 'Z100', 'G3E_FID': 555}] if 'Z100' in binds.values() else []
+        return []
+
+    def setUp(self):
+        self.oracle = _OracleFalso(self.responder)
+        parche = mock.patch.object(OracleHelper, 'conexion', self.oracle.conexion)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_normas_por_fids_equivale_a_la_consulta_por_fid(self):
+        with CaptureQueriesContext(connection) as consultas:
+            normas = OracleHelper.obtener_normas_por_fids(['10', ' 11 ', '12', '10', '', None])
+        # Una consulta Oracle para todo el lote, una lectura y una escritura de la caché
+        self.assertEqual([binds for _, binds in self.oracle.consultas], [{'f0': '10', 'f1': '11', 'f2': '12'}])
+        self.assertEqual(len(_consultas_cache(consultas)), 2)
+
+        por_fid = {fid: OracleHelper.obtener_norma_por_fid(fid) for fid in ('10', '11', '12')}
+        self.assertEqual(normas, {fid: datos for fid, datos in por_fid.items() if datos})
+        self.assertEqual(normas['11']['NORMA'], 'N2')
+
+        # Segunda vez: todo desde la caché, incluido el FID sin norma
+        self.oracle.consultas.clear()
+        self.assertEqual(OracleHelper.obtener_normas_por_fids(['10', '11', '12']), normas)
+        self.assertEqual(self.oracle.consultas, [])
+
+    @mock.patch.object(OracleHelper, 'test_connection', return_value=True)
+    def test_conductores_de_reposicion_en_una_consulta(self, _):
+        def conductores():
+            return [
+                {'Código FID GIT': 'L1', 'UC': 'N1L1', 'coor_gps_lat': '1', 'coor_gps_lon': '2'},
+                {'Código FID GIT': 'Z100', 'UC': 'N1L2', 'coor_gps_lat': '1', 'coor_gps_lon': '2'},
+                {'Código FID GIT': 'L1', 'UC': 'N1L1', 'coor_gps_lat': '3', 'coor_gps_lon': '4'},
+                {'Código FID GIT': 'L404', 'UC': 'N1L1', 'coor_gps_lat': '5', 'coor_gps_lon': '6'},
+                {'Código FID GIT': 'L2', 'UC': '', 'coor_gps_lat': '7', 'coor_gps_lon': '8'},  # no es reposición
+            ]
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media):
+            generador = FileGenerator(ProcesoEstructura())
+
+        with CaptureQueriesContext(connection) as consultas:
+            enriquecidos = generador._enriquecer_conductores_reposicion(conductores())
+        self.assertEqual(
+            [(r['coor_gps_lat'], r['coor_gps_lon']) for r in enriquecidos],
+            [('7.9', '-72.5'), ('7.8', '-72.6'), ('7.9', '-72.5'), ('5', '6'), ('7', '8')]
+        )
+        consultas_conductor = self.oracle.consultas_con('FROM econ_pri_at cp')
+        self.assertEqual([sorted(binds.values()) for _, binds in consultas_conductor], [['555', 'L1', 'L404']])
+        # Caché: escritura de código -> FID (reposición, sin lectura) y una lectura y una escritura de conductores
+        self.assertEqual(len(_consultas_cache(consultas)), 3)
+
+        # Segunda vez: los conductores (incluido el inexistente) salen de la caché
+        self.oracle.consultas.clear()
+        self.assertEqual(generador._enriquecer_conductores_reposicion(conductores()), enriquecidos)
+        self.assertEqual(self.oracle.consultas_con('FROM econ_pri_at cp'), [])
+        self.assertEqual(generador._consultar_conductor_oracle('L1'), generador._datos_conductor_oracle(
+            {**self.CONDUCTORES['L1'], 'CODIGO': 'L1'}))
+
+    def test_uc_por_fid_solo_consulta_ccomun_si_tiene_la_columna(self):
+        def responder(sql, binds):
+            if 'FROM ccomun c' in sql:
+                return [{'UC': 'UC_CCOMUN'}]
+            if 'FROM eposte_at p' in sql:
+                return [{'UC': 'UC_EPOSTE'}]
+            return []
+        self.oracle.responder = responder
+
+        sin_uc_ccomun = EsquemaOracle({'CCOMUN': ('G3E_FID',), 'EPOSTE_AT': ('G3E_FID', 'UC')}, time.time())
+        with mock.patch.object(EsquemaOracle, 'obtener', return_value=sin_uc_ccomun):
+            self.assertEqual(OracleHelper.obtener_uc_por_fid('10.0'), 'UC_EPOSTE')
+        self.assertEqual(self.oracle.consultas_con('FROM ccomun'), [])
+        self.assertEqual([binds for _, binds in self.oracle.consultas], [{'fid_param': '10'}])
+
+        self.oracle.consultas.clear()
+        con_uc_ccomun = EsquemaOracle({'CCOMUN': ('G3E_FID', 'UC'), 'EPOSTE_AT': ('G3E_FID', 'UC')}, time.time())
+        with mock.patch.object(EsquemaOracle, 'obtener', return_value=con_uc_ccomun):
+            self.assertEqual(OracleHelper.obtener_uc_por_fid('10'), 'UC_CCOMUN')
+        self.assertEqual([sql for sql, _ in self.oracle.consultas], ['SELECT c.UC FROM ccomun c WHERE c.g3e_fid = :fid_param'])
+
+
+class CodigosOperativosEnBloqueTests(TestCase):
+    """obtener_fids_desde_codigos_operativos contra obtener_fid_desde_codigo_operativo"""
+
+    # Z1 tiene dos filas (gana la primera, como fetchone()); Z5 no existe
+    FIDS = {'Z1': [100, 101], 'Z2': [200], 'Z3': [300], 'Z4': [400], 'Z6': [600], 'Z7': [700]}
+    CODIGOS = ['Z1', ' Z2 ', 'Z3', 'Z1', None, '', 'nan', 'Z4', 'Z5', 'Z6', 'Z7']
+    UNICOS = ['Z1', 'Z2', 'Z3', 'Z4', 'Z5', 'Z6', 'Z7']
+
+    def responder(self, sql, binds):
+        if self.fallar_en is not None and len(self.oracle.consultas) - 1 == self.fallar_en:
+            raise Exception("DPY-4011: the database or network closed the connection")
+        return [{'CODIGO_OPERATIVO': codigo, 'G3E_FID': fid}
+                for codigo in binds.values() for fid in self.FIDS.get(codigo, [])]
+
+    def setUp(self):
+        self.fallar_en = None
+        self.oracle = _OracleFalso(self.responder)
+        for parche in (mock.patch.object(OracleHelper, 'conexion', self.oracle.conexion),
+                       mock.patch.object(OracleHelper, 'MAX_BINDS_IN', 3)):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def test_equivale_a_la_consulta_por_codigo(self):
+        fids = OracleHelper.obtener_fids_desde_codigos_operativos(self.CODIGOS)
+        # Códigos únicos y limpios, en bloques de MAX_BINDS_IN
+        self.assertEqual([binds for _, binds in self.oracle.consultas], [
+            {'c0': 'Z1', 'c1': 'Z2', 'c2': 'Z3'}, {'c0': 'Z4', 'c1': 'Z5', 'c2': 'Z6'}, {'c0': 'Z7'},
+        ])
+        self.assertTrue(all('WHERE codigo_operativo IN (:c0' in sql for sql, _ in self.oracle.consultas))
+
+        por_codigo = {codigo: OracleHelper.obtener_fid_desde_codigo_operativo(codigo) for codigo in self.UNICOS}
+        self.assertEqual(fids, {codigo: fid for codigo, fid in por_codigo.items() if fid})
+        self.assertEqual(fids['Z1'], '100')
+        self.assertNotIn('Z5', fids)
+
+    def test_cache_con_entradas_negativas(self):
+        fids = OracleHelper.obtener_fids_desde_codigos_operativos(self.CODIGOS)
+
+        # Todo sale de la caché, también el código sin FID
+        self.oracle.consultas.clear()
+        self.assertEqual(OracleHelper.obtener_fids_desde_codigos_operativos(self.CODIGOS), fids)
+        self.assertEqual(self.oracle.consultas, [])
+
+        # usar_cache=False (reposiciones) consulta todos los códigos y actualiza la caché
+        self.FIDS = {**self.FIDS, 'Z5': [500]}
+        self.assertEqual(OracleHelper.obtener_fids_desde_codigos_operativos(['Z5'], usar_cache=False), {'Z5': '500'})
+        self.assertEqual(len(self.oracle.consultas), 1)
+        self.assertEqual(OracleHelper.obtener_fids_desde_codigos_operativos(['Z5']), {'Z5': '500'})
+        self.assertEqual(len(self.oracle.consultas), 1)
+
+    def test_error_de_conexion_solo_guarda_los_bloques_respondidos(self):
+        self.fallar_en = 1
+        fids = OracleHelper.obtener_fids_desde_codigos_operativos(self.CODIGOS)
+        self.assertEqual(fids, {'Z1': '100', 'Z2': '200', 'Z3': '300'})
+
+        # Los códigos del bloque que falló (y los siguientes) se vuelven a consultar
+        self.fallar_en = None
+        self.oracle.consultas.clear()
+        fids = OracleHelper.obtener_fids_desde_codigos_operativos(self.CODIGOS)
+        self.assertEqual([sorted(binds.values()) for _, binds in self.oracle.consultas], [['Z4', 'Z5', 'Z6'], ['Z7']])
+        self.assertEqual(len(fids), 6)
+
+
+class DatosTxtEnBloqueTests(TestCase):
+    """obtener_datos_txt_por_fids contra obtener_datos_txt_nuevo_por_fid + obtener_uc_por_fid"""
+
+    CCOMUN = {
+        '10': {'COOR_GPS_LON': -72.5, 'COOR_GPS_LAT': 7.9, 'UBICACION': 'U1', 'CLASIFICACION_MERCADO': 'M1', 'UC': 'N1C1'},
+        '11': {'COOR_GPS_LON': -72.6, 'COOR_GPS_LAT': 7.8, 'UBICACION': None, 'CLASIFICACION_MERCADO': 'M2', 'UC': None},
+        '14': {'COOR_GPS_LON': None, 'COOR_GPS_LAT': None, 'UBICACION': 'U4', 'CLASIFICACION_MERCADO': None, 'UC': ' '},
+    }
+    EPOSTE = {
+        '11': {'TIPO': 'CONCRETO', 'TIPO_ADECUACION': 'A', 'UC': 'N1C2'},
+        '12': {'TIPO': 'METALICO', 'TIPO_ADECUACION': None, 'UC': 'N2C1'},  # sin registro en CCOMUN
+        '14': {'TIPO': None, 'TIPO_ADECUACION': None, 'UC': 'N2C4'},
+    }
+    # Dos propietarios para el FID 11: el JOIN da dos filas y gana la primera, como fetchone()
+    PROPIETARIOS = {'10': ['CENS'], '11': ['PARTICULAR', 'OTRO']}
+    # FID 13 no está en ninguna tabla
+    FIDS = ['10', '10.0', ' 11 ', '12', '13', '14', None, 'nan', '11']
+
+    def responder(self, sql, binds):
+        fids = list(binds.values())
+        if 'LEFT JOIN cpropietario' in sql:
+            filas = []
+            for fid in fids:
+                if fid not in self.CCOMUN:
+                    continue
+                c, p = self.CCOMUN[fid], self.EPOSTE.get(fid, {})
+                for propietario in self.PROPIETARIOS.get(fid, [None]):
+                    fila = {'G3E_FID': int(fid)} if ' IN (' in sql else {}
+                    fila.update({'COOR_GPS_LON': c['COOR_GPS_LON'], 'COOR_GPS_LAT': c['COOR_GPS_LAT'],
+                                 'TIPO': p.get('TIPO'), 'TIPO_ADECUACION': p.get('TIPO_ADECUACION'),
+                                 'PROPIETARIO_1': propietario, 'UBICACION': c['UBICACION'],
+                                 'CLASIFICACION_MERCADO': c['CLASIFICACION_MERCADO']})
+                    if ' IN (' in sql:
+                        fila['UC_CCOMUN'] = c['UC'] if 'c.UC,' in sql else None
+                        fila['UC_EPOSTE'] = p.get('UC') if 'p.UC FROM' in sql else None
+                    filas.append(fila)
+            return filas
+        if 'FROM eposte_at p WHERE p.g3e_fid IN' in sql:
+            return [{'G3E_FID': int(fid), 'UC': self.EPOSTE[fid]['UC']} for fid in fids if fid in self.EPOSTE]
+        if 'FROM ccomun c WHERE c.g3e_fid = :fid_param' in sql:
+            return [{'UC': self.CCOMUN[fid]['UC']} for fid in fids if fid in self.CCOMUN]
+        if 'FROM eposte_at p WHERE p.g3e_fid = :fid_param' in sql:
+            return [{'UC': self.EPOSTE[fid]['UC']} for fid in fids if fid in self.EPOSTE]
+        return []
+
+    def setUp(self):
+        self.oracle = _OracleFalso(self.responder)
+        self.esquema = EsquemaOracle({'CCOMUN': ('G3E_FID', 'UC'), 'EPOSTE_AT': ('G3E_FID', 'UC')}, time.time())
+        for parche in (mock.patch.object(OracleHelper, 'conexion', self.oracle.conexion),
+                       mock.patch.object(OracleHelper, 'MAX_BINDS_IN', 2),
+                       mock.patch.object(EsquemaOracle, 'obtener', side_effect=lambda cursor: self.esquema)):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def por_fid(self, fid):
+        """Resultado esperado de un FID con las consultas individuales"""
+        datos = OracleHelper.obtener_datos_txt_nuevo_por_fid(fid)
+        uc = OracleHelper.obtener_uc_por_fid(fid)
+        if datos:
+            return {'UC': uc, **datos}
+        return {'UC': uc} if uc else None
+
+    def test_equivale_a_las_consultas_por_fid(self):
+        datos = OracleHelper.obtener_datos_txt_por_fids(self.FIDS)
+        # FID únicos sin .0, en bloques de MAX_BINDS_IN; la UC de EPOSTE_AT solo para los que no están en CCOMUN
+        self.assertEqual(
+            [('EPOSTE_AT' if sql.startswith('SELECT p.g3e_fid') else 'JOIN', binds) for sql, binds in self.oracle.consultas],
+            [('JOIN', {'f0': '10', 'f1': '11'}),
+             ('JOIN', {'f0': '12', 'f1': '13'}),
+             ('EPOSTE_AT', {'f0': '12', 'f1': '13'}),
+             ('JOIN', {'f0': '14'})]
+        )
+        self.assertIn('c.UC, p.UC FROM ccomun c', self.oracle.consultas[0][0])
+        self.assertIn('FROM eposte_at p WHERE p.g3e_fid IN (:f0, :f1)', self.oracle.consultas[2][0])
+
+        esperado = {fid: self.por_fid(fid) for fid in ('10', '11', '12', '13', '14')}
+        self.assertEqual(esperado['11']['PROPIETARIO'], 'PARTICULAR')
+        self.assertEqual(esperado['14']['UC'], 'N2C4')
+        self.assertEqual(esperado['12'], {'UC': 'N2C1'})
+        self.assertIsNone(esperado['13'])
+        # '10.0' es el mismo FID que '10': aparece con la forma en que se pidió
+        esperado['10.0'] = esperado['10']
+        self.assertEqual(datos, {fid: valor for fid, valor in esperado.items() if valor})
+
+    def test_cache_con_entradas_negativas(self):
+        datos = OracleHelper.obtener_datos_txt_por_fids(self.FIDS)
+        self.oracle.consultas.clear()
+        self.assertEqual(OracleHelper.obtener_datos_txt_por_fids(self.FIDS), datos)
+        self.assertEqual(self.oracle.consultas, [])
+        self.assertEqual(OracleHelper.obtener_datos_txt_por_fids(['13.0', '13']), {})
+        self.assertEqual(self.oracle.consultas, [])
+
+    def test_sin_columnas_de_uc_no_consulta_eposte(self):
+        self.esquema = EsquemaOracle({'CCOMUN': ('G3E_FID',), 'EPOSTE_AT': ('G3E_FID',)}, time.time())
+        with CacheOracle.omitir():
+            datos = OracleHelper.obtener_datos_txt_por_fids(self.FIDS)
+        self.assertEqual(len(self.oracle.consultas), 3)
+        self.assertTrue(all('NULL, NULL FROM ccomun c' in sql for sql, _ in self.oracle.consultas))
+        self.assertEqual(sorted(datos), ['10', '10.0', '11', '14'])
+        self.assertEqual({fid: valores['UC'] for fid, valores in datos.items()}, dict.fromkeys(datos, ''))
@@ -9,6 +9,7 @@ urlpatterns = [
     path('cargar-mas-procesos/', views.cargar_mas_procesos, name='cargar_mas_procesos'),
     path('proceso/<uuid:proceso_id>/', views.proceso_detalle, name='proceso_detalle'),
     path('proceso/<uuid:proceso_id>/estado/', views.estado_proceso, name='estado_proceso'),
+    path('proceso/<uuid:proceso_id>/errores/', views.errores_proceso, name='errores_proceso'),
     
     # URLs para clasificación automática
     path('proceso/<uuid:proceso_id>/revisar-clasificacion/', views.revisar_clasificacion, name='revisar_clasificacion'),
@@ -17,5 +18,6 @@ urlpatterns = [
     # URLs existentes
     path('proceso/<uuid:proceso_id>/completar/', views.completar_campos, name='completar_campos'),
     path('proceso/<uuid:proceso_id>/estadisticas/', views.estadisticas_clasificacion, name='estadisticas_clasificacion'),
+    path('proceso/<uuid:proceso_id>/auditoria-clasificacion/', views.auditoria_clasificacion, name='auditoria_clasificacion'),
     path('proceso/<uuid:proceso_id>/descargar/<str:tipo_archivo>/', views.descargar_archivo, name='descargar_archivo'),
 ]
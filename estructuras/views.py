@@ -1,18 +1,21 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse, Http404, FileResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
 from django.contrib import messages
 from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
 from django.urls import reverse
 from django.conf import settings
 import json
+import hashlib
 import threading
 import os
 import pandas as pd
 from .models import ProcesoEstructura
 from .constants import CIRCUITOS_DISPONIBLES_LISTA, REGLAS_CLASIFICACION
 from .clasificador import ClasificadorAutomatico
+from .libro_excel import LibroExcel
 
 def index(request):
     """Página principal - listado de procesos"""
@@ -77,10 +80,25 @@ def iniciar_proceso(request):
                 'error': 'Solo se permiten archivos Excel (.xlsx, .xls)'
             }, status=400)
         
+        # Hash del contenido para detectar cargas repetidas del mismo archivo
+        hash_archivo = hashlib.sha256()
+        for bloque in archivo.chunks():
+            hash_archivo.update(bloque)
+        hash_archivo = hash_archivo.hexdigest()
+        archivo.seek(0)
+        
+        # Si el mismo contenido ya se cargó, reutilizar la copia física existente
+        archivo_existente = None
+        anterior = ProcesoEstructura.objects.filter(hash_archivo=hash_archivo).order_by('-created_at').first()
+        if anterior and anterior.archivo_excel and anterior.archivo_excel.storage.exists(anterior.archivo_excel.name):
+            archivo_existente = anterior.archivo_excel.name
+            print(f"♻️ Archivo ya cargado previamente (proceso {anterior.id}), reutilizando {archivo_existente}")
+        
         # Crear proceso
         with transaction.atomic():
             proceso = ProcesoEstructura.objects.create(
-                archivo_excel=archivo,
+                archivo_excel=archivo_existente or archivo,
+                hash_archivo=hash_archivo,
                 estado='INICIADO'
             )
         
@@ -88,32 +106,30 @@ def iniciar_proceso(request):
         def clasificar_async():
             try:
                 # Actualizar estado
-                proceso.estado = 'CLASIFICANDO'
-                proceso.save()
+                proceso.cambiar_estado('CLASIFICANDO')
                 
-                # Leer archivo Excel
-                df = pd.read_excel(proceso.archivo_excel.path)
+                # Mismo contenido ya clasificado y procesado: copiar resultados sin releer el Excel
+                from .services import buscar_proceso_reutilizable, reutilizar_procesamiento_previo, precargar_hojas_requeridas
+                previo = buscar_proceso_reutilizable(hash_archivo, excluir_id=proceso.id)
+                if previo:
+                    reutilizar_procesamiento_previo(proceso, previo)
+                    return
+                
+                # Leer archivo Excel (el libro parseado se reutiliza en las etapas siguientes)
+                libro = LibroExcel.para_proceso(proceso)
+                precargar_hojas_requeridas(libro, [libro.nombres_hojas[0]])
+                df = libro.hoja(libro.nombres_hojas[0])
                 proceso.registros_totales = len(df)
-                proceso.save()
+                proceso.guardar_campos('registros_totales')
                 
-                # Clasificar automáticamente
+                # Clasificar automáticamente (sin copiar las filas: el compacto solo guarda índices)
                 clasificador = ClasificadorAutomatico()
-                resultados = clasificador.clasificar_dataset(df)
+                resultados = clasificador.clasificar_dataset(df, con_datos=False)
                 
-                # Guardar resultados de clasificación (serializable)
-                proceso.clasificacion_automatica = {
-                    tipo: [
-                        {
-                            'tipo': r.tipo,
-                            'tipo_inversion': r.tipo_inversion,
-                            'fid_anterior': r.fid_anterior,
-                            'datos': {k: str(v) if pd.notna(v) else '' for k, v in r.datos.items()},
-                            'indice': r.indice
-                        }
-                        for r in lista
-                    ] 
-                    for tipo, lista in resultados.items()
-                }
+                # Guardar resultados de clasificación (compacto: índices de fila, sin copiar los datos)
+                proceso.clasificacion_automatica = ClasificadorAutomatico.resultados_compactos(
+                    resultados, libro.nombres_hojas[0]
+                )
                 
                 # Actualizar totales
                 proceso.total_expansion = len(resultados['EXPANSION'])
@@ -122,18 +138,19 @@ def iniciar_proceso(request):
                 proceso.total_desmantelado = 0  # Unified into REPOSICION_BAJO
                 
                 # IMPORTANTE: No dejar en CLASIFICADO, continuar el flujo automáticamente
-                proceso.estado = 'PROCESANDO'
                 proceso.clasificacion_confirmada = True  # Auto-confirmar clasificación
-                proceso.save()
+                proceso.cambiar_estado('PROCESANDO')
+                proceso.guardar_campos(
+                    'clasificacion_automatica', 'total_expansion', 'total_reposicion_nuevo',
+                    'total_reposicion_bajo', 'total_desmantelado', 'clasificacion_confirmada'
+                )
                 
                 # Continuar con el procesamiento automáticamente
                 from .services import procesar_estructura_completo
                 procesar_estructura_completo(str(proceso.id))
                 
             except Exception as e:
-                proceso.estado = 'ERROR'
-                proceso.errores = [f"Error en clasificación: {str(e)}"]
-                proceso.save()
+                proceso.registrar_errores([f"Error en clasificación: {str(e)}"])
                 import traceback
                 print(f"Error completo en clasificación: {traceback.format_exc()}")
         
@@ -158,14 +175,13 @@ def iniciar_proceso(request):
 
 def proceso_detalle(request, proceso_id):
     """Vista detalle de un proceso"""
+    # Los registros no se cargan: la página usa el resumen precalculado (resumen_registros)
     proceso = get_object_or_404(ProcesoEstructura, id=proceso_id)
     
     # Si el proceso está en estado CLASIFICADO, auto-continuar el procesamiento
     if proceso.estado == 'CLASIFICADO':
         print(f"Proceso {proceso_id} en estado CLASIFICADO, continuando automáticamente...")
-        proceso.clasificacion_confirmada = True
-        proceso.estado = 'PROCESANDO'
-        proceso.save()
+        proceso.cambiar_estado('PROCESANDO', clasificacion_confirmada=True)
         
         # Iniciar procesamiento en hilo separado
         from .services import procesar_estructura_completo
@@ -181,12 +197,15 @@ def proceso_detalle(request, proceso_id):
     propietarios_info = None
     campos_requeridos = {'propietario': False, 'estado_salud': False}
     
-    if proceso.estado == 'COMPLETANDO_DATOS' and proceso.datos_norma:
+    from .services import obtener_resumen_registros
+    resumen = obtener_resumen_registros(proceso)
+    
+    if proceso.estado == 'COMPLETANDO_DATOS' and resumen.total_norma:
         from .services import ClasificadorEstructuras
         clasificador = ClasificadorEstructuras()
         
         # Verificar propietarios
-        propietarios_info = clasificador.verificar_propietarios_en_excel(proceso.datos_norma)
+        propietarios_info = resumen.propietarios_info()
         
         # Usar el nuevo método para verificar campos requeridos
         campos_requeridos = clasificador.verificar_y_marcar_campos_requeridos(proceso)
@@ -194,15 +213,12 @@ def proceso_detalle(request, proceso_id):
         # Marcar si requiere definir propietario (mantener lógica existente)
         if not propietarios_info['tiene_propietarios'] and not proceso.propietario_definido:
             proceso.requiere_definir_propietario = True
-            proceso.save()
+            proceso.guardar_campos('requiere_definir_propietario')
     else:
         # Para procesos en otros estados, verificar si requieren estado de salud
         if hasattr(proceso, 'estado_salud_definido') and (not proceso.estado_salud_definido or proceso.estado_salud_definido == 'None'):
-            if proceso.datos_excel:
-                for registro in proceso.datos_excel:
-                    if not registro.get('ESTADO_SALUD') or registro.get('ESTADO_SALUD').strip() == '':
-                        campos_requeridos['estado_salud'] = True
-                        break
+            if resumen.tiene_estado_salud_vacio:
+                campos_requeridos['estado_salud'] = True
     
     # Importar propietarios predefinidos y opciones de estado de salud
     from .constants import REGLAS_CLASIFICACION, OPCIONES_ESTADO_SALUD
@@ -219,10 +235,17 @@ def proceso_detalle(request, proceso_id):
     }
     return render(request, 'estructuras/proceso_detalle.html', context)
 
+# Columnas que completar_campos puede modificar (se guardan solo estas)
+CAMPOS_COMPLETAR_CAMPOS = (
+    'requiere_definir_propietario', 'estado_salud_definido', 'estado_estructura_definido', 'circuito',
+    'datos_norma', 'auditoria_clasificacion', 'estadisticas_clasificacion', 'resumen_registros', 'campos_faltantes',
+)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def completar_campos(request, proceso_id):
     """Completa campos faltantes y genera archivos"""
+    from .services import ClasificadorEstructuras, obtener_resumen_registros
     proceso = get_object_or_404(ProcesoEstructura, id=proceso_id)
     
     try:
@@ -235,7 +258,6 @@ def completar_campos(request, proceso_id):
         with transaction.atomic():
             # Manejar selección de propietario
             if propietario:
-                from .services import ClasificadorEstructuras
                 clasificador = ClasificadorEstructuras()
                 clasificador.aplicar_propietario_a_proceso(proceso, propietario)
                 proceso.requiere_definir_propietario = False
@@ -266,6 +288,8 @@ def completar_campos(request, proceso_id):
             
             # Si hay campos para actualizar
             if campos:
+                resumen = obtener_resumen_registros(proceso)
+                
                 # Combinar datos_excel con datos_norma para tener toda la información
                 datos_norma_actualizados = []
                 for i, registro_norma in enumerate(proceso.datos_norma):
@@ -297,28 +321,48 @@ def completar_campos(request, proceso_id):
                 # Aplicar clasificador para actualizar tipos de estructura
                 try:
                     clasificador = ClasificadorEstructuras()
-                    datos_clasificados = []
-                    for registro in datos_norma_actualizados:
-                        registro_clasificado = clasificador.clasificar_estructura(registro)
-                        
-                        # IMPORTANTE: Asegurar que el propietario seleccionado se mantenga después de la clasificación
-                        if proceso.propietario_definido:
+                    datos_clasificados, _ = clasificador.clasificar_registros(datos_norma_actualizados, proceso.firmas_norma)
+                    
+                    # IMPORTANTE: Asegurar que el propietario seleccionado se mantenga después de la clasificación
+                    if proceso.propietario_definido:
+                        for registro_clasificado in datos_clasificados:
                             registro_clasificado['PROPIETARIO'] = proceso.propietario_definido
                             registro_clasificado['PORCENTAJE_PROPIEDAD'] = '100'
-                        
-                        datos_clasificados.append(registro_clasificado)
                     
-                    proceso.datos_norma = datos_clasificados
+                    if clasificador.registros_sin_cambios:
+                        print(f"♻️ {clasificador.registros_sin_cambios} de {len(datos_clasificados)} registros sin cambios en los campos de clasificación (no se reclasificaron)")
                     
-                    # Obtener y guardar estadísticas de clasificación
-                    estadisticas = clasificador.obtener_estadisticas(datos_clasificados)
-                    proceso.estadisticas_clasificacion = estadisticas
+                    # Solo los campos que cambiaron, y solo en los bloques que los contienen
+                    cambios = {}
+                    campos_quitados = False
+                    for i, (registro_norma, registro_clasificado) in enumerate(zip(proceso.datos_norma, datos_clasificados)):
+                        campos_cambiados = {
+                            campo: valor for campo, valor in registro_clasificado.items()
+                            if campo not in registro_norma or registro_norma[campo] != valor
+                        }
+                        if campos_cambiados:
+                            cambios[i] = campos_cambiados
+                        campos_quitados = campos_quitados or not registro_norma.keys() <= registro_clasificado.keys()
+                    if campos_quitados:
+                        # La clasificación quitó campos (auditoría de versiones anteriores): reemplazar los registros
+                        proceso.datos_norma = datos_clasificados
+                    else:
+                        proceso.actualizar_registros('norma', cambios)
+                    proceso.firmas_norma = clasificador.firmas_lote
+                    proceso.auditoria_clasificacion = clasificador.resumen_auditoria()
+                    
+                    # Actualizar el resumen de registros y guardar estadísticas de clasificación
+                    resumen.reemplazar_norma(datos_clasificados)
+                    proceso.estadisticas_clasificacion = resumen.estadisticas()
                     
                 except Exception as e:
                     # Continuar sin clasificación si hay error
                     proceso.datos_norma = datos_norma_actualizados
+                    resumen.reemplazar_norma(datos_norma_actualizados)
                     proceso.estadisticas_clasificacion = {}  # Usar dict vacío en lugar de None
                     print(f"Error en clasificación: {str(e)}")
+                
+                proceso.resumen_registros = resumen.a_dict()
             
             # Verificar si aún quedan datos por completar
             campos_pendientes = {}
@@ -335,15 +379,8 @@ def completar_campos(request, proceso_id):
             
             # Verificar estado de salud
             if not proceso.estado_salud_definido or proceso.estado_salud_definido == 'None':
-                # Verificar si hay registros con ESTADO_SALUD vacío
-                estado_salud_vacio = False
-                if proceso.datos_excel:
-                    for registro in proceso.datos_excel:
-                        if not registro.get('ESTADO_SALUD') or registro.get('ESTADO_SALUD').strip() == '':
-                            estado_salud_vacio = True
-                            break
-                
-                if estado_salud_vacio:
+                # Verificar si hay registros con ESTADO_SALUD vacío (conteo del resumen de registros)
+                if obtener_resumen_registros(proceso).tiene_estado_salud_vacio:
                     campos_pendientes['estado_salud'] = True
                     print(f"Estado de salud faltante en proceso {proceso_id}")
             
@@ -361,7 +398,7 @@ def completar_campos(request, proceso_id):
             if not campos_pendientes:
                 proceso.campos_faltantes = {}  # Ya no hay campos faltantes
                 proceso.estado = 'GENERANDO_ARCHIVOS'
-                proceso.save()
+                proceso.guardar_campos('estado', *CAMPOS_COMPLETAR_CAMPOS)
                 
                 print(f"Generando archivos para proceso {proceso_id}")
                 
@@ -413,9 +450,7 @@ def completar_campos(request, proceso_id):
                     
                     print(f"Archivos generados: {archivos}")
                     
-                    proceso.archivos_generados = archivos
-                    proceso.estado = 'COMPLETADO'
-                    proceso.save()
+                    proceso.cambiar_estado('COMPLETADO', archivos_generados=archivos)
                     
                     print(f"Proceso {proceso_id} completado exitosamente")
                     
@@ -428,15 +463,13 @@ def completar_campos(request, proceso_id):
                     
                 except Exception as e:
                     print(f"Error generando archivos: {str(e)}")
-                    proceso.estado = 'ERROR'
-                    proceso.errores = [f"Error generando archivos: {str(e)}"]
-                    proceso.save()
+                    proceso.registrar_errores([f"Error generando archivos: {str(e)}"])
                     # Responder con texto plano; si proviene de generar_txt ya viene normalizado
                     from django.http import HttpResponse
                     return HttpResponse(str(e), status=400, content_type='text/plain; charset=utf-8')
             else:
                 # Aún hay campos pendientes, guardar progreso
-                proceso.save()
+                proceso.guardar_campos(*CAMPOS_COMPLETAR_CAMPOS)
                 return JsonResponse({
                     'success': True,
                     'message': 'Datos guardados correctamente',
@@ -450,18 +483,69 @@ def completar_campos(request, proceso_id):
         traceback.print_exc()
         return JsonResponse({'error': str(e)}, status=500)
 
+def _version_estado_proceso(proceso_id):
+    """Versión del estado del proceso (updated_at en microsegundos); None si no existe"""
+    updated_at = ProcesoEstructura.objects.filter(id=proceso_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return int(updated_at.timestamp() * 1000000)
+
+
+def _etag_estado_proceso(request, proceso_id):
+    version = _version_estado_proceso(proceso_id)
+    return f"{proceso_id}-{version}" if version is not None else None
+
+
 @require_http_methods(["GET"])
+@condition(etag_func=_etag_estado_proceso)
 def estado_proceso(request, proceso_id):
-    """API para obtener estado del proceso"""
-    proceso = get_object_or_404(ProcesoEstructura, id=proceso_id)
+    """
+    API de sondeo del estado del proceso. Lee solo las columnas de estado y
+    responde 304 si el ETag (versión) no cambió; los errores se consultan en
+    errores_proceso.
+    """
+    fila = ProcesoEstructura.objects.filter(id=proceso_id).annotate(
+        tiene_errores=ExpressionWrapper(~Q(errores=[]), output_field=BooleanField())
+    ).values('estado', 'registros_totales', 'registros_procesados', 'updated_at', 'tiene_errores').first()
+    if fila is None:
+        raise Http404("Proceso no encontrado")
+    
+    registros_totales = fila['registros_totales']
+    progreso = round((fila['registros_procesados'] / registros_totales) * 100, 2) if registros_totales > 0 else 0
+    
+    response = JsonResponse({
+        'estado': fila['estado'],
+        'progreso': progreso,
+        'registros_totales': registros_totales,
+        'registros_procesados': fila['registros_procesados'],
+        'tiene_errores': bool(fila['tiene_errores']),
+        'version': int(fila['updated_at'].timestamp() * 1000000),
+        'errores_url': reverse('estructuras:errores_proceso', kwargs={'proceso_id': proceso_id}),
+    })
+    # El navegador revalida en cada sondeo (If-None-Match) y reutiliza la respuesta si recibe 304
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@require_http_methods(["GET"])
+def errores_proceso(request, proceso_id):
+    """API paginada con los errores del proceso"""
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 500)
+    except ValueError:
+        return JsonResponse({'error': 'offset y limit deben ser enteros'}, status=400)
+    
+    filas = list(ProcesoEstructura.objects.filter(id=proceso_id).values_list('errores', flat=True)[:1])
+    if not filas:
+        raise Http404("Proceso no encontrado")
+    errores = filas[0] or []
     
     return JsonResponse({
-        'estado': proceso.estado,
-        'progreso': proceso.progreso_porcentaje,
-        'registros_totales': proceso.registros_totales,
-        'registros_procesados': proceso.registros_procesados,
-        'tiene_errores': proceso.errores != [],
-        'errores': proceso.errores,
+        'errores': errores[offset:offset + limit],
+        'total': len(errores),
+        'has_more': offset + limit < len(errores),
+        'next_offset': offset + limit
     })
 
 
@@ -475,6 +559,38 @@ def estadisticas_clasificacion(request, proceso_id):
         'tiene_estadisticas': bool(proceso.estadisticas_clasificacion)
     })
 
+@require_http_methods(["GET"])
+def auditoria_clasificacion(request, proceso_id):
+    """API paginada con la auditoría de clasificación de los registros (texto generado al consultar)"""
+    from .services import ClasificadorEstructuras
+    proceso = get_object_or_404(ProcesoEstructura, id=proceso_id)
+    
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 500)
+    except ValueError:
+        return JsonResponse({'error': 'offset y limit deben ser enteros'}, status=400)
+    
+    # Solo se leen los bloques de datos_norma que contienen la página pedida
+    total = proceso.contar_registros('norma')
+    registros = []
+    for indice, registro in enumerate(proceso.obtener_registros('norma', offset, offset + limit), start=offset):
+        registros.append({
+            'indice': indice,
+            'uc': registro.get('UC', ''),
+            'tipo': registro.get('TIPO', ''),
+            'codigos': registro.get('_AUDITORIA_CLASIFICACION', []),
+            'observacion': ClasificadorEstructuras.renderizar_auditoria(registro),
+        })
+    
+    return JsonResponse({
+        'auditoria': proceso.auditoria_clasificacion or {},
+        'registros': registros,
+        'total': total,
+        'has_more': offset + limit < total,
+        'next_offset': offset + limit
+    })
+
 @require_http_methods(["GET"])
 def descargar_archivo(request, proceso_id, tipo_archivo):
     """Descarga archivo generado (txt, xml, norma_txt, norma_xml, txt_baja, xml_baja, txt_linea, xml_linea, txt_baja_linea, xml_baja_linea)"""
@@ -526,10 +642,7 @@ def descargar_archivo(request, proceso_id, tipo_archivo):
             generated_filepath = os.path.join(settings.MEDIA_ROOT, 'generated', filename_generated)
             
             # Registrar en base de datos
-            if not proceso.archivos_generados:
-                proceso.archivos_generados = {}
-            proceso.archivos_generados['txt_baja'] = filename_generated
-            proceso.save()
+            proceso.registrar_archivo('txt_baja', filename_generated)
             
             # Servir archivo recién generado
             response = FileResponse(
@@ -555,10 +668,7 @@ def descargar_archivo(request, proceso_id, tipo_archivo):
             generator = FileGenerator(proceso)
             filename_generated = generator.generar_norma_txt()
             generated_filepath = os.path.join(settings.MEDIA_ROOT, 'generated', filename_generated)
-            if not proceso.archivos_generados:
-                proceso.archivos_generados = {}
-            proceso.archivos_generados['norma_txt'] = filename_generated
-            proceso.save()
+            proceso.registrar_archivo('norma_txt', filename_generated)
             return FileResponse(open(generated_filepath, 'rb'), as_attachment=True, filename=nombres_descarga.get('norma_txt', filename_generated))
         except Exception as e:
             print(f"Error generando norma TXT: {str(e)}")
@@ -576,10 +686,7 @@ def descargar_archivo(request, proceso_id, tipo_archivo):
             generator = FileGenerator(proceso)
             filename_generated = generator.generar_norma_xml()
             generated_filepath = os.path.join(settings.MEDIA_ROOT, 'generated', filename_generated)
-            if not proceso.archivos_generados:
-                proceso.archivos_generados = {}
-            proceso.archivos_generados['norma_xml'] = filename_generated
-            proceso.save()
+            proceso.registrar_archivo('norma_xml', filename_generated)
             return FileResponse(open(generated_filepath, 'rb'), as_attachment=True, filename=nombres_descarga.get('norma_xml', filename_generated))
         except Exception as e:
             print(f"Error generando norma XML: {str(e)}")
@@ -594,10 +701,7 @@ def descargar_archivo(request, proceso_id, tipo_archivo):
             filename_generated = generator.generar_txt_linea()
             
             # Guardar en el proceso
-            if not proceso.archivos_generados:
-                proceso.archivos_generados = {}
-            proceso.archivos_generados['txt_linea'] = filename_generated
-            proceso.save()
+            proceso.registrar_archivo('txt_linea', filename_generated)
             
             # Construir ruta completa
             generated_filepath = os.path.join(settings.MEDIA_ROOT, 'generated', filename_generated)
@@ -623,10 +727,7 @@ def descargar_archivo(request, proceso_id, tipo_archivo):
             filename_generated = generator.generar_txt_baja_linea()
             
             # Guardar en el proceso
-            if not proceso.archivos_generados:
-                proceso.archivos_generados = {}
-            proceso.archivos_generados['txt_baja_linea'] = filename_generated
-            proceso.save()
+            proceso.registrar_archivo('txt_baja_linea', filename_generated)
             
             # Construir ruta completa
             generated_filepath = os.path.join(settings.MEDIA_ROOT, 'generated', filename_generated)
@@ -652,10 +753,7 @@ def descargar_archivo(request, proceso_id, tipo_archivo):
             filename_generated = generator.generar_xml_linea()
             
             # Guardar en el proceso
-            if not proceso.archivos_generados:
-                proceso.archivos_generados = {}
-            proceso.archivos_generados['xml_linea'] = filename_generated
-            proceso.save()
+            proceso.registrar_archivo('xml_linea', filename_generated)
             
             # Construir ruta completa
             generated_filepath = os.path.join(settings.MEDIA_ROOT, 'generated', filename_generated)
@@ -681,10 +779,7 @@ def descargar_archivo(request, proceso_id, tipo_archivo):
             filename_generated = generator.generar_xml_baja_linea()
             
             # Guardar en el proceso
-            if not proceso.archivos_generados:
-                proceso.archivos_generados = {}
-            proceso.archivos_generados['xml_baja_linea'] = filename_generated
-            proceso.save()
+            proceso.registrar_archivo('xml_baja_linea', filename_generated)
             
             # Construir ruta completa
             generated_filepath = os.path.join(settings.MEDIA_ROOT, 'generated', filename_generated)
@@ -723,6 +818,42 @@ def descargar_archivo(request, proceso_id, tipo_archivo):
 # VISTAS DE CLASIFICACIÓN AUTOMÁTICA
 # ==========================================
 
+def _registros_clasificacion(proceso, tipo: str, limite: int = 10) -> list:
+    """
+    Primeros `limite` registros de un tipo de la clasificación automática, con
+    los datos de su fila leídos del Excel del proceso. Acepta también el
+    formato anterior, que guardaba la fila completa en cada registro.
+    """
+    clasificacion = proceso.clasificacion_automatica or {}
+    if clasificacion.get('formato') != 'indices':
+        return clasificacion.get(tipo, [])[:limite]
+    
+    columnas = clasificacion.get('tipos', {}).get(tipo)
+    if not columnas:
+        return []
+    indices = columnas['indices'][:limite]
+    
+    try:
+        df = LibroExcel.para_proceso(proceso).hoja(clasificacion['hoja'])
+    except Exception as e:
+        print(f"⚠️ No se pudieron leer los datos de la clasificación: {e}")
+        df = None
+    
+    registros = []
+    for i, indice in enumerate(indices):
+        datos = {}
+        if df is not None and indice in df.index:
+            datos = {k: str(v) if pd.notna(v) else '' for k, v in df.loc[indice].items()}
+        registros.append({
+            'tipo': tipo,
+            'tipo_inversion': columnas['tipo_inversion'][i],
+            'fid_anterior': columnas['fid_anterior'][i],
+            'datos': datos,
+            'indice': indice
+        })
+    return registros
+
+
 @csrf_exempt
 def revisar_clasificacion(request, proceso_id):
     """Vista para revisar y ajustar la clasificación automática"""
@@ -740,19 +871,19 @@ def revisar_clasificacion(request, proceso_id):
             'total_registros': proceso.registros_totales,
             'expansion': {
                 'cantidad': proceso.total_expansion,
-                'registros': proceso.clasificacion_automatica.get('EXPANSION', [])[:10]  # Primeros 10
+                'registros': _registros_clasificacion(proceso, 'EXPANSION')  # Primeros 10
             },
             'reposicion_nuevo': {
                 'cantidad': proceso.total_reposicion_nuevo,
-                'registros': proceso.clasificacion_automatica.get('REPOSICION_NUEVO', [])[:10]
+                'registros': _registros_clasificacion(proceso, 'REPOSICION_NUEVO')
             },
             'reposicion_bajo': {
                 'cantidad': proceso.total_reposicion_bajo,
-                'registros': proceso.clasificacion_automatica.get('REPOSICION_BAJO', [])[:10]
+                'registros': _registros_clasificacion(proceso, 'REPOSICION_BAJO')
             },
             'desmantelado': {
                 'cantidad': proceso.total_desmantelado,
-                'registros': proceso.clasificacion_automatica.get('DESMANTELADO', [])[:10]
+                'registros': _registros_clasificacion(proceso, 'DESMANTELADO')
             }
         }
         
@@ -780,7 +911,7 @@ def revisar_clasificacion(request, proceso_id):
                 # Confirmar clasificación y continuar con el flujo normal
                 proceso.clasificacion_confirmada = True
                 proceso.estado = 'COMPLETANDO_DATOS'  # Cambiar a COMPLETANDO_DATOS para continuar el flujo
-                proceso.save()
+                proceso.guardar_campos('ajustes_clasificacion', 'clasificacion_confirmada', 'estado')
                 
                 return JsonResponse({
                     'success': True,
@@ -788,7 +919,7 @@ def revisar_clasificacion(request, proceso_id):
                     'redirect_url': reverse('estructuras:proceso_detalle', kwargs={'proceso_id': proceso.id})
                 })
             else:
-                proceso.save()
+                proceso.guardar_campos('ajustes_clasificacion')
                 return JsonResponse({
                     'success': True,
                     'mensaje': 'Ajustes guardados correctamente'
@@ -98,7 +98,42 @@ DATABASE_ROUTERS = ['estructuras.db_router.OracleRouter']
 # Configuración Oracle
 ORACLE_ENABLED = True  # Cambiar a False para deshabilitar consultas Oracle temporalmente
 ORACLE_CONNECTION_TIMEOUT = 10  # Timeout en segundos para conexiones Oracle
-
+ORACLE_POOL_MIN = 1  # Sesiones que el pool mantiene abiertas
+ORACLE_POOL_MAX = 4  # Máximo de sesiones simultáneas por proceso
+ORACLE_POOL_INCREMENT = 1  # Sesiones que se abren cuando el pool necesita crecer
+ORACLE_POOL_ESPERA_MS = 5000  # Espera máxima (ms) por una sesión libre cuando el pool está lleno
+ORACLE_POOL_INACTIVIDAD = 300  # Segundos sin uso tras los que se cierran las sesiones por encima del mínimo
+ORACLE_POOL_PING_INTERVAL = 60  # Se verifica (ping) la sesión al tomarla si lleva más de N segundos sin uso
+ORACLE_STMT_CACHE_SIZE = 50  # Sentencias preparadas que conserva cada sesión
+ORACLE_ESQUEMA_TTL = 3600  # Segundos que se reutilizan las columnas opcionales leídas de USER_TAB_COLUMNS
+ORACLE_ESQUEMA_ARCHIVO = BASE_DIR / 'oracle_esquema.json'  # Catálogo compartido entre procesos (manage.py refrescar_esquema_oracle lo reescribe); None lo deja solo en memoria
+ORACLE_ESQUEMA_REVISION_SEG = 30  # Cada cuánto, como mucho, se revisa si otro proceso reescribió ese archivo
+
+# Caché local de consultas Oracle (estructuras/cache_oracle.py, tabla ConsultaOracleCache)
+ORACLE_CACHE_ACTIVO = True  # False: todas las consultas van a Oracle y no se guardan
+ORACLE_CACHE_TTL_DIAS = {  # Vigencia por tipo de consulta (solo las consultas en bloque usan la caché)
+    'fid_codigo': 1,  # código operativo -> FID; corto porque una reposición lo cambia (las reposiciones no usan la caché)
+    'datos_txt': 14,  # FID -> UC, coordenadas, tipo, propietario (generar_txt)
+    'fid_enlace': 1,  # ENLACE -> FID (TXT de norma); corto por la misma razón que fid_codigo
+    'norma_fid': 14,  # FID -> norma, grupo, circuito, trafo... (TXT de norma)
+    'conductor_codigo': 1,  # código -> coordenadas y datos del conductor (reposiciones de conductores)
+}
+ORACLE_CACHE_TTL_NO_ENCONTRADO_HORAS = 24  # Vigencia de "no encontrado" (caché negativa)
+
+# Lectura de Excel
+EXCEL_STREAMING_MIN_MB = 25  # Archivos de este tamaño o mayores se leen, clasifican y guardan por bloques de filas (memoria acotada al bloque); None desactiva
+EXCEL_CACHE_PARSEO = True  # Guardar el parseo de cada Excel en disco para no volver a parsearlo
+EXCEL_CACHE_PARSEO_DIR = BASE_DIR / 'cache_parseo_excel'  # Carpeta de esa caché (una subcarpeta <sha256> por archivo); fuera de MEDIA_ROOT para que no se publique
+EXCEL_CACHE_PARSEO_DIAS = 30  # manage.py limpiar_cache_parseo --vencidas borra las entradas sin uso en este plazo
+EXCEL_PARSEO_PARALELO = 0  # Procesos para parsear en paralelo las hojas requeridas (Estructuras, Conductor, Norma); 0 desactiva
+
+# Clasificación de estructuras
+CLASIFICACION_AUDITORIA = 'codigos'  # 'codigos': códigos de reglas por registro (texto al consultar la auditoría); 'ninguna': sin auditoría
+
+# Registros de procesos
+REGISTROS_POR_BLOQUE = 500  # Registros de datos_excel/datos_norma por fila de BloqueRegistros
+PROGRESO_INTERVALO_REGISTROS = 1000  # registros_procesados se guarda cada N registros...
+PROGRESO_INTERVALO_SEGUNDOS = 2  # ...o cada N segundos, lo que ocurra primero
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators